@@ -0,0 +1,40 @@
+"""Add portfolio_data_version table
+
+Revision ID: 2a20b67c3569
+Revises: 0db90b21cb28
+Create Date: 2026-10-18 09:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "2a20b67c3569"
+down_revision: Union[str, Sequence[str], None] = "0db90b21cb28"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "portfolio_data_version",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("version", sa.BigInteger(), nullable=False, server_default="0"),
+        sa.Column(
+            "updated_at",
+            sa.DateTime(timezone=True),
+            server_default=sa.text("NOW()"),
+            nullable=False,
+        ),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    # 単一行テーブル: 常に id=1 の行だけを更新する
+    op.execute("INSERT INTO portfolio_data_version (id, version) VALUES (1, 0)")
+
+
+def downgrade() -> None:
+    op.drop_table("portfolio_data_version")
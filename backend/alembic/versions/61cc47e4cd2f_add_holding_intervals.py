@@ -0,0 +1,79 @@
+"""Add holding_intervals table
+
+Revision ID: 61cc47e4cd2f
+Revises: 2a20b67c3569
+Create Date: 2026-10-18 10:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "61cc47e4cd2f"
+down_revision: Union[str, Sequence[str], None] = "2a20b67c3569"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "holding_intervals",
+        sa.Column(
+            "id",
+            postgresql.UUID(as_uuid=True),
+            server_default=sa.text("uuid_generate_v4()"),
+            nullable=False,
+        ),
+        sa.Column("asset_id", postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column("quantity", sa.Numeric(precision=18, scale=4), nullable=False),
+        sa.Column("valid_from", sa.Date(), nullable=False),
+        sa.Column("valid_to", sa.Date(), nullable=True),
+        sa.ForeignKeyConstraint(["asset_id"], ["assets.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint("asset_id", "valid_from", name="uq_holding_interval_start"),
+    )
+    op.create_index(
+        "idx_holding_intervals_range",
+        "holding_intervals",
+        [sa.text("daterange(valid_from, valid_to)")],
+        postgresql_using="gist",
+    )
+
+    # 既存の取引履歴から保有区間を再構築（取引日ごとの累積数量）
+    op.execute("""
+        INSERT INTO holding_intervals (asset_id, quantity, valid_from, valid_to)
+        SELECT
+            asset_id,
+            SUM(delta) OVER (PARTITION BY asset_id ORDER BY day),
+            day,
+            LEAD(day) OVER (PARTITION BY asset_id ORDER BY day)
+        FROM (
+            SELECT
+                asset_id,
+                transaction_date::date AS day,
+                SUM(CASE WHEN transaction_type = 'sell' THEN -quantity ELSE quantity END)
+                    AS delta
+            FROM transactions
+            GROUP BY asset_id, transaction_date::date
+        ) AS daily
+    """)
+
+    # 取引履歴のない旧データ（現金以外）は登録日から現在の数量を保有していたとみなす
+    op.execute("""
+        INSERT INTO holding_intervals (asset_id, quantity, valid_from, valid_to)
+        SELECT a.id, a.quantity, a.created_at::date, NULL
+        FROM assets a
+        WHERE a.category_id <> 4
+          AND a.quantity <> 0
+          AND NOT EXISTS (SELECT 1 FROM transactions t WHERE t.asset_id = a.id)
+    """)
+
+
+def downgrade() -> None:
+    op.drop_index("idx_holding_intervals_range", table_name="holding_intervals")
+    op.drop_table("holding_intervals")
@@ -0,0 +1,63 @@
+"""Add cash ledger and balance checkpoints
+
+Revision ID: a1372b98727a
+Revises: 61cc47e4cd2f
+Create Date: 2026-10-18 11:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "a1372b98727a"
+down_revision: Union[str, Sequence[str], None] = "61cc47e4cd2f"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "cash_ledger_entries",
+        sa.Column(
+            "id",
+            postgresql.UUID(as_uuid=True),
+            server_default=sa.text("uuid_generate_v4()"),
+            nullable=False,
+        ),
+        sa.Column("entry_date", sa.Date(), nullable=False),
+        sa.Column("amount", sa.Numeric(precision=18, scale=2), nullable=False),
+        sa.Column("entry_type", sa.String(length=20), nullable=False),
+        sa.Column("transaction_id", postgresql.UUID(as_uuid=True), nullable=True),
+        sa.Column("note", sa.String(length=255), nullable=True),
+        sa.Column("created_at", sa.DateTime(), server_default=sa.text("NOW()"), nullable=False),
+        sa.ForeignKeyConstraint(["transaction_id"], ["transactions.id"], ondelete="SET NULL"),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("idx_cash_ledger_entries_entry_date", "cash_ledger_entries", ["entry_date"])
+
+    op.create_table(
+        "cash_balance_checkpoints",
+        sa.Column("checkpoint_date", sa.Date(), nullable=False),
+        sa.Column("balance", sa.Numeric(precision=18, scale=2), nullable=False),
+        sa.PrimaryKeyConstraint("checkpoint_date"),
+    )
+
+    # 既存の現金残高は、現金資産の登録日に期首残高として計上する
+    # （過去の入出金は記録されていないため、それ以前の残高は 0 とみなす）
+    op.execute("""
+        INSERT INTO cash_ledger_entries (entry_date, amount, entry_type, note)
+        SELECT created_at::date, quantity, 'adjustment', '期首残高'
+        FROM assets
+        WHERE category_id = 4 AND quantity <> 0
+    """)
+
+
+def downgrade() -> None:
+    op.drop_table("cash_balance_checkpoints")
+    op.drop_index("idx_cash_ledger_entries_entry_date", table_name="cash_ledger_entries")
+    op.drop_table("cash_ledger_entries")
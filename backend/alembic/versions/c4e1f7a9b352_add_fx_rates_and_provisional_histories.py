@@ -0,0 +1,41 @@
+"""Add fx_rates and provisional flag on asset_histories
+
+Revision ID: c4e1f7a9b352
+Revises: a1372b98727a
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "c4e1f7a9b352"
+down_revision: Union[str, Sequence[str], None] = "a1372b98727a"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "fx_rates",
+        sa.Column("pair", sa.String(length=10), nullable=False),
+        sa.Column("rate_date", sa.Date(), nullable=False),
+        sa.Column("rate", sa.Numeric(precision=18, scale=4), nullable=False),
+        sa.Column("provisional", sa.Boolean(), server_default=sa.false(), nullable=False),
+        sa.Column("created_at", sa.DateTime(), server_default=sa.text("NOW()"), nullable=False),
+        sa.PrimaryKeyConstraint("pair", "rate_date"),
+    )
+    # 既存の履歴は確定値として扱う
+    op.add_column(
+        "asset_histories",
+        sa.Column("provisional", sa.Boolean(), server_default=sa.false(), nullable=False),
+    )
+
+
+def downgrade() -> None:
+    op.drop_column("asset_histories", "provisional")
+    op.drop_table("fx_rates")
@@ -0,0 +1,42 @@
+"""Add snapshot_invalidation table
+
+Revision ID: e7b2d5c8f013
+Revises: c4e1f7a9b352
+Create Date: 2026-10-18 15:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "e7b2d5c8f013"
+down_revision: Union[str, Sequence[str], None] = "c4e1f7a9b352"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "snapshot_invalidation",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("dirty_from", sa.Date(), nullable=True),
+        sa.Column("generation", sa.BigInteger(), nullable=False, server_default="0"),
+        sa.Column("attempts", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column(
+            "updated_at",
+            sa.DateTime(timezone=True),
+            server_default=sa.text("NOW()"),
+            nullable=False,
+        ),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    # 単一行テーブル: 常に id=1 の行だけを更新する
+    op.execute("INSERT INTO snapshot_invalidation (id, generation) VALUES (1, 0)")
+
+
+def downgrade() -> None:
+    op.drop_table("snapshot_invalidation")
@@ -3,6 +3,7 @@ Database configuration and session management.
 """
 
 import os
+import tempfile
 from typing import AsyncGenerator
 
 from pydantic_settings import BaseSettings
@@ -18,6 +19,82 @@ class Settings(BaseSettings):
     POSTGRES_PASSWORD: str = os.getenv("POSTGRES_PASSWORD", "postgres")
     POSTGRES_DB: str = os.getenv("POSTGRES_DB", "appdb")
     POSTGRES_PORT: int = int(os.getenv("POSTGRES_PORT", "5432"))
+    # 起動時のウォームアップで保有銘柄の株価を1件取得する（yfinance の初期化・認証を済ませる）
+    WARMUP_PREFETCH_QUOTES: bool = os.getenv("WARMUP_PREFETCH_QUOTES", "false").lower() in (
+        "1",
+        "true",
+        "yes",
+    )
+
+    # SQL をログ出力するか（開発用。本番では false）
+    SQL_ECHO: bool = os.getenv("SQL_ECHO", "true").lower() in ("1", "true", "yes")
+
+    # CORS で許可するオリジン（カンマ区切り）
+    CORS_ORIGINS: str = os.getenv("CORS_ORIGINS", "http://localhost:3000,http://localhost:3001")
+
+    # 本番サーバー（python -m src.server）の設定
+    WEB_HOST: str = os.getenv("WEB_HOST", "0.0.0.0")
+    WEB_PORT: int = int(os.getenv("WEB_PORT", "8000"))
+    # ワーカープロセス数（0 ならコア数）
+    WEB_WORKERS: int = int(os.getenv("WEB_WORKERS", "0"))
+    # 終了シグナル受信後、処理中のリクエストを待つ最大秒数
+    WEB_GRACEFUL_TIMEOUT: int = int(os.getenv("WEB_GRACEFUL_TIMEOUT", "30"))
+
+    # レスポンスキャッシュ（チャート・ダッシュボード用）の上限
+    RESPONSE_CACHE_MAX_ENTRIES: int = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "256"))
+    RESPONSE_CACHE_MAX_BYTES: int = int(
+        os.getenv("RESPONSE_CACHE_MAX_BYTES", str(16 * 1024 * 1024))
+    )
+
+    # レスポンス圧縮（gzip / brotli）。このサイズ（バイト）未満のレスポンスは圧縮しない
+    COMPRESSION_MIN_SIZE: int = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))
+    # gzip の圧縮レベル（1〜9）と brotli の品質（0〜11）
+    COMPRESSION_GZIP_LEVEL: int = int(os.getenv("COMPRESSION_GZIP_LEVEL", "6"))
+    COMPRESSION_BROTLI_QUALITY: int = int(os.getenv("COMPRESSION_BROTLI_QUALITY", "5"))
+
+    # 取引明細CSV取込の一括INSERT件数
+    STATEMENT_IMPORT_BATCH_SIZE: int = int(os.getenv("STATEMENT_IMPORT_BATCH_SIZE", "1000"))
+
+    # エクスポート時にサーバーサイドカーソルから一度に取得する行数
+    EXPORT_YIELD_PER: int = int(os.getenv("EXPORT_YIELD_PER", "1000"))
+
+    # 過去日付の取引・入出金で古くなったスナップショットを再計算する間隔（秒、0 で無効）
+    SNAPSHOT_WORKER_INTERVAL: float = float(os.getenv("SNAPSHOT_WORKER_INTERVAL", "10"))
+    # 同じ範囲の再計算がこの回数続けて失敗したら、次に印が付くまで再試行しない
+    SNAPSHOT_WORKER_MAX_ATTEMPTS: int = int(os.getenv("SNAPSHOT_WORKER_MAX_ATTEMPTS", "5"))
+
+    # 外部API（yfinance）呼び出し用スレッドプールのサイズ
+    PROVIDER_EXECUTOR_WORKERS: int = int(os.getenv("PROVIDER_EXECUTOR_WORKERS", "8"))
+    # DataFrame 変換など CPU 処理用スレッドプールのサイズ（0 ならコア数から決定）
+    CPU_EXECUTOR_WORKERS: int = int(os.getenv("CPU_EXECUTOR_WORKERS", "0"))
+
+    # 1リクエストあたりのSQL実行数の上限（超えたら警告ログ、0 で無効）
+    SQL_QUERY_BUDGET: int = int(os.getenv("SQL_QUERY_BUDGET", "30"))
+    # 同じ形のSQLがこの回数以上実行されたら N+1 の疑いとして警告（0 で無効）
+    SQL_REPEAT_THRESHOLD: int = int(os.getenv("SQL_REPEAT_THRESHOLD", "5"))
+
+    # この時間（ミリ秒）を超えたSQLをスロークエリとして記録（0 で無効）
+    SLOW_QUERY_MS: int = int(os.getenv("SLOW_QUERY_MS", "200"))
+    # スロークエリ（SELECT のみ）に EXPLAIN (ANALYZE, BUFFERS) を実行する割合（0〜1）
+    SLOW_QUERY_EXPLAIN_RATE: float = float(os.getenv("SLOW_QUERY_EXPLAIN_RATE", "0"))
+    # スロークエリレポートに残す件数（SQLの形ごと、累計時間の大きい順）
+    SLOW_QUERY_TOP_N: int = int(os.getenv("SLOW_QUERY_TOP_N", "20"))
+
+    # プロファイリング（どちらも未設定ならミドルウェア自体を登録しない）
+    # X-Profile-Token ヘッダーがこの値と一致したリクエストを計測（管理APIの認証にも使用）
+    PROFILING_TOKEN: str = os.getenv("PROFILING_TOKEN", "")
+    # トークンなしで計測するリクエストの割合（0〜1）
+    PROFILING_SAMPLE_RATE: float = float(os.getenv("PROFILING_SAMPLE_RATE", "0"))
+    PROFILING_DIR: str = os.getenv(
+        "PROFILING_DIR", os.path.join(tempfile.gettempdir(), "solo-saving-profiles")
+    )
+    # 保存するプロファイルの最大件数（古いものから削除）
+    PROFILING_MAX_PROFILES: int = int(os.getenv("PROFILING_MAX_PROFILES", "50"))
+
+    @property
+    def cors_origins(self) -> list[str]:
+        """CORS_ORIGINS split into a list."""
+        return [origin.strip() for origin in self.CORS_ORIGINS.split(",") if origin.strip()]
 
     @property
     def DATABASE_URL(self) -> str:
@@ -44,7 +121,7 @@ class Base(DeclarativeBase):
 # Create async engine
 engine = create_async_engine(
     settings.DATABASE_URL,
-    echo=True,  # Set to False in production
+    echo=settings.SQL_ECHO,
     future=True,
 )
 
@@ -0,0 +1,218 @@
+"""
+HTTP キャッシュ（条件付きリクエスト・レスポンスキャッシュ）
+
+ポートフォリオのデータバージョンから強い ETag / Last-Modified を生成し、
+If-None-Match / If-Modified-Since が一致した場合は 304 Not Modified を返します。
+304 の場合は DB の集計処理もシリアライズも行いません。
+
+集計コストの高いエンドポイントは、シリアライズ済みの JSON を
+(エンドポイント, パラメータ, データバージョン) をキーにメモリキャッシュします。
+圧縮（gzip / brotli）したボディもエントリに保存し、2回目以降は圧縮処理なしで返します。
+"""
+
+import hashlib
+from collections.abc import Awaitable, Callable, Hashable
+from datetime import UTC, datetime
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Any
+
+from fastapi import Request, Response
+from pydantic import TypeAdapter
+
+from app.database import settings
+from app.responses import NumericFormat, dumps
+from app.services.compression import (
+    choose_encoding,
+    compress,
+    record_precompressed,
+    weak_etag,
+)
+from app.services.data_version import DataVersion
+from app.services.response_cache import response_cache
+
+# クライアントには毎回再検証させる（304 なら転送量はヘッダーのみ）
+CACHE_CONTROL = "no-cache"
+
+
+def make_etag(version: int, *key_parts: object) -> str:
+    """
+    データバージョンとエンドポイント/パラメータから強い ETag を生成。
+
+    Args:
+        version: ポートフォリオのデータバージョン
+        key_parts: エンドポイント名やクエリパラメータなど
+
+    Returns:
+        ダブルクォートで囲まれた ETag 文字列
+    """
+    key = "|".join(str(p) for p in key_parts)
+    digest = hashlib.sha1(key.encode("utf-8")).hexdigest()[:16]
+    return f'"{version}-{digest}"'
+
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    """If-None-Match ヘッダーに ETag が含まれるか（弱い比較）"""
+    if if_none_match.strip() == "*":
+        return True
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == etag:
+            return True
+    return False
+
+
+def _not_modified_since(if_modified_since: str, last_modified: datetime) -> bool:
+    """If-Modified-Since 以降に更新がないか（秒精度で比較）"""
+    try:
+        since = parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        return False
+    if since.tzinfo is None:
+        since = since.replace(tzinfo=UTC)
+    return last_modified.replace(microsecond=0) <= since
+
+
+def conditional_response(
+    request: Request,
+    response: Response,
+    data_version: DataVersion,
+    *key_parts: object,
+    last_modified: datetime | None = None,
+) -> Response | None:
+    """
+    条件付きリクエストを評価し、キャッシュヘッダーを設定。
+
+    Args:
+        request: リクエスト
+        response: ハンドラーのレスポンス（ヘッダー設定用）
+        data_version: 現在のデータバージョン
+        key_parts: ETag に含めるエンドポイント名やパラメータ
+        last_modified: Last-Modified の上書き（日付依存のレスポンス用）
+
+    Returns:
+        304 レスポンス（クライアントのキャッシュが有効な場合）、それ以外は None
+    """
+    etag = make_etag(data_version.version, *key_parts)
+    modified_at = (last_modified or data_version.updated_at).astimezone(UTC)
+    headers = {
+        "ETag": etag,
+        "Last-Modified": format_datetime(modified_at.replace(microsecond=0), usegmt=True),
+        "Cache-Control": CACHE_CONTROL,
+    }
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        # If-None-Match がある場合は If-Modified-Since を無視する（RFC 9110）
+        not_modified = _etag_matches(if_none_match, etag)
+    else:
+        if_modified_since = request.headers.get("if-modified-since")
+        not_modified = if_modified_since is not None and _not_modified_since(
+            if_modified_since, modified_at
+        )
+
+    if not_modified:
+        return Response(status_code=304, headers=headers)
+
+    response.headers.update(headers)
+    return None
+
+
+async def _cached_body(
+    endpoint: str,
+    params: tuple[Hashable, ...],
+    version: int,
+    adapter: TypeAdapter,
+    build: Callable[[], Awaitable[Any]],
+    numeric: NumericFormat,
+) -> tuple[bytes, dict[str, bytes]]:
+    """キャッシュ済みのボディと圧縮済みボディ。ミス時は組み立ててキャッシュに保存。"""
+    entry = response_cache.get(endpoint, params, version)
+    if entry is not None:
+        return entry.body, entry.encoded
+    data = await build()
+    if numeric == "float":
+        body = dumps(adapter.dump_python(data), numeric)
+    else:
+        body = adapter.dump_json(data)
+    response_cache.set(endpoint, params, version, body)
+    return body, {}
+
+
+async def prime_json_cache(
+    endpoint: str,
+    params: tuple[Hashable, ...],
+    version: int,
+    adapter: TypeAdapter,
+    build: Callable[[], Awaitable[Any]],
+    numeric: NumericFormat = "string",
+) -> None:
+    """
+    リクエストなしでレスポンスキャッシュに JSON を載せる（起動時のウォームアップ用）。
+
+    キーとシリアライズは :func:`cached_json_response` と同じため、
+    以降の同じリクエストはキャッシュヒットになります。
+
+    Args:
+        endpoint: エンドポイント名
+        params: レスポンスに影響するパラメータ
+        version: 現在のデータバージョン
+        adapter: レスポンスモデルの TypeAdapter（シリアライズ用）
+        build: キャッシュミス時にレスポンスデータを組み立てるコルーチン関数
+        numeric: Decimal の出力形式
+    """
+    await _cached_body(endpoint, params, version, adapter, build, numeric)
+
+
+async def cached_json_response(
+    request: Request,
+    response: Response,
+    endpoint: str,
+    params: tuple[Hashable, ...],
+    version: int,
+    adapter: TypeAdapter,
+    build: Callable[[], Awaitable[Any]],
+    numeric: NumericFormat = "string",
+) -> Response:
+    """
+    レスポンスキャッシュから JSON を返す。ミス時は組み立ててキャッシュに保存。
+
+    クライアントが gzip / brotli を受け付ける場合は圧縮済みのボディを返す
+    （初回のみ圧縮してキャッシュに保存）。
+
+    Args:
+        request: リクエスト（Accept-Encoding の判定用）
+        response: ハンドラーのレスポンス（設定済みヘッダーを引き継ぐ）
+        endpoint: エンドポイント名
+        params: レスポンスに影響するパラメータ
+        version: 現在のデータバージョン
+        adapter: レスポンスモデルの TypeAdapter（シリアライズ用）
+        build: キャッシュミス時にレスポンスデータを組み立てるコルーチン関数
+        numeric: Decimal の出力形式（"float" の場合は数値で出力。params にも含めること）
+
+    Returns:
+        JSON レスポンス
+    """
+    body, encoded = await _cached_body(endpoint, params, version, adapter, build, numeric)
+
+    headers = {k: v for k, v in response.headers.items() if k != "content-length"}
+    if len(body) < settings.COMPRESSION_MIN_SIZE:
+        return Response(content=body, media_type="application/json", headers=headers)
+
+    headers["Vary"] = "Accept-Encoding"
+    encoding = choose_encoding(request.headers.get("accept-encoding", ""))
+    if encoding is None:
+        return Response(content=body, media_type="application/json", headers=headers)
+
+    compressed = encoded.get(encoding)
+    if compressed is None:
+        compressed = compress(body, encoding)
+        response_cache.set_encoded(endpoint, params, version, encoding, compressed)
+    else:
+        record_precompressed(encoding, len(body), len(compressed))
+    headers["Content-Encoding"] = encoding
+    if "etag" in headers:
+        headers["etag"] = weak_etag(headers["etag"])
+    # Content-Encoding 付きのため CompressionMiddleware はそのまま通す
+    return Response(content=compressed, media_type="application/json", headers=headers)
@@ -7,6 +7,7 @@ from datetime import date, datetime
 from decimal import Decimal
 
 from sqlalchemy import (
+    BigInteger,
     Boolean,
     Date,
     DateTime,
@@ -19,7 +20,7 @@ from sqlalchemy import (
 )
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import Mapped, mapped_column, relationship
-from sqlalchemy.sql import func
+from sqlalchemy.sql import false, func, text
 
 from app.database import Base
 
@@ -76,6 +77,9 @@ class Asset(Base):
     transactions: Mapped[list["Transaction"]] = relationship(
         "Transaction", back_populates="asset", cascade="all, delete-orphan"
     )
+    holding_intervals: Mapped[list["HoldingInterval"]] = relationship(
+        "HoldingInterval", back_populates="asset", cascade="all, delete-orphan"
+    )
 
     __table_args__ = (Index("idx_assets_category_id", "category_id"),)
 
@@ -96,6 +100,11 @@ class AssetHistory(Base):
     price: Mapped[Decimal | None] = mapped_column(Numeric(18, 2), nullable=True)
     value: Mapped[Decimal] = mapped_column(Numeric(18, 2), nullable=False)
     quantity: Mapped[Decimal | None] = mapped_column(Numeric(18, 4), nullable=True)
+    # 当日の途中値や取得失敗時の前日値の引き継ぎなど、次回の評価で取り直す行
+    provisional: Mapped[bool] = mapped_column(
+        Boolean, nullable=False, default=False, server_default=false()
+    )
+    # 評価処理での再取得時にも更新される（書き込み日時）
     created_at: Mapped[datetime] = mapped_column(
         DateTime, nullable=False, server_default=func.now()
     )
@@ -141,6 +150,25 @@ class AssetSnapshot(Base):
         return f"<AssetSnapshot(id={self.id}, date={self.snapshot_date})>"
 
 
+class FxRate(Base):
+    """Daily FX close (e.g. USDJPY), forward-filled over non-trading days."""
+
+    __tablename__ = "fx_rates"
+
+    pair: Mapped[str] = mapped_column(String(10), primary_key=True)
+    rate_date: Mapped[date] = mapped_column(Date, primary_key=True)
+    rate: Mapped[Decimal] = mapped_column(Numeric(18, 4), nullable=False)
+    provisional: Mapped[bool] = mapped_column(
+        Boolean, nullable=False, default=False, server_default=false()
+    )
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime, nullable=False, server_default=func.now()
+    )
+
+    def __repr__(self) -> str:
+        return f"<FxRate(pair={self.pair}, date={self.rate_date}, rate={self.rate})>"
+
+
 class SavingsGoal(Base):
     """Savings goal configuration."""
 
@@ -202,3 +230,122 @@ class Transaction(Base):
         return (
             f"<Transaction(id={self.id}, asset_id={self.asset_id}, type={self.transaction_type})>"
         )
+
+
+class HoldingInterval(Base):
+    """Quantity held of an asset over a date range [valid_from, valid_to).
+
+    Maintained incrementally from transactions so historical holdings can be
+    answered with a range join instead of replaying the ledger.
+    ``valid_to`` is NULL for the current (open-ended) interval.
+    """
+
+    __tablename__ = "holding_intervals"
+
+    id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    asset_id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True), ForeignKey("assets.id", ondelete="CASCADE"), nullable=False
+    )
+    quantity: Mapped[Decimal] = mapped_column(Numeric(18, 4), nullable=False)
+    valid_from: Mapped[date] = mapped_column(Date, nullable=False)
+    valid_to: Mapped[date | None] = mapped_column(Date, nullable=True)
+
+    # Relationships
+    asset: Mapped["Asset"] = relationship("Asset", back_populates="holding_intervals")
+
+    __table_args__ = (
+        UniqueConstraint("asset_id", "valid_from", name="uq_holding_interval_start"),
+        Index(
+            "idx_holding_intervals_range",
+            text("daterange(valid_from, valid_to)"),
+            postgresql_using="gist",
+        ),
+    )
+
+    def __repr__(self) -> str:
+        return (
+            f"<HoldingInterval(asset_id={self.asset_id}, quantity={self.quantity}, "
+            f"valid_from={self.valid_from}, valid_to={self.valid_to})>"
+        )
+
+
+class CashLedgerEntry(Base):
+    """Single cash movement (deposit, withdrawal, purchase settlement, adjustment)."""
+
+    __tablename__ = "cash_ledger_entries"
+
+    id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    entry_date: Mapped[date] = mapped_column(Date, nullable=False)
+    # 入金はプラス、出金・購入はマイナス
+    amount: Mapped[Decimal] = mapped_column(Numeric(18, 2), nullable=False)
+    entry_type: Mapped[str] = mapped_column(
+        String(20), nullable=False
+    )  # "deposit", "withdraw", "buy", "adjustment"
+    transaction_id: Mapped[uuid.UUID | None] = mapped_column(
+        UUID(as_uuid=True), ForeignKey("transactions.id", ondelete="SET NULL"), nullable=True
+    )
+    note: Mapped[str | None] = mapped_column(String(255), nullable=True)
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime, nullable=False, server_default=func.now()
+    )
+
+    __table_args__ = (Index("idx_cash_ledger_entries_entry_date", "entry_date"),)
+
+    def __repr__(self) -> str:
+        return (
+            f"<CashLedgerEntry(date={self.entry_date}, amount={self.amount}, "
+            f"type={self.entry_type})>"
+        )
+
+
+class CashBalanceCheckpoint(Base):
+    """Cash balance at the end of a month (sum of all entries up to the date)."""
+
+    __tablename__ = "cash_balance_checkpoints"
+
+    checkpoint_date: Mapped[date] = mapped_column(Date, primary_key=True)
+    balance: Mapped[Decimal] = mapped_column(Numeric(18, 2), nullable=False)
+
+    def __repr__(self) -> str:
+        return f"<CashBalanceCheckpoint(date={self.checkpoint_date}, balance={self.balance})>"
+
+
+class PortfolioDataVersion(Base):
+    """Single-row counter bumped by every write that changes portfolio data.
+
+    Used to derive ETags and cache keys for read endpoints.
+    """
+
+    __tablename__ = "portfolio_data_version"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, default=1)
+    version: Mapped[int] = mapped_column(BigInteger, nullable=False, default=0)
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), nullable=False, server_default=func.now()
+    )
+
+    def __repr__(self) -> str:
+        return f"<PortfolioDataVersion(version={self.version})>"
+
+
+class SnapshotInvalidation(Base):
+    """Single-row marker of the earliest day whose snapshots are stale.
+
+    Back-dated transactions and cash movements lower ``dirty_from``; the
+    snapshot worker recomputes from that day and clears it.
+    """
+
+    __tablename__ = "snapshot_invalidation"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, default=1)
+    dirty_from: Mapped[date | None] = mapped_column(Date, nullable=True)
+    # 印を付けるたびに増える（処理中に付いた印を消さないための比較に使う）
+    generation: Mapped[int] = mapped_column(BigInteger, nullable=False, default=0)
+    # 連続して失敗した回数（印を付け直すと 0 に戻る）
+    attempts: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), nullable=False, server_default=func.now()
+    )
+
+    def __repr__(self) -> str:
+        return f"<SnapshotInvalidation(dirty_from={self.dirty_from}, generation={self.generation})>"
@@ -0,0 +1,158 @@
+"""
+JSON レスポンスクラス（orjson）
+
+- ORJSONResponse: ハンドラーが直接返す JSON 用。Decimal は文字列で出力する
+  （response_model 経由の Pydantic の JSON 出力と同じ形式で、精度を失わない）
+- FloatJSONResponse: Decimal を数値（float）で出力する。チャート用エンドポイントで
+  numeric=float が指定された場合に使用（クライアントでの数値変換が不要になる）
+- rows_json_response: 一覧系エンドポイントの高速経路。SQL の行（レスポンスモデルの
+  フィールド名でラベル付けした列）を ORM オブジェクトやレスポンスモデルを経由せずに
+  JSON 化する。DB の値は型が保証されているため、レスポンスモデルでの再検証を省略する
+
+アプリ既定の response_class にはしない。response_model を持つエンドポイントは
+FastAPI が Pydantic（Rust 実装）で直接 JSON に変換しており、response_class を指定すると
+その経路が無効になって dict 化 + 再変換になるため（scripts/benchmark_serialization.py）。
+"""
+
+from collections.abc import Collection, Mapping
+from decimal import Decimal
+from typing import Any, Literal
+from uuid import UUID
+
+import orjson
+from fastapi import Response
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel, TypeAdapter
+from sqlalchemy import ColumnElement, Label
+
+# チャート用エンドポイントの金額の出力形式
+NumericFormat = Literal["string", "float"]
+
+# orjson 既定の日時・UUID 出力に加え、dict のキーに数値・日付を許可
+_OPTIONS = orjson.OPT_NON_STR_KEYS
+
+
+def _decimal_as_str(value: Any) -> str:
+    # asyncpg の UUID は uuid.UUID のサブクラスのため orjson が直接扱えない
+    if isinstance(value, Decimal | UUID):
+        return str(value)
+    raise TypeError(f"Type is not JSON serializable: {type(value).__name__}")
+
+
+def _decimal_as_float(value: Any) -> float | str:
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, UUID):
+        return str(value)
+    raise TypeError(f"Type is not JSON serializable: {type(value).__name__}")
+
+
+def dumps(content: Any, numeric: NumericFormat = "string") -> bytes:
+    """
+    orjson で JSON に変換。
+
+    Args:
+        content: dict / list / date / datetime / UUID / Decimal などからなる値
+        numeric: Decimal の出力形式（"string" または "float"）
+
+    Returns:
+        JSON バイト列
+    """
+    default = _decimal_as_float if numeric == "float" else _decimal_as_str
+    return orjson.dumps(content, default=default, option=_OPTIONS)
+
+
+class ORJSONResponse(JSONResponse):
+    """orjson で JSON を出力するレスポンス（Decimal は文字列）"""
+
+    numeric: NumericFormat = "string"
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content, self.numeric)
+
+
+class FloatJSONResponse(ORJSONResponse):
+    """Decimal を数値で出力するレスポンス（チャート用）"""
+
+    numeric: NumericFormat = "float"
+
+
+def model_json_response(
+    adapter: TypeAdapter,
+    data: Any,
+    numeric: NumericFormat,
+    headers: Mapping[str, str] | None = None,
+) -> Any:
+    """
+    金額の出力形式に応じてレスポンスを返す。
+
+    string の場合は data をそのまま返し、FastAPI の response_model による出力に任せる。
+
+    Args:
+        adapter: レスポンスモデルの TypeAdapter
+        data: レスポンスモデルのインスタンス（またはそのリスト）
+        numeric: 金額の出力形式
+        headers: 追加するヘッダー
+
+    Returns:
+        data、または FloatJSONResponse
+    """
+    if numeric != "float":
+        return data
+    return FloatJSONResponse(content=adapter.dump_python(data), headers=headers)
+
+
+def model_columns(
+    model: type[BaseModel],
+    entity: Any,
+    exclude: Collection[str] = (),
+    prefix: str = "",
+    **expressions: ColumnElement,
+) -> list[Label]:
+    """
+    レスポンスモデルのフィールド順に、同名の列をフィールド名でラベル付けして返す。
+
+    モデルにフィールドが追加されて対応する列がない場合はここで AttributeError になるため、
+    高速経路の出力がレスポンスモデルとずれることはない。
+
+    Args:
+        model: レスポンスモデル
+        entity: ORM モデル（列の取得元）
+        exclude: 対象外のフィールド（ネストしたモデルなど）
+        prefix: ラベルの接頭辞（JOIN した別テーブルの列と名前が重なる場合）
+        expressions: 列名と一致しないフィールドの SQL 式
+
+    Returns:
+        select() に渡す列のリスト
+    """
+    columns = []
+    for name in model.model_fields:
+        if name in exclude:
+            continue
+        column = expressions[name] if name in expressions else getattr(entity, name)
+        columns.append(column.label(prefix + name))
+    return columns
+
+
+def rows_json_response(
+    rows: list[dict[str, Any]],
+    response: Response | None = None,
+    numeric: NumericFormat = "string",
+) -> Response:
+    """
+    DB から取得した行を検証せずに JSON レスポンスにする（一覧系エンドポイントの高速経路）。
+
+    出力はレスポンスモデル経由の場合と同じ JSON（Decimal は文字列、日時は ISO 8601）。
+
+    Args:
+        rows: フィールド名をキーとする行（model_columns の列で取得したもの）
+        response: ハンドラーのレスポンス（設定済みヘッダーを引き継ぐ）
+        numeric: Decimal の出力形式
+
+    Returns:
+        JSON レスポンス
+    """
+    headers = {}
+    if response is not None:
+        headers = {k: v for k, v in response.headers.items() if k != "content-length"}
+    return Response(content=dumps(rows, numeric), media_type="application/json", headers=headers)
@@ -7,15 +7,21 @@ Solo Saving API ルーター
 - スナップショット: チャート表示用の日次データ
 - 貯金目標: 目標設定と進捗管理
 - ダッシュボード: 統計情報とポートフォリオ
+- 取引明細取込: 証券会社の約定履歴CSV取込
+- エクスポート: 履歴データの CSV / NDJSON 出力
+- 管理: プロファイリング結果の取得
 
 このモジュールはすべてのルーターを再エクスポートして後方互換性を維持します。
 """
 
+from app.routers.admin import admin_router
 from app.routers.assets import assets_router
 from app.routers.cash import cash_router
 from app.routers.categories import categories_router
 from app.routers.dashboard import dashboard_router
+from app.routers.exports import exports_router
 from app.routers.goals import goals_router
+from app.routers.imports import imports_router
 from app.routers.snapshots import snapshots_router
 
 __all__ = [
@@ -25,4 +31,7 @@ __all__ = [
     "goals_router",
     "dashboard_router",
     "cash_router",
+    "imports_router",
+    "exports_router",
+    "admin_router",
 ]
@@ -0,0 +1,142 @@
+"""
+管理 API ルーター
+
+リクエスト単位のプロファイリング結果とスロークエリレポートの取得
+（PROFILING_TOKEN を設定し、X-Profile-Token ヘッダーで認証）
+"""
+
+import hmac
+
+from fastapi import APIRouter, Depends, Header, HTTPException
+from fastapi.responses import FileResponse, PlainTextResponse
+
+from app.database import settings
+from app.schemas.profile import ProfileResponse
+from app.schemas.slow_query import SlowQueryResponse
+from app.services.profiling import profile_store
+from app.services.slow_queries import slow_query_log
+
+admin_router = APIRouter(
+    prefix="/api/admin",
+    tags=["管理"],
+)
+
+
+def require_admin_token(
+    x_profile_token: str | None = Header(default=None, description="PROFILING_TOKEN の値"),
+) -> None:
+    """
+    管理APIの認証。
+
+    Raises:
+        HTTPException: トークン未設定（404）、またはトークン不一致（403）の場合
+    """
+    if not settings.PROFILING_TOKEN:
+        raise HTTPException(status_code=404, detail="プロファイリングは無効です")
+    if x_profile_token is None or not hmac.compare_digest(
+        x_profile_token.encode(), settings.PROFILING_TOKEN.encode()
+    ):
+        raise HTTPException(status_code=403, detail="トークンが正しくありません")
+
+
+@admin_router.get(
+    "/profiles",
+    response_model=list[ProfileResponse],
+    summary="プロファイル一覧",
+    description="保存済みのプロファイルを新しい順に返します。",
+    dependencies=[Depends(require_admin_token)],
+)
+async def list_profiles():
+    """
+    保存済みプロファイルの一覧を取得。
+
+    Returns:
+        プロファイルID・保存日時・サイズのリスト
+    """
+    return profile_store.entries()
+
+
+@admin_router.get(
+    "/profiles/{profile_id}",
+    response_class=PlainTextResponse,
+    summary="プロファイルのレポート",
+    description="累積時間順のテキストレポートを返します。",
+    dependencies=[Depends(require_admin_token)],
+)
+async def get_profile_report(profile_id: str):
+    """
+    プロファイルのテキストレポートを取得。
+
+    Args:
+        profile_id: プロファイルID（X-Profile-Id ヘッダーの値）
+
+    Returns:
+        pstats のテキストレポート
+
+    Raises:
+        HTTPException: プロファイルが見つからない場合（404）
+    """
+    path = profile_store.path(profile_id, ".txt")
+    if path is None:
+        raise HTTPException(status_code=404, detail="プロファイルが見つかりません")
+    return PlainTextResponse(path.read_text())
+
+
+@admin_router.get(
+    "/profiles/{profile_id}/pstats",
+    response_class=FileResponse,
+    summary="プロファイルのダウンロード",
+    description="pstats 形式のファイルを返します（snakeviz などで可視化できます）。",
+    dependencies=[Depends(require_admin_token)],
+)
+async def download_profile(profile_id: str):
+    """
+    プロファイルを pstats 形式でダウンロード。
+
+    Args:
+        profile_id: プロファイルID
+
+    Returns:
+        pstats ファイル
+
+    Raises:
+        HTTPException: プロファイルが見つからない場合（404）
+    """
+    path = profile_store.path(profile_id, ".pstats")
+    if path is None:
+        raise HTTPException(status_code=404, detail="プロファイルが見つかりません")
+    return FileResponse(
+        path, media_type="application/octet-stream", filename=f"{profile_id}.pstats"
+    )
+
+
+@admin_router.get(
+    "/slow-queries",
+    response_model=list[SlowQueryResponse],
+    summary="スロークエリレポート",
+    description=(
+        "SLOW_QUERY_MS を超えた SQL を形ごとに集計し、合計時間の大きい順に返します。"
+        "SLOW_QUERY_EXPLAIN_RATE を設定すると SELECT の実行計画も含まれます。"
+    ),
+    dependencies=[Depends(require_admin_token)],
+)
+async def list_slow_queries():
+    """
+    スロークエリレポートを取得（このワーカープロセスの集計）。
+
+    Returns:
+        SQLの形ごとの実行回数・合計/最大時間・呼び出し元ルート・実行計画
+    """
+    return slow_query_log.report()
+
+
+@admin_router.delete(
+    "/slow-queries",
+    status_code=204,
+    summary="スロークエリレポートのリセット",
+    description="スロークエリの集計を破棄します。",
+    dependencies=[Depends(require_admin_token)],
+)
+async def clear_slow_queries():
+    """スロークエリの集計をリセット（インデックス追加後の確認などに使用）。"""
+    slow_query_log.clear()
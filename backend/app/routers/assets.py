@@ -4,34 +4,77 @@
 個別銘柄の登録・更新・削除・取得・購入・価格更新
 """
 
-import asyncio
 from datetime import date, datetime, timedelta
 from decimal import Decimal
 from uuid import UUID
 
-import yfinance as yf
-from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy import select
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from pydantic import TypeAdapter
+from sqlalchemy import func, select
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
 
 from app.database import get_db
-from app.models import Asset, AssetHistory, AssetSnapshot, Transaction
+from app.http_cache import conditional_response
+from app.models import (
+    Asset,
+    AssetCategory,
+    AssetHistory,
+    CashLedgerEntry,
+    HoldingInterval,
+    Transaction,
+)
+from app.responses import (
+    NumericFormat,
+    model_columns,
+    model_json_response,
+    rows_json_response,
+)
 from app.schemas.asset import (
     AssetCreate,
+    AssetPurchaseBatchRequest,
+    AssetPurchaseBatchResponse,
+    AssetPurchaseBatchResult,
     AssetPurchaseRequest,
     AssetResponse,
     AssetUpdate,
 )
+from app.schemas.category import AssetCategoryResponse
 from app.schemas.history import AssetHistoryChartData
 from app.schemas.price_history import PriceHistoryData, TransactionData
-from app.services import YFinanceService
+from app.services import PricePoint, YFinanceService, bump_data_version, get_data_version
+from app.services.cash_ledger import (
+    lock_cash_asset,
+    record_cash_movement,
+    record_cash_movements,
+)
+from app.services.holdings import apply_holding_change
+from app.services.snapshot_invalidation import mark_snapshots_dirty
+from app.services.valuation import run_daily_valuation
 
 assets_router = APIRouter(
     prefix="/api/assets",
     tags=["資産"],
 )
 
+# 現金カテゴリID
+CASH_CATEGORY_ID = 4
+
+# 購入で変わる資産のフィールド（一括購入の明細ごとの結果に使う）
+_PURCHASE_FIELDS = ("quantity", "average_cost", "current_price", "current_value", "currency")
+
+# numeric=float の場合の出力用
+_price_history_adapter = TypeAdapter(list[PricePoint])
+
+# 一覧・履歴はレスポンスモデルの列だけを取得し、ORM オブジェクトを経由せず JSON 化する
+_ASSET_COLUMNS = model_columns(AssetResponse, Asset, exclude={"category"})
+_ASSET_CATEGORY_COLUMNS = model_columns(AssetCategoryResponse, AssetCategory, prefix="category_")
+_HISTORY_CHART_COLUMNS = model_columns(
+    AssetHistoryChartData,
+    AssetHistory,
+    date=func.to_char(AssetHistory.record_date, "MM/DD"),
+)
+
 
 @assets_router.get(
     "",
@@ -40,6 +83,8 @@ assets_router = APIRouter(
     description="すべての資産を取得します。カテゴリIDで絞り込み可能。",
 )
 async def get_assets(
+    request: Request,
+    response: Response,
     category_id: int | None = Query(
         default=None,
         description="カテゴリIDで絞り込み（1: 日本株, 2: 米国株, 3: 投資信託, 4: 現金）",
@@ -55,12 +100,143 @@ async def get_assets(
     Returns:
         資産一覧（作成日時の降順）
     """
-    query = select(Asset).options(selectinload(Asset.category))
+    not_modified = conditional_response(
+        request, response, await get_data_version(db), "assets", category_id
+    )
+    if not_modified:
+        return not_modified
+
+    query = select(*_ASSET_COLUMNS, *_ASSET_CATEGORY_COLUMNS).join(Asset.category)
     if category_id:
         query = query.where(Asset.category_id == category_id)
     query = query.order_by(Asset.created_at.desc())
     result = await db.execute(query)
-    return result.scalars().all()
+
+    # カテゴリの列をネストした category にまとめる
+    asset_keys = [c.name for c in _ASSET_COLUMNS]
+    category_keys = [c.name.removeprefix("category_") for c in _ASSET_CATEGORY_COLUMNS]
+    split = len(asset_keys)
+    assets = [
+        {
+            **dict(zip(asset_keys, row[:split], strict=True)),
+            "category": dict(zip(category_keys, row[split:], strict=True)),
+        }
+        for row in result
+    ]
+    return rows_json_response(assets, response)
+
+
+def _purchase_cost_jpy(purchase_data: AssetPurchaseRequest) -> Decimal:
+    """購入代金（円）を計算（2桁に丸める）"""
+    # 日本円換算の単価を計算（2桁に丸める）
+    price_in_jpy = purchase_data.purchase_price
+    if purchase_data.usd_jpy_rate:
+        price_in_jpy = (purchase_data.purchase_price * purchase_data.usd_jpy_rate).quantize(
+            Decimal("0.01")
+        )
+    else:
+        price_in_jpy = price_in_jpy.quantize(Decimal("0.01"))
+
+    return (purchase_data.quantity * price_in_jpy).quantize(Decimal("0.01"))
+
+
+def _apply_additional_purchase(
+    asset: Asset,
+    purchase_data: AssetPurchaseRequest,
+    purchase_cost: Decimal,
+) -> None:
+    """既存資産への追加購入を反映（数量・平均取得単価・評価額・取得総額）"""
+    old_quantity = asset.quantity
+    old_avg_cost = asset.average_cost or Decimal("0")
+    new_quantity = purchase_data.quantity
+
+    # 取得単価（保存用）: USDならドルのまま、JPYなら円
+    # purchase_price はユーザー入力の単価（USDならドル、JPYなら円）
+    input_price = purchase_data.purchase_price
+
+    # 平均取得単価の計算（加重平均）
+    total_quantity = old_quantity + new_quantity
+    if total_quantity > 0:
+        new_avg_cost = (
+            (old_quantity * old_avg_cost) + (new_quantity * input_price)
+        ) / total_quantity
+        new_avg_cost = new_avg_cost.quantize(Decimal("0.01"))
+    else:
+        new_avg_cost = input_price.quantize(Decimal("0.01"))
+
+    # current_value (評価額) は常に日本円で保存
+    # 米国株の場合: 数量 * 現在価格(USD) * レート
+    # 日本株の場合: 数量 * 現在価格(JPY)
+    # ここでは「購入直後」なので、購入価格を現在価格とする
+
+    current_price = input_price  # Native currency
+
+    if purchase_data.currency == "USD":
+        # USDの場合: USD価格 * 数量 * レート
+        current_value_jpy = (
+            total_quantity * current_price * (purchase_data.usd_jpy_rate or Decimal("1"))
+        ).quantize(Decimal("0.01"))
+    else:
+        # JPYの場合
+        current_value_jpy = (total_quantity * current_price).quantize(Decimal("0.01"))
+
+    asset.quantity = total_quantity
+    asset.average_cost = new_avg_cost
+    asset.current_price = current_price
+    asset.current_value = current_value_jpy
+    asset.total_cost_jpy = (asset.total_cost_jpy or Decimal("0")) + purchase_cost
+
+    # 通貨情報は既存のものを維持（または更新？）
+    # 米国株カテゴリの場合でも、amount系フィールドが円表記なら currency="JPY" にすべきか？
+    # 現状は purchase_data.currency を優先する実装になっていたが、
+    # 値を円にするなら currency も JPY にすべきかもしれないが、
+    # 「米国株」であることを示すために USD のままにする（値だけ円換算）運用と仮定
+    if purchase_data.currency:
+        asset.currency = purchase_data.currency
+
+
+def _new_asset_from_purchase(purchase_data: AssetPurchaseRequest, purchase_cost: Decimal) -> Asset:
+    """新規購入の資産を作成"""
+    # 保存する単価・価格は「元の通貨」のままにする
+    asset_price = purchase_data.purchase_price  # Native currency
+
+    return Asset(
+        category_id=purchase_data.category_id,
+        name=purchase_data.name,
+        ticker_symbol=purchase_data.ticker_symbol,
+        quantity=purchase_data.quantity,
+        # 元の通貨のまま保存
+        average_cost=asset_price,
+        current_price=asset_price,
+        # 評価額は常に日本円
+        current_value=purchase_cost,
+        # 取得総額(JPY)
+        total_cost_jpy=purchase_cost,
+        currency=purchase_data.currency,
+        created_at=datetime.combine(purchase_data.purchase_date, datetime.min.time())
+        if purchase_data.purchase_date
+        else datetime.now(),
+    )
+
+
+def _purchase_transaction(
+    asset_id: UUID,
+    purchase_data: AssetPurchaseRequest,
+    purchase_cost: Decimal,
+) -> Transaction:
+    """購入の取引履歴レコードを作成"""
+    return Transaction(
+        asset_id=asset_id,
+        transaction_type="buy",
+        quantity=purchase_data.quantity,
+        price=purchase_data.purchase_price,
+        usd_jpy_rate=purchase_data.usd_jpy_rate,
+        currency=purchase_data.currency,
+        total_cost_jpy=purchase_cost,  # Calculated at purchase time
+        transaction_date=datetime.combine(
+            purchase_data.purchase_date or date.today(), datetime.min.time()
+        ),
+    )
 
 
 @assets_router.post(
@@ -87,6 +263,11 @@ async def purchase_asset(
         作成/更新された資産情報
     """
     asset_ticker = purchase_data.ticker_symbol
+    total_purchase_cost = _purchase_cost_jpy(purchase_data)
+
+    # 現金資産を先にロックする（一括購入・入出金と直列化し、同じ銘柄の新規作成の重複や
+    # 数量・残高の更新の取りこぼしを防ぐ）
+    cash_asset = await lock_cash_asset(db)
 
     # 既存の資産を検索（ティッカーシンボルで照合）
     result = await db.execute(
@@ -96,24 +277,88 @@ async def purchase_asset(
     )
     existing_asset = result.scalar_one_or_none()
 
-    # 日本円換算の単価を計算（2桁に丸める）
-    price_in_jpy = purchase_data.purchase_price
-    if purchase_data.usd_jpy_rate:
-        price_in_jpy = (purchase_data.purchase_price * purchase_data.usd_jpy_rate).quantize(
-            Decimal("0.01")
+    if not cash_asset or cash_asset.quantity < total_purchase_cost:
+        raise HTTPException(
+            status_code=400,
+            detail=(
+                f"現金残高が不足しています。必要額: ¥{total_purchase_cost:,.0f}, "
+                f"残高: ¥{cash_asset.quantity if cash_asset else 0:,.0f}"
+            ),
         )
+
+    # 現金から差し引き（後ほどまとめてcommitされる）
+    cash_asset.quantity = (cash_asset.quantity - total_purchase_cost).quantize(Decimal("0.01"))
+    cash_asset.current_value = cash_asset.quantity
+
+    if existing_asset:
+        # 追加購入: 平均取得単価を再計算
+        _apply_additional_purchase(existing_asset, purchase_data, total_purchase_cost)
+        asset = existing_asset
     else:
-        price_in_jpy = price_in_jpy.quantize(Decimal("0.01"))
+        # 新規購入: 新しい資産として作成
+        asset = _new_asset_from_purchase(purchase_data, total_purchase_cost)
+        db.add(asset)
+        await db.flush()  # to get asset.id
+
+    # Create Transaction record
+    transaction = _purchase_transaction(asset.id, purchase_data, total_purchase_cost)
+    db.add(transaction)
+    await apply_holding_change(db, asset.id, transaction.transaction_date, purchase_data.quantity)
+    await db.flush()  # to get transaction.id
+    await record_cash_movement(
+        db,
+        entry_date=transaction.transaction_date.date(),
+        amount=-total_purchase_cost,
+        entry_type="buy",
+        note=f"{purchase_data.name} 購入",
+        transaction_id=transaction.id,
+    )
 
-    # 現在評価額（円）- 2桁に丸める
-    current_value_jpy = (purchase_data.quantity * price_in_jpy).quantize(Decimal("0.01"))
-    total_purchase_cost = current_value_jpy
+    await bump_data_version(db)
+    await db.commit()
+    # カテゴリを含めて再取得
+    result = await db.execute(
+        select(Asset).options(selectinload(Asset.category)).where(Asset.id == asset.id)
+    )
+    return result.scalar_one()
 
-    # 現金から差し引き
-    # 現金カテゴリID = 4 (CASH_CATEGORY_ID)
-    CASH_CATEGORY_ID = 4
-    cash_result = await db.execute(select(Asset).where(Asset.category_id == CASH_CATEGORY_ID))
-    cash_asset = cash_result.scalar_one_or_none()
+
+@assets_router.post(
+    "/purchase/batch",
+    response_model=AssetPurchaseBatchResponse,
+    status_code=201,
+    summary="株一括購入",
+    description=(
+        "複数の購入を 1 トランザクションで処理します。"
+        "現金残高は合計額で一度だけ検証され、いずれかが失敗した場合はすべて取り消されます。"
+    ),
+)
+async def purchase_assets_batch(
+    batch_data: AssetPurchaseBatchRequest,
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    株を一括購入。
+
+    リバランスや積立購入の取り込み向け。現金資産の行をロックして合計必要額を
+    一度だけ検証し、資産の作成/更新と取引履歴の登録をまとめて行います。
+    同じ銘柄が複数行ある場合は行の順に追加購入として処理します。
+
+    Args:
+        batch_data: 購入明細のリスト
+
+    Returns:
+        合計購入額、購入後の現金残高、明細ごとの結果
+
+    Raises:
+        400: 現金残高が合計必要額に満たない場合
+    """
+    purchases = batch_data.purchases
+    costs = [_purchase_cost_jpy(p) for p in purchases]
+    total_purchase_cost = sum(costs, Decimal("0"))
+
+    # 現金資産をロックして合計額で一度だけ検証
+    cash_asset = await lock_cash_asset(db)
 
     if not cash_asset or cash_asset.quantity < total_purchase_cost:
         raise HTTPException(
@@ -126,127 +371,86 @@ async def purchase_asset(
 
     cash_asset.quantity = (cash_asset.quantity - total_purchase_cost).quantize(Decimal("0.01"))
     cash_asset.current_value = cash_asset.quantity
-    # 現金の更新は後ほどまとめてcommitされる
 
-    if existing_asset:
-        # 追加購入: 平均取得単価を再計算
-        old_quantity = existing_asset.quantity
-        old_avg_cost = existing_asset.average_cost or Decimal("0")
-        new_quantity = purchase_data.quantity
-
-        # 取得単価（保存用）: USDならドルのまま、JPYなら円
-        # purchase_price はユーザー入力の単価（USDならドル、JPYなら円）
-        input_price = purchase_data.purchase_price
-
-        # 平均取得単価の計算（加重平均）
-        total_quantity = old_quantity + new_quantity
-        if total_quantity > 0:
-            new_avg_cost = (
-                (old_quantity * old_avg_cost) + (new_quantity * input_price)
-            ) / total_quantity
-            new_avg_cost = new_avg_cost.quantize(Decimal("0.01"))
+    # 対象銘柄の既存資産を 1 クエリで取得
+    tickers = {p.ticker_symbol for p in purchases}
+    result = await db.execute(select(Asset).where(Asset.ticker_symbol.in_(tickers)))
+    assets_by_ticker = {a.ticker_symbol: a for a in result.scalars().all()}
+
+    # 資産の作成/更新（新規資産はまとめて INSERT）
+    line_assets: list[Asset] = []
+    # 明細ごとの反映直後の保有状態（同じ銘柄の後続の明細で上書きされる前の値）
+    line_states: list[dict] = []
+    new_assets: list[Asset] = []
+    for purchase, cost in zip(purchases, costs, strict=True):
+        asset = assets_by_ticker.get(purchase.ticker_symbol)
+        if asset is None:
+            asset = _new_asset_from_purchase(purchase, cost)
+            assets_by_ticker[purchase.ticker_symbol] = asset
+            new_assets.append(asset)
         else:
-            new_avg_cost = input_price.quantize(Decimal("0.01"))
-
-        # current_value (評価額) は常に日本円で保存
-        # 米国株の場合: 数量 * 現在価格(USD) * レート
-        # 日本株の場合: 数量 * 現在価格(JPY)
-        # ここでは「購入直後」なので、購入価格を現在価格とする
+            _apply_additional_purchase(asset, purchase, cost)
+        line_assets.append(asset)
+        line_states.append({field: getattr(asset, field) for field in _PURCHASE_FIELDS})
+    db.add_all(new_assets)
+    await db.flush()
 
-        current_price = input_price  # Native currency
+    # 取引履歴をまとめて INSERT
+    transactions = [
+        _purchase_transaction(asset.id, purchase, cost)
+        for purchase, cost, asset in zip(purchases, costs, line_assets, strict=True)
+    ]
+    db.add_all(transactions)
+    await db.flush()
 
-        if purchase_data.currency == "USD":
-            # USDの場合: USD価格 * 数量 * レート
-            current_value_jpy = (
-                total_quantity * current_price * (purchase_data.usd_jpy_rate or Decimal("1"))
-            ).quantize(Decimal("0.01"))
-        else:
-            # JPYの場合
-            current_value_jpy = (total_quantity * current_price).quantize(Decimal("0.01"))
-
-        existing_asset.quantity = total_quantity
-        existing_asset.average_cost = new_avg_cost
-        existing_asset.current_price = current_price
-        existing_asset.current_value = current_value_jpy
-        existing_asset.total_cost_jpy = (
-            existing_asset.total_cost_jpy or Decimal("0")
-        ) + total_purchase_cost
-
-        # 通貨情報は既存のものを維持（または更新？）
-        # 米国株カテゴリの場合でも、amount系フィールドが円表記なら currency="JPY" にすべきか？
-        # 現状は purchase_data.currency を優先する実装になっていたが、
-        # 値を円にするなら currency も JPY にすべきかもしれないが、
-        # 「米国株」であることを示すために USD のままにする（値だけ円換算）運用と仮定
-        if purchase_data.currency:
-            existing_asset.currency = purchase_data.currency
-
-        # Create Transaction record
-        transaction = Transaction(
-            asset_id=existing_asset.id,
-            transaction_type="buy",
-            quantity=purchase_data.quantity,
-            price=purchase_data.purchase_price,
-            usd_jpy_rate=purchase_data.usd_jpy_rate,
-            currency=purchase_data.currency,
-            total_cost_jpy=current_value_jpy,  # Calculated at purchase time
-            transaction_date=datetime.combine(
-                purchase_data.purchase_date or date.today(), datetime.min.time()
-            ),
-        )
-        db.add(transaction)
+    # 保有区間は (資産, 取引日) ごとに数量を合算して反映
+    holding_deltas: dict[tuple[UUID, date], Decimal] = {}
+    for purchase, asset, transaction in zip(purchases, line_assets, transactions, strict=True):
+        key = (asset.id, transaction.transaction_date.date())
+        holding_deltas[key] = holding_deltas.get(key, Decimal("0")) + purchase.quantity
+    for (asset_id, trade_date), quantity_delta in holding_deltas.items():
+        await apply_holding_change(db, asset_id, trade_date, quantity_delta)
+
+    await record_cash_movements(
+        db,
+        [
+            CashLedgerEntry(
+                entry_date=transaction.transaction_date.date(),
+                amount=-cost,
+                entry_type="buy",
+                note=f"{purchase.name} 購入",
+                transaction_id=transaction.id,
+            )
+            for purchase, cost, transaction in zip(purchases, costs, transactions, strict=True)
+        ],
+    )
 
-        await db.commit()
-        # カテゴリを含めて再取得
-        result = await db.execute(
-            select(Asset).options(selectinload(Asset.category)).where(Asset.id == existing_asset.id)
-        )
-        return result.scalar_one()
-    else:
-        # 新規購入: 新しい資産として作成
-        # 保存する単価・価格は「元の通貨」のままにする
-        asset_price = purchase_data.purchase_price  # Native currency
-
-        new_asset = Asset(
-            category_id=purchase_data.category_id,
-            name=purchase_data.name,
-            ticker_symbol=purchase_data.ticker_symbol,
-            quantity=purchase_data.quantity,
-            # 元の通貨のまま保存
-            average_cost=asset_price,
-            current_price=asset_price,
-            # 評価額は常に日本円
-            current_value=current_value_jpy,
-            # 取得総額(JPY)
-            total_cost_jpy=total_purchase_cost,
-            currency=purchase_data.currency,
-            created_at=datetime.combine(purchase_data.purchase_date, datetime.min.time())
-            if purchase_data.purchase_date
-            else datetime.now(),
-        )
-        db.add(new_asset)
-        await db.flush()  # to get new_asset.id
-
-        # Create Transaction record
-        transaction = Transaction(
-            asset_id=new_asset.id,
-            transaction_type="buy",
-            quantity=purchase_data.quantity,
-            price=purchase_data.purchase_price,
-            usd_jpy_rate=purchase_data.usd_jpy_rate,
-            currency=purchase_data.currency,
-            total_cost_jpy=current_value_jpy,  # Calculated at purchase time
-            transaction_date=datetime.combine(
-                purchase_data.purchase_date or date.today(), datetime.min.time()
-            ),
-        )
-        db.add(transaction)
+    await bump_data_version(db)
+    await db.commit()
 
-        await db.commit()
-        # カテゴリを含めて再取得
-        result = await db.execute(
-            select(Asset).options(selectinload(Asset.category)).where(Asset.id == new_asset.id)
-        )
-        return result.scalar_one()
+    # カテゴリを含めて再取得（1 クエリ）
+    result = await db.execute(
+        select(Asset)
+        .options(selectinload(Asset.category))
+        .where(Asset.id.in_({a.id for a in line_assets}))
+    )
+    refreshed = {a.id: a for a in result.scalars().all()}
+
+    return AssetPurchaseBatchResponse(
+        total_cost_jpy=total_purchase_cost,
+        cash_balance=cash_asset.quantity,
+        results=[
+            AssetPurchaseBatchResult(
+                index=i,
+                transaction_id=transaction.id,
+                cost_jpy=cost,
+                asset=AssetResponse.model_validate(refreshed[asset.id]).model_copy(update=state),
+            )
+            for i, (cost, asset, transaction, state) in enumerate(
+                zip(costs, line_assets, transactions, line_states, strict=True)
+            )
+        ],
+    )
 
 
 @assets_router.get(
@@ -256,6 +460,8 @@ async def purchase_asset(
     description="指定されたIDの資産を取得します。",
 )
 async def get_asset(
+    request: Request,
+    response: Response,
     asset_id: UUID,
     db: AsyncSession = Depends(get_db),
 ):
@@ -271,6 +477,12 @@ async def get_asset(
     Raises:
         404: 資産が見つからない場合
     """
+    not_modified = conditional_response(
+        request, response, await get_data_version(db), "asset", asset_id
+    )
+    if not_modified:
+        return not_modified
+
     result = await db.execute(
         select(Asset).options(selectinload(Asset.category)).where(Asset.id == asset_id)
     )
@@ -303,6 +515,13 @@ async def create_asset(
     asset = Asset(**asset_data.model_dump())
     db.add(asset)
     await db.flush()
+    if asset.category_id == CASH_CATEGORY_ID:
+        if asset.quantity:
+            await record_cash_movement(db, date.today(), asset.quantity, "adjustment")
+    else:
+        await apply_holding_change(db, asset.id, date.today(), asset.quantity)
+    await bump_data_version(db)
+    await db.flush()
     await db.refresh(asset, ["category"])
     return asset
 
@@ -336,12 +555,24 @@ async def update_asset(
     if not asset:
         raise HTTPException(status_code=404, detail="資産が見つかりません")
 
+    old_quantity = asset.quantity
     update_data = asset_data.model_dump(exclude_unset=True)
     for field, value in update_data.items():
         setattr(asset, field, value)
 
+    # 数量の直接変更は本日付の保有数量（現金なら残高調整）の変化として記録する
+    if asset.quantity != old_quantity:
+        if asset.category_id == CASH_CATEGORY_ID:
+            await record_cash_movement(
+                db, date.today(), asset.quantity - old_quantity, "adjustment"
+            )
+        else:
+            await apply_holding_change(db, asset.id, date.today(), asset.quantity - old_quantity)
+
+    await bump_data_version(db)
     await db.flush()
-    await db.refresh(asset, ["category"])
+    # updated_at は onupdate で失効しているため、カテゴリと一緒に読み直す
+    await db.refresh(asset, ["category", "updated_at"])
     return asset
 
 
@@ -368,7 +599,20 @@ async def delete_asset(
     asset = result.scalar_one_or_none()
     if not asset:
         raise HTTPException(status_code=404, detail="資産が見つかりません")
+
+    # 履歴・取引・保有区間も連鎖して消えるため、保有していた最初の日から再計算させる
+    first_held = await db.scalar(
+        select(func.min(HoldingInterval.valid_from)).where(HoldingInterval.asset_id == asset.id)
+    )
+    first_recorded = await db.scalar(
+        select(func.min(AssetHistory.record_date)).where(AssetHistory.asset_id == asset.id)
+    )
+    affected = [d for d in (first_held, first_recorded) if d is not None]
+    if affected:
+        await mark_snapshots_dirty(db, min(affected))
+
     await db.delete(asset)
+    await bump_data_version(db)
 
 
 @assets_router.get(
@@ -384,6 +628,10 @@ async def get_asset_history(
         le=365,
         description="取得日数（最大365日）",
     ),
+    numeric: NumericFormat = Query(
+        default="string",
+        description="金額の出力形式: string（既定、精度を保持）/ float（数値、チャート描画用）",
+    ),
     db: AsyncSession = Depends(get_db),
 ):
     """
@@ -392,6 +640,7 @@ async def get_asset_history(
     Args:
         asset_id: 資産ID（UUID）
         days: 取得日数（デフォルト30日）
+        numeric: 金額の出力形式（"float" の場合は文字列ではなく数値で返す）
 
     Returns:
         価格履歴リスト（日付、価格、評価額）
@@ -408,274 +657,45 @@ async def get_asset_history(
     # 履歴を取得
     start_date = date.today() - timedelta(days=days)
     query = (
-        select(AssetHistory)
+        select(*_HISTORY_CHART_COLUMNS)
         .where(AssetHistory.asset_id == asset_id)
         .where(AssetHistory.record_date >= start_date)
         .order_by(AssetHistory.record_date)
     )
     result = await db.execute(query)
-    histories = result.scalars().all()
-
-    return [
-        AssetHistoryChartData(
-            date=h.record_date.strftime("%m/%d"),
-            price=h.price,
-            value=h.value,
-        )
-        for h in histories
-    ]
+    return rows_json_response([dict(row) for row in result.mappings()], numeric=numeric)
 
 
 @assets_router.post(
     "/refresh",
     summary="資産価格更新",
-    description="外部API(yfinance)から最新の株価・為替を取得し、すべての資産の評価額を更新します。",
+    description=(
+        "外部API(yfinance)から株価・為替を取得し、資産履歴・スナップショット・"
+        "各資産の評価額を更新します。未取得・暫定の日だけを取得します。"
+    ),
 )
-async def refresh_asset_prices(db: AsyncSession = Depends(get_db)):
-    """
-    全資産の価格を再取得して更新する。
-    同時に、前回のスナップショットから昨日までの期間のデータが欠損していれば
-    自動的にバックフィル（過去データの補完）を行う。
+async def refresh_asset_prices(
+    start_date: date | None = Query(
+        default=None, description="評価の開始日（省略時は最新スナップショットの日付）"
+    ),
+    db: AsyncSession = Depends(get_db),
+):
     """
-    # 1. 資産があるか確認
-    result = await db.execute(select(Asset).options(selectinload(Asset.category)))
-    assets = result.scalars().all()
-
-    if not assets:
-        return {"message": "No assets to update", "updated_count": 0}
+    日次評価パイプラインを実行する（scripts/update_daily.py と同じ処理）。
 
-    today = date.today()
-    yesterday = today - timedelta(days=1)
+    前回のスナップショットから本日までの欠損・暫定の日を補完し、
+    スナップショットと各資産の現在価格・評価額を更新する。
 
-    # 2. 自動バックフィル処理
-    # 最新のスナップショット日付を取得
-    latest_snap_result = await db.execute(
-        select(AssetSnapshot.snapshot_date).order_by(AssetSnapshot.snapshot_date.desc()).limit(1)
-    )
-    latest_snap_date = latest_snap_result.scalar_one_or_none()
-
-    # スナップショットが全くない場合は、過去データを作りすぎないように「昨日」だけ作る、
-    # あるいは「作成日」から作るなどの戦略があるが、
-    # ここでは簡易的に「直近30日以内なら埋める」などの制限を設けてもよい。
-    # 今回は「最新スナップショットの翌日 〜 昨日」を埋める。
-
-    start_backfill_date = None
-    if latest_snap_date:
-        if latest_snap_date < yesterday:
-            start_backfill_date = latest_snap_date + timedelta(days=1)
-
-    # 3. yfinanceから現在価格と（必要なら）履歴を取得する関数
-    def fetch_market_data(backfill_start: date | None):
-        updated_data = {}  # 現在価格 {ticker: {price, currency, rate}}
-        history_data = {}  # 履歴 {date: {ticker: price_jpy}}
-
-        # ... (既存の現在価格取得ロジック + 履歴取得)
-
-        # 通貨レートの履歴も必要
-        usdjpy_history = {}  # {date: rate}
-
-        # ---------------------------------------------------------
-        # A. 現在価格とレートの取得 (既存ロジック)
-        # ---------------------------------------------------------
-        # 1. 為替レート
-        usdjpy_rate = Decimal("150.0")
-        try:
-            usdjpy_ticker = yf.Ticker("USDJPY=X")
-            try:
-                usdjpy_rate = Decimal(str(usdjpy_ticker.fast_info.last_price))
-            except Exception:
-                hist = usdjpy_ticker.history(period="1d")
-                if not hist.empty:
-                    usdjpy_rate = Decimal(str(hist["Close"].iloc[-1]))
-        except Exception:
-            pass
-
-        # ---------------------------------------------------------
-        # B. バックフィル用の履歴データ取得 (必要な場合のみ)
-        # ---------------------------------------------------------
-        if backfill_start:
-            # yfinanceのhistoryは start(inclusive), end(exclusive)
-            # 昨日まで含めるには end = today
-            yf_start = backfill_start.strftime("%Y-%m-%d")
-            yf_end = today.strftime("%Y-%m-%d")
-
-            # 為替履歴
-            try:
-                usdjpy_hist = yf.Ticker("USDJPY=X").history(start=yf_start, end=yf_end)
-                for dt, row in usdjpy_hist.iterrows():
-                    d_date = dt.date()
-                    usdjpy_history[d_date] = Decimal(str(row["Close"]))
-            except Exception as e:
-                print(f"Failed to fetch USDJPY history: {e}")
-
-            # 各銘柄の履歴
-            # まとめて取得したほうが早いが、現状のリスト構造的にループで処理
-            all_tickers = [a.ticker_symbol for a in assets if a.ticker_symbol]
-
-            for ticker_symbol in all_tickers:
-                try:
-                    sym = ticker_symbol
-                    is_jp = sym.isdigit() or sym.endswith(".T")
-                    if is_jp and not sym.endswith(".T"):
-                        sym += ".T"
-
-                    hist = yf.Ticker(sym).history(start=yf_start, end=yf_end)
-
-                    for dt, row in hist.iterrows():
-                        d_date = dt.date()
-                        price = Decimal(str(row["Close"]))
-
-                        if d_date not in history_data:
-                            history_data[d_date] = {}
-
-                        # 日本円に換算して保存（スナップショット用）
-                        rate = Decimal("1.0")
-                        if not is_jp:  # US stock
-                            # 履歴がない場合は最新レートで代用
-                            rate = usdjpy_history.get(d_date, usdjpy_rate)
-
-                        history_data[d_date][ticker_symbol] = (price * rate).quantize(
-                            Decimal("0.01")
-                        )
-
-                except Exception as e:
-                    print(f"Failed to fetch history for {ticker_symbol}: {e}")
-
-        # ---------------------------------------------------------
-        # C. 現在価格の取得 (既存ロジック再利用)
-        # ---------------------------------------------------------
-        # カテゴリ分類
-        us_assets_list = [a for a in assets if a.category_id == 2 and a.ticker_symbol]
-        jp_assets_list = [a for a in assets if a.category_id == 1 and a.ticker_symbol]
-
-        for asset in us_assets_list:
-            try:
-                t = yf.Ticker(asset.ticker_symbol)
-                price_usd = Decimal(str(t.fast_info.last_price))
-                updated_data[asset.ticker_symbol] = {
-                    "price": price_usd,
-                    "currency": "USD",
-                    "rate": usdjpy_rate,
-                }
-            except Exception as e:
-                print(f"Failed to fetch US stock {asset.ticker_symbol}: {e}")
-
-        for asset in jp_assets_list:
-            try:
-                sym = asset.ticker_symbol
-                if not sym.endswith(".T"):
-                    sym += ".T"
-                t = yf.Ticker(sym)
-                price_jpy = Decimal(str(t.fast_info.last_price))
-                updated_data[asset.ticker_symbol] = {
-                    "price": price_jpy,
-                    "currency": "JPY",
-                    "rate": Decimal("1.0"),
-                }
-            except Exception as e:
-                print(f"Failed to fetch JP stock {asset.ticker_symbol}: {e}")
-
-        return updated_data, usdjpy_rate, history_data
-
-    # スレッドプールで実行
-    loop = asyncio.get_event_loop()
-    market_data, current_rate, history_data = await loop.run_in_executor(
-        None, fetch_market_data, start_backfill_date
-    )
-
-    # 4. バックフィルデータの保存 (AssetSnapshot作成)
-    if history_data:
-        # 現金資産を取得 (スナップショット計算用)
-        # ※本来は現金の履歴も必要だが、ここでは「現在の現金残高」を過去にも持っていたと仮定する
-        # （より正確にするにはTransaction履歴から逆算する必要があるが今回は簡易実装）
-        cash_result = await db.execute(select(Asset).where(Asset.category_id == 4))
-        cash_asset = cash_result.scalar_one_or_none()
-        current_cash = cash_asset.quantity if cash_asset else Decimal("0")
-
-        new_snapshots = []
-        sorted_dates = sorted(history_data.keys())
-
-        for d_date in sorted_dates:
-            daily_prices = history_data[d_date]  # {ticker: price_jpy}
-
-            # 日次集計
-            total_jp_stocks = Decimal("0")
-            total_us_stocks = Decimal("0")
-            total_trusts = Decimal("0")
-            total_cash = current_cash
-
-            # 資産ごとの計算
-            for asset in assets:
-                val = Decimal("0")
-                if asset.ticker_symbol and asset.ticker_symbol in daily_prices:
-                    # 履歴価格 * 現在の数量
-                    val = (daily_prices[asset.ticker_symbol] * asset.quantity).quantize(
-                        Decimal("0.01")
-                    )
-                elif asset.category_id != 4:
-                    # Tickerがない、または履歴が取れなかった場合
-                    # 現在の評価額を代用（あるいは0にする）
-                    val = asset.current_value or Decimal("0")
-
-                if asset.category_id == 1:
-                    total_jp_stocks += val
-                elif asset.category_id == 2:
-                    total_us_stocks += val
-                elif asset.category_id == 3:
-                    # 投資信託はTickerがない場合が多いので現在値を使うことが多い
-                    # 一律 現在値を使用
-                    if not asset.ticker_symbol:
-                        total_trusts += asset.current_value or Decimal("0")
-                    else:
-                        total_trusts += val
-
-            total_assets = total_jp_stocks + total_us_stocks + total_trusts + total_cash
-
-            # スナップショット作成
-            snapshot = AssetSnapshot(
-                snapshot_date=d_date,
-                japanese_stocks=total_jp_stocks,
-                us_stocks=total_us_stocks,
-                investment_trusts=total_trusts,
-                cash=total_cash,
-                total_assets=total_assets,
-            )
-            new_snapshots.append(snapshot)
-
-        if new_snapshots:
-            db.add_all(new_snapshots)
-
-    # 5. 現在価格の更新 (既存ロジック)
-    updated_count = 0
-
-    for asset in assets:
-        if not asset.ticker_symbol:
-            continue
-
-        data = market_data.get(asset.ticker_symbol)
-        if data:
-            if data["currency"] == "USD":
-                # USDの場合: current_priceはUSDのまま保存
-                asset.current_price = data["price"].quantize(Decimal("0.01"))
-                # current_valueはJPYに換算して保存 (Price(USD) * Quantity * Rate)
-                asset.current_value = (
-                    asset.current_price * asset.quantity * data["rate"]
-                ).quantize(Decimal("0.01"))
-            else:
-                # JPYの場合
-                asset.current_price = data["price"].quantize(Decimal("0.01"))
-                asset.current_value = (asset.current_price * asset.quantity).quantize(
-                    Decimal("0.01")
-                )
-
-            updated_count += 1
-
-    await db.commit()
+    Args:
+        start_date: 評価の開始日
 
+    Returns:
+        更新件数・為替レートと実行結果
+    """
+    result = await run_daily_valuation(db, start_date=start_date)
     return {
         "message": "Assets updated successfully",
-        "updated_count": updated_count,
-        "usd_jpy_rate": current_rate,
+        **result.as_dict(),
     }
 
 
@@ -691,6 +711,10 @@ async def get_asset_price_history(
         default="1mo",
         description="取得期間 (7d, 1mo, 3mo, 1y, max)",
     ),
+    numeric: NumericFormat = Query(
+        default="string",
+        description="金額の出力形式: string（既定、精度を保持）/ float（数値、チャート描画用）",
+    ),
     db: AsyncSession = Depends(get_db),
 ):
     """
@@ -699,6 +723,7 @@ async def get_asset_price_history(
     Args:
         asset_id: 資産ID（UUID）
         period: 取得期間（7d, 1mo, 3mo, 1y, max）
+        numeric: 金額の出力形式（"float" の場合は文字列ではなく数値で返す）
 
     Returns:
         価格履歴リスト（日付、始値、高値、安値、終値、出来高）
@@ -724,14 +749,14 @@ async def get_asset_price_history(
 
     # yfinanceから価格データを取得
     try:
-        price_history = YFinanceService.get_price_history(
+        price_history = await YFinanceService.fetch_price_history(
             ticker_symbol=asset.ticker_symbol,
             category_id=asset.category_id,
             period=period,
         )
-        return price_history
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e)) from e
+    return model_json_response(_price_history_adapter, price_history, numeric)
 
 
 @assets_router.get(
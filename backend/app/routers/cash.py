@@ -4,6 +4,7 @@
 入金・出金の処理
 """
 
+from datetime import date
 from decimal import Decimal
 
 from fastapi import APIRouter, Depends, HTTPException
@@ -14,6 +15,8 @@ from sqlalchemy.orm import selectinload
 from app.database import get_db
 from app.models import Asset
 from app.schemas.asset import AssetResponse, CashTransactionRequest
+from app.services import bump_data_version
+from app.services.cash_ledger import lock_cash_asset, record_cash_movement
 
 cash_router = APIRouter(
     prefix="/api/cash",
@@ -44,13 +47,8 @@ async def cash_transaction(
     Returns:
         更新された現金資産情報
     """
-    # 現金資産を取得または作成
-    result = await db.execute(
-        select(Asset)
-        .options(selectinload(Asset.category))
-        .where(Asset.category_id == CASH_CATEGORY_ID)
-    )
-    cash_asset = result.scalar_one_or_none()
+    # 現金資産を取得または作成（購入と同時に実行されても残高を失わないよう行をロック）
+    cash_asset = await lock_cash_asset(db)
 
     amount = transaction.amount.quantize(Decimal("0.01"))
 
@@ -89,6 +87,16 @@ async def cash_transaction(
             detail="transaction_type は 'deposit' または 'withdraw' を指定してください",
         )
 
+    # 入出金を現金台帳に記録
+    await record_cash_movement(
+        db,
+        entry_date=date.today(),
+        amount=amount if transaction.transaction_type == "deposit" else -amount,
+        entry_type=transaction.transaction_type,
+        note=transaction.note,
+    )
+
+    await bump_data_version(db)
     await db.commit()
 
     # 再取得してレスポンス
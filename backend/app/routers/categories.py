@@ -4,13 +4,15 @@
 マスタデータ（日本株、米国株、投資信託、現金）の取得
 """
 
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Request, Response
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.database import get_db
+from app.http_cache import conditional_response
 from app.models import AssetCategory
 from app.schemas.category import AssetCategoryResponse
+from app.services import get_data_version
 
 categories_router = APIRouter(
     prefix="/api/categories",
@@ -24,12 +26,22 @@ categories_router = APIRouter(
     summary="カテゴリ一覧取得",
     description="すべての資産カテゴリを取得します。",
 )
-async def get_categories(db: AsyncSession = Depends(get_db)):
+async def get_categories(
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_db),
+):
     """
     資産カテゴリの一覧を取得。
 
+    データバージョンが変わっていなければ 304 を返します。
+
     Returns:
         カテゴリ一覧（日本株、米国株、投資信託、現金）
     """
+    not_modified = conditional_response(request, response, await get_data_version(db), "categories")
+    if not_modified:
+        return not_modified
+
     result = await db.execute(select(AssetCategory).order_by(AssetCategory.id))
     return result.scalars().all()
@@ -6,39 +6,29 @@
 
 from decimal import Decimal
 
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Request, Response
+from pydantic import TypeAdapter
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
 
 from app.database import get_db
+from app.http_cache import cached_json_response, conditional_response, prime_json_cache
 from app.models import Asset, AssetCategory, AssetSnapshot
 from app.schemas.dashboard import DashboardStats, PortfolioItem
+from app.services import get_data_version
 
 dashboard_router = APIRouter(
     prefix="/api/dashboard",
     tags=["ダッシュボード"],
 )
 
+_stats_adapter = TypeAdapter(DashboardStats)
+_portfolio_adapter = TypeAdapter(list[PortfolioItem])
 
-@dashboard_router.get(
-    "/stats",
-    response_model=DashboardStats,
-    summary="統計情報取得",
-    description="ダッシュボードに表示する統計情報を取得します。",
-)
-async def get_dashboard_stats(db: AsyncSession = Depends(get_db)):
-    """
-    ダッシュボードの統計情報を取得。
 
-    以下の情報を返します:
-    - 総資産額と前月比の増減率
-    - 保有銘柄数と前月比の増減
-    - 利回りと前月比の増減
-
-    Returns:
-        統計情報
-    """
+async def _build_dashboard_stats(db: AsyncSession) -> DashboardStats:
+    """統計情報を DB から集計する。"""
     # リアルタイム総資産を集計
     assets_result = await db.execute(select(Asset))
     all_assets = assets_result.scalars().all()
@@ -107,20 +97,47 @@ async def get_dashboard_stats(db: AsyncSession = Depends(get_db)):
 
 
 @dashboard_router.get(
-    "/portfolio",
-    response_model=list[PortfolioItem],
-    summary="ポートフォリオ構成取得",
-    description="円グラフ表示用のポートフォリオ構成を取得します。",
+    "/stats",
+    response_model=DashboardStats,
+    summary="統計情報取得",
+    description="ダッシュボードに表示する統計情報を取得します。",
 )
-async def get_portfolio(db: AsyncSession = Depends(get_db)):
+async def get_dashboard_stats(
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_db),
+):
     """
-    ポートフォリオ構成を取得（円グラフ用）。
+    ダッシュボードの統計情報を取得。
 
-    最新のスナップショットから各カテゴリの割合を計算します。
+    以下の情報を返します:
+    - 総資産額と前月比の増減率
+    - 保有銘柄数と前月比の増減
+    - 利回りと前月比の増減
+
+    データバージョンが変わっていなければ 304 を返します。
 
     Returns:
-        ポートフォリオアイテムのリスト（名前、金額、割合、色、アイコン）
+        統計情報
     """
+    data_version = await get_data_version(db)
+    not_modified = conditional_response(request, response, data_version, "dashboard_stats")
+    if not_modified:
+        return not_modified
+
+    return await cached_json_response(
+        request,
+        response,
+        "dashboard_stats",
+        (),
+        data_version.version,
+        _stats_adapter,
+        lambda: _build_dashboard_stats(db),
+    )
+
+
+async def _build_portfolio(db: AsyncSession) -> list[PortfolioItem]:
+    """ポートフォリオ構成を DB から集計する。"""
     # リアルタイム資産を取得
     assets_result = await db.execute(select(Asset).options(selectinload(Asset.category)))
     assets = assets_result.scalars().all()
@@ -184,3 +201,54 @@ async def get_portfolio(db: AsyncSession = Depends(get_db)):
 
     # 金額が0より大きいもののみ返す
     return [p for p in portfolio if p.value > 0]
+
+
+@dashboard_router.get(
+    "/portfolio",
+    response_model=list[PortfolioItem],
+    summary="ポートフォリオ構成取得",
+    description="円グラフ表示用のポートフォリオ構成を取得します。",
+)
+async def get_portfolio(
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    ポートフォリオ構成を取得（円グラフ用）。
+
+    最新のスナップショットから各カテゴリの割合を計算します。
+
+    Returns:
+        ポートフォリオアイテムのリスト（名前、金額、割合、色、アイコン）
+    """
+    data_version = await get_data_version(db)
+    not_modified = conditional_response(request, response, data_version, "dashboard_portfolio")
+    if not_modified:
+        return not_modified
+
+    return await cached_json_response(
+        request,
+        response,
+        "dashboard_portfolio",
+        (),
+        data_version.version,
+        _portfolio_adapter,
+        lambda: _build_portfolio(db),
+    )
+
+
+async def prime_dashboard_cache(db: AsyncSession) -> None:
+    """
+    統計情報とポートフォリオ構成をレスポンスキャッシュに載せる（起動時のウォームアップ用）。
+
+    Args:
+        db: データベースセッション
+    """
+    version = (await get_data_version(db)).version
+    await prime_json_cache(
+        "dashboard_stats", (), version, _stats_adapter, lambda: _build_dashboard_stats(db)
+    )
+    await prime_json_cache(
+        "dashboard_portfolio", (), version, _portfolio_adapter, lambda: _build_portfolio(db)
+    )
@@ -0,0 +1,166 @@
+"""
+データエクスポート ルーター
+
+スナップショット・資産履歴・取引履歴を CSV / NDJSON でストリーミング出力
+"""
+
+from datetime import date, timedelta
+from uuid import UUID
+
+from fastapi import APIRouter, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy import Select, select
+
+from app.database import settings
+from app.models import Asset, AssetHistory, AssetSnapshot, Transaction
+from app.services.export import MEDIA_TYPES, ExportFormat, stream_export
+
+exports_router = APIRouter(
+    prefix="/api/export",
+    tags=["エクスポート"],
+)
+
+
+def _export_response(stmt: Select, export_format: ExportFormat, name: str) -> StreamingResponse:
+    """クエリ結果をサーバーサイドカーソルで読みながら返すレスポンスを作成"""
+    return StreamingResponse(
+        stream_export(stmt, export_format, yield_per=settings.EXPORT_YIELD_PER),
+        media_type=MEDIA_TYPES[export_format],
+        headers={
+            "Content-Disposition": f'attachment; filename="{name}.{export_format}"',
+        },
+    )
+
+
+@exports_router.get(
+    "/snapshots",
+    summary="スナップショットのエクスポート",
+    description="日次スナップショットを CSV / NDJSON で出力します（件数上限なし）。",
+)
+async def export_snapshots(
+    format: ExportFormat = Query(default="csv", description="出力形式（csv / ndjson）"),
+    start_date: date | None = Query(default=None, description="開始日"),
+    end_date: date | None = Query(default=None, description="終了日"),
+):
+    """
+    スナップショットをエクスポート。
+
+    Args:
+        format: 出力形式
+        start_date: 開始日（この日を含む）
+        end_date: 終了日（この日を含む）
+
+    Returns:
+        日付昇順のスナップショット（ストリーミング）
+    """
+    stmt = select(
+        AssetSnapshot.snapshot_date,
+        AssetSnapshot.total_assets,
+        AssetSnapshot.japanese_stocks,
+        AssetSnapshot.us_stocks,
+        AssetSnapshot.investment_trusts,
+        AssetSnapshot.cash,
+        AssetSnapshot.holding_count,
+        AssetSnapshot.yield_rate,
+    ).order_by(AssetSnapshot.snapshot_date)
+    if start_date:
+        stmt = stmt.where(AssetSnapshot.snapshot_date >= start_date)
+    if end_date:
+        stmt = stmt.where(AssetSnapshot.snapshot_date <= end_date)
+    return _export_response(stmt, format, "snapshots")
+
+
+@exports_router.get(
+    "/histories",
+    summary="資産履歴のエクスポート",
+    description="銘柄ごとの日次履歴を CSV / NDJSON で出力します（件数上限なし）。",
+)
+async def export_histories(
+    format: ExportFormat = Query(default="csv", description="出力形式（csv / ndjson）"),
+    asset_id: UUID | None = Query(default=None, description="資産ID（省略時は全資産）"),
+    start_date: date | None = Query(default=None, description="開始日"),
+    end_date: date | None = Query(default=None, description="終了日"),
+):
+    """
+    資産履歴をエクスポート。
+
+    Args:
+        format: 出力形式
+        asset_id: 資産ID
+        start_date: 開始日（この日を含む）
+        end_date: 終了日（この日を含む）
+
+    Returns:
+        資産・日付順の履歴（ストリーミング）
+    """
+    stmt = (
+        select(
+            AssetHistory.record_date,
+            AssetHistory.asset_id,
+            Asset.ticker_symbol,
+            Asset.name,
+            AssetHistory.price,
+            AssetHistory.quantity,
+            AssetHistory.value,
+        )
+        .join(Asset, Asset.id == AssetHistory.asset_id)
+        .order_by(AssetHistory.asset_id, AssetHistory.record_date)
+    )
+    if asset_id:
+        stmt = stmt.where(AssetHistory.asset_id == asset_id)
+    if start_date:
+        stmt = stmt.where(AssetHistory.record_date >= start_date)
+    if end_date:
+        stmt = stmt.where(AssetHistory.record_date <= end_date)
+    return _export_response(stmt, format, "histories")
+
+
+@exports_router.get(
+    "/transactions",
+    summary="取引履歴のエクスポート",
+    description="取引履歴を CSV / NDJSON で出力します（件数上限なし）。",
+)
+async def export_transactions(
+    format: ExportFormat = Query(default="csv", description="出力形式（csv / ndjson）"),
+    asset_id: UUID | None = Query(default=None, description="資産ID（省略時は全資産）"),
+    start_date: date | None = Query(default=None, description="開始日"),
+    end_date: date | None = Query(default=None, description="終了日"),
+):
+    """
+    取引履歴をエクスポート。
+
+    Args:
+        format: 出力形式
+        asset_id: 資産ID
+        start_date: 開始日（この日を含む）
+        end_date: 終了日（この日を含む）
+
+    Returns:
+        取引日順の取引履歴（ストリーミング）
+    """
+    stmt = (
+        select(
+            Transaction.transaction_date,
+            Transaction.id,
+            Transaction.asset_id,
+            Asset.ticker_symbol,
+            Asset.name,
+            Transaction.transaction_type,
+            Transaction.quantity,
+            Transaction.price,
+            Transaction.currency,
+            Transaction.usd_jpy_rate,
+            Transaction.total_cost_jpy,
+            Transaction.note,
+        )
+        .join(Asset, Asset.id == Transaction.asset_id)
+        .order_by(Transaction.transaction_date, Transaction.created_at)
+    )
+    if asset_id:
+        stmt = stmt.where(Transaction.asset_id == asset_id)
+    if start_date:
+        stmt = stmt.where(Transaction.transaction_date >= start_date)
+    if end_date:
+        # 終了日の取引を含めるため翌日未満で比較
+        stmt = stmt.where(Transaction.transaction_date < end_date + timedelta(days=1))
+    return _export_response(stmt, format, "transactions")
@@ -0,0 +1,85 @@
+"""
+取引明細取込 ルーター
+
+証券会社の約定履歴CSVをストリーミングで取り込む
+"""
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database import get_db, settings
+from app.schemas.statement_import import StatementImportResponse
+from app.services import bump_data_version
+from app.services.statement_import import (
+    BROKER_FORMATS,
+    BrokerName,
+    StatementFormatError,
+    StatementImporter,
+    iter_csv_rows,
+)
+
+imports_router = APIRouter(
+    prefix="/api/import",
+    tags=["取引明細取込"],
+)
+
+
+@imports_router.post(
+    "/statement",
+    response_model=StatementImportResponse,
+    status_code=201,
+    summary="約定履歴CSV取込",
+    description=(
+        "SBI証券・楽天証券・Interactive Brokers の約定履歴CSVをリクエスト本文"
+        "（Content-Type: text/csv）として受け取り、取引履歴として一括登録します。"
+    ),
+)
+async def import_statement(
+    request: Request,
+    broker: BrokerName = Query(..., description="CSVの形式（sbi / rakuten / ibkr）"),
+    encoding: str | None = Query(
+        default=None,
+        description="文字コード（省略時は証券会社ごとの既定: sbi/rakuten=cp932, ibkr=utf-8）",
+    ),
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    約定履歴CSVを取り込む。
+
+    本文はチャンク単位で読み込みながら解析し、一定件数ごとにまとめて INSERT するため、
+    ファイルサイズによらずメモリ使用量は一定です。取込後に対象資産の数量・平均取得単価・
+    取得総額（円）を取引履歴から再計算します。現金残高は変更しません。
+    登録済みの取引（銘柄・約定日・売買・数量・単価が同じ）は取り込まないため、
+    同じCSVを再度取り込んでも数量は二重になりません。
+
+    Args:
+        request: CSV本文を含むリクエスト
+        broker: CSVの形式
+        encoding: 文字コード
+
+    Returns:
+        取込件数と作成/更新した資産数
+
+    Raises:
+        400: ヘッダー行が見つからない、または文字コードが不正な場合
+    """
+    encoding = encoding or BROKER_FORMATS[broker].encoding
+    importer = StatementImporter(db, batch_size=settings.STATEMENT_IMPORT_BATCH_SIZE)
+    try:
+        await importer.run(iter_csv_rows(request.stream(), encoding), broker)
+    except (StatementFormatError, LookupError) as e:
+        await db.rollback()
+        raise HTTPException(status_code=400, detail=str(e)) from e
+
+    await bump_data_version(db)
+    await db.commit()
+
+    result = importer.result
+    return StatementImportResponse(
+        imported=result.imported,
+        skipped=result.skipped,
+        duplicates=result.duplicates,
+        created_assets=result.created_assets,
+        updated_assets=result.updated_assets,
+        errors=result.errors,
+    )
@@ -4,27 +4,41 @@
 日次の資産スナップショット（チャート表示用データ）
 """
 
-from datetime import date, timedelta
+from collections.abc import Callable
+from datetime import date, datetime, timedelta
 from decimal import Decimal
 from typing import Literal
 
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from pydantic import TypeAdapter
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.database import get_db
+from app.http_cache import cached_json_response, conditional_response, prime_json_cache
 from app.models import Asset, AssetSnapshot
+from app.responses import NumericFormat, model_columns, rows_json_response
 from app.schemas.snapshot import (
     AssetSnapshotChartData,
     AssetSnapshotCreate,
     AssetSnapshotResponse,
 )
+from app.services import bump_data_version, get_data_version
+from app.services.snapshot_rollups import (
+    RollupUnit,
+    bucket_start,
+    fetch_bucket_closing_snapshots,
+    shift_buckets,
+)
 
 snapshots_router = APIRouter(
     prefix="/api/snapshots",
     tags=["スナップショット"],
 )
 
+# 一覧はレスポンスモデルの列だけを取得し、ORM オブジェクトを経由せず JSON 化する
+_SNAPSHOT_COLUMNS = model_columns(AssetSnapshotResponse, AssetSnapshot)
+
 
 @snapshots_router.get(
     "",
@@ -33,6 +47,8 @@ snapshots_router = APIRouter(
     description="資産スナップショットを取得します。日付で絞り込み可能。",
 )
 async def get_snapshots(
+    request: Request,
+    response: Response,
     start_date: date | None = Query(
         default=None,
         description="開始日（この日以降のデータを取得）",
@@ -59,43 +75,49 @@ async def get_snapshots(
     Returns:
         スナップショット一覧（日付の降順）
     """
-    query = select(AssetSnapshot)
+    not_modified = conditional_response(
+        request, response, await get_data_version(db), "snapshots", start_date, end_date, limit
+    )
+    if not_modified:
+        return not_modified
+
+    query = select(*_SNAPSHOT_COLUMNS)
     if start_date:
         query = query.where(AssetSnapshot.snapshot_date >= start_date)
     if end_date:
         query = query.where(AssetSnapshot.snapshot_date <= end_date)
     query = query.order_by(AssetSnapshot.snapshot_date.desc()).limit(limit)
     result = await db.execute(query)
-    return result.scalars().all()
+    return rows_json_response([dict(row) for row in result.mappings()], response)
 
 
-@snapshots_router.get(
-    "/chart",
-    response_model=list[AssetSnapshotChartData],
-    summary="チャートデータ取得",
-    description="チャート表示用のデータを取得します。日/月/年で集計期間を選択可能。",
-)
-async def get_chart_data(
-    period: Literal["day", "month", "year"] = Query(
-        default="month",
-        description="集計期間: day（直近30日）, month（直近12ヶ月）, year（直近5年）",
-    ),
-    db: AsyncSession = Depends(get_db),
-):
+_chart_data_adapter = TypeAdapter(list[AssetSnapshotChartData])
+
+# 集計期間ごとの (表示件数, 期間開始日からラベルを作る関数)
+_ROLLUP_BUCKETS: dict[RollupUnit, tuple[int, Callable[[date], str]]] = {
+    "week": (12, lambda d: f"{d.month}/{d.day}週"),
+    "month": (12, lambda d: f"{d.month}月"),
+    "quarter": (8, lambda d: f"{d.year}Q{(d.month - 1) // 3 + 1}"),
+    "year": (5, lambda d: str(d.year)),
+}
+
+
+async def _build_chart_data(
+    db: AsyncSession,
+    period: str,
+    today: date,
+) -> list[AssetSnapshotChartData]:
     """
-    チャート表示用の集計データを取得。
+    チャート表示用の集計データを DB から組み立てる。
 
     Args:
-        period: 集計期間
-            - "day": 直近30日の日次データ
-            - "month": 直近12ヶ月の月末データ
-            - "year": 直近5年の年末データ
+        db: DB セッション
+        period: 集計期間（day / week / month / quarter / year）
+        today: 基準日
 
     Returns:
-        チャート用データ（日本株、米国株、投資信託、現金、合計）
+        チャート用データ
     """
-    today = date.today()
-
     # リアルタイム総資産を集計 (現在時点のデータを追加するため)
     assets_result = await db.execute(select(Asset))
     current_assets = assets_result.scalars().all()
@@ -159,85 +181,123 @@ async def get_chart_data(
 
         return data[-30:]  # 最新30件
 
-    elif period == "month":
-        # 月次データ - 直近12ヶ月の月末データ
-        start_date = today.replace(day=1) - timedelta(days=365)
-        query = select(AssetSnapshot).where(AssetSnapshot.snapshot_date >= start_date)
-        result = await db.execute(query)
-        snapshots = result.scalars().all()
+    # 週/月/四半期/年: 各期間の最終スナップショットを SQL で 1 行ずつ取得
+    bucket_count, format_label = _ROLLUP_BUCKETS[period]
+    current_bucket = bucket_start(period, today)
+    start_date = shift_buckets(period, current_bucket, -(bucket_count - 1))
+    rows = await fetch_bucket_closing_snapshots(db, period, start_date)
+
+    data = [
+        AssetSnapshotChartData(
+            date=format_label(bucket_start(period, r.snapshot_date)),
+            日本株=r.japanese_stocks,
+            米国株=r.us_stocks,
+            投資信託=r.investment_trusts,
+            現金=r.cash,
+            合計=r.total_assets,
+        )
+        for r in rows
+    ]
 
-        # 各月の最終日を抽出
-        monthly_data: dict[str, AssetSnapshot] = {}
-        for s in snapshots:
-            month_key = s.snapshot_date.strftime("%Y-%m")
-            if (
-                month_key not in monthly_data
-                or s.snapshot_date > monthly_data[month_key].snapshot_date
-            ):
-                monthly_data[month_key] = s
-
-        sorted_months = sorted(monthly_data.keys())
-        data = [
-            AssetSnapshotChartData(
-                date=f"{int(monthly_data[m].snapshot_date.month)}月",
-                日本株=monthly_data[m].japanese_stocks,
-                米国株=monthly_data[m].us_stocks,
-                投資信託=monthly_data[m].investment_trusts,
-                現金=monthly_data[m].cash,
-                合計=monthly_data[m].total_assets,
-            )
-            for m in sorted_months
-        ]
+    # 現在の期間のデータとして現在の値を採用
+    current_label = format_label(current_bucket)
+    current_chart_data.date = current_label
 
-        # 今月のデータとして現在の値を採用
-        current_month_label = f"{today.month}月"
-        current_chart_data.date = current_month_label
+    # 最後のデータが現在の期間なら置換（または未確定として追加）
+    if data and data[-1].date == current_label:
+        data[-1] = current_chart_data
+    else:
+        data.append(current_chart_data)
 
-        # 最後のデータが今月なら置換（または未確定として追加）
-        if data and data[-1].date == current_month_label:
-            data[-1] = current_chart_data
-        else:
-            data.append(current_chart_data)
+    return data[-bucket_count:]
 
-        return data[-12:]
 
-    else:  # year
-        # 年次データ - 直近5年の年末データ
-        start_year = today.year - 5
-        query = select(AssetSnapshot).where(AssetSnapshot.snapshot_date >= date(start_year, 1, 1))
-        result = await db.execute(query)
-        snapshots = result.scalars().all()
+@snapshots_router.get(
+    "/chart",
+    response_model=list[AssetSnapshotChartData],
+    summary="チャートデータ取得",
+    description="チャート表示用のデータを取得します。日/週/月/四半期/年で集計期間を選択可能。",
+)
+async def get_chart_data(
+    request: Request,
+    response: Response,
+    period: Literal["day", "week", "month", "quarter", "year"] = Query(
+        default="month",
+        description=(
+            "集計期間: day（直近30日）, week（直近12週）, month（直近12ヶ月）, "
+            "quarter（直近8四半期）, year（直近5年）"
+        ),
+    ),
+    numeric: NumericFormat = Query(
+        default="string",
+        description="金額の出力形式: string（既定、精度を保持）/ float（数値、チャート描画用）",
+    ),
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    チャート表示用の集計データを取得。
 
-        # 各年の最終日を抽出
-        yearly_data: dict[int, AssetSnapshot] = {}
-        for s in snapshots:
-            year = s.snapshot_date.year
-            if year not in yearly_data or s.snapshot_date > yearly_data[year].snapshot_date:
-                yearly_data[year] = s
+    集計結果はデータバージョンごとにメモリキャッシュされます。
 
-        sorted_years = sorted(yearly_data.keys())
-        data = [
-            AssetSnapshotChartData(
-                date=str(year),
-                日本株=yearly_data[year].japanese_stocks,
-                米国株=yearly_data[year].us_stocks,
-                投資信託=yearly_data[year].investment_trusts,
-                現金=yearly_data[year].cash,
-                合計=yearly_data[year].total_assets,
-            )
-            for year in sorted_years
-        ]
+    Args:
+        period: 集計期間
+            - "day": 直近30日の日次データ
+            - "week": 直近12週の週末データ
+            - "month": 直近12ヶ月の月末データ
+            - "quarter": 直近8四半期の四半期末データ
+            - "year": 直近5年の年末データ
+        numeric: 金額の出力形式（"float" の場合は文字列ではなく数値で返す）
 
-        # 今年のデータとして現在の値を採用
-        current_year_label = str(today.year)
-        current_chart_data.date = current_year_label
+    Returns:
+        チャート用データ（日本株、米国株、投資信託、現金、合計）
+    """
+    today = date.today()
 
-        if data and data[-1].date == current_year_label:
-            data[-1] = current_chart_data
-        else:
-            data.append(current_chart_data)
+    # 「今日」のラベルは日付が変わると変化するため、ETag と Last-Modified に日付を含める
+    data_version = await get_data_version(db)
+    today_start = datetime.combine(today, datetime.min.time()).astimezone()
+    not_modified = conditional_response(
+        request,
+        response,
+        data_version,
+        "snapshots_chart",
+        period,
+        today,
+        numeric,
+        last_modified=max(data_version.updated_at, today_start),
+    )
+    if not_modified:
+        return not_modified
+
+    return await cached_json_response(
+        request,
+        response,
+        "snapshots_chart",
+        (period, today, numeric),
+        data_version.version,
+        _chart_data_adapter,
+        lambda: _build_chart_data(db, period, today),
+        numeric=numeric,
+    )
 
-        return data[-5:]
+
+async def prime_chart_cache(db: AsyncSession) -> None:
+    """
+    チャートの既定表示（月次・数値出力）をレスポンスキャッシュに載せる（起動時のウォームアップ用）。
+
+    Args:
+        db: データベースセッション
+    """
+    today = date.today()
+    version = (await get_data_version(db)).version
+    await prime_json_cache(
+        "snapshots_chart",
+        ("month", today, "float"),
+        version,
+        _chart_data_adapter,
+        lambda: _build_chart_data(db, "month", today),
+        numeric="float",
+    )
 
 
 @snapshots_router.post(
@@ -276,6 +336,7 @@ async def create_snapshot(
 
     snapshot = AssetSnapshot(**snapshot_data.model_dump())
     db.add(snapshot)
+    await bump_data_version(db)
     await db.flush()
     await db.refresh(snapshot)
     return snapshot
@@ -287,13 +348,23 @@ async def create_snapshot(
     summary="最新スナップショット取得",
     description="最新のスナップショットを取得します。",
 )
-async def get_latest_snapshot(db: AsyncSession = Depends(get_db)):
+async def get_latest_snapshot(
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_db),
+):
     """
     最新のスナップショットを取得。
 
     Returns:
         最新のスナップショット（存在しない場合は null）
     """
+    not_modified = conditional_response(
+        request, response, await get_data_version(db), "snapshots_latest"
+    )
+    if not_modified:
+        return not_modified
+
     result = await db.execute(
         select(AssetSnapshot).order_by(AssetSnapshot.snapshot_date.desc()).limit(1)
     )
@@ -12,6 +12,9 @@ API のリクエスト/レスポンスのバリデーションを行うスキー
 from app.schemas.asset import (
     AssetBase,
     AssetCreate,
+    AssetPurchaseBatchRequest,
+    AssetPurchaseBatchResponse,
+    AssetPurchaseBatchResult,
     AssetPurchaseRequest,
     AssetResponse,
     AssetUpdate,
@@ -41,6 +44,12 @@ from app.schemas.history import (
 # 価格履歴
 from app.schemas.price_history import PriceHistoryData, TransactionData
 
+# プロファイル
+from app.schemas.profile import ProfileResponse
+
+# スロークエリ
+from app.schemas.slow_query import SlowQueryResponse
+
 # スナップショット
 from app.schemas.snapshot import (
     AssetSnapshotBase,
@@ -49,6 +58,9 @@ from app.schemas.snapshot import (
     AssetSnapshotResponse,
 )
 
+# 取引明細取込
+from app.schemas.statement_import import StatementImportResponse
+
 __all__ = [
     # カテゴリ
     "AssetCategoryBase",
@@ -57,6 +69,9 @@ __all__ = [
     "AssetBase",
     "AssetCreate",
     "AssetPurchaseRequest",
+    "AssetPurchaseBatchRequest",
+    "AssetPurchaseBatchResult",
+    "AssetPurchaseBatchResponse",
     "CashTransactionRequest",
     "AssetUpdate",
     "AssetResponse",
@@ -81,4 +96,10 @@ __all__ = [
     # ダッシュボード
     "DashboardStats",
     "PortfolioItem",
+    # 取引明細取込
+    "StatementImportResponse",
+    # プロファイル
+    "ProfileResponse",
+    # スロークエリ
+    "SlowQueryResponse",
 ]
@@ -162,3 +162,34 @@ class AssetResponse(AssetBase):
     category: AssetCategoryResponse | None = Field(None, description="カテゴリ情報")
 
     model_config = ConfigDict(from_attributes=True)
+
+
+class AssetPurchaseBatchRequest(BaseModel):
+    """株一括購入リクエスト用スキーマ"""
+
+    purchases: list[AssetPurchaseRequest] = Field(
+        ...,
+        min_length=1,
+        max_length=500,
+        description="購入明細（行の順に処理）",
+    )
+
+
+class AssetPurchaseBatchResult(BaseModel):
+    """株一括購入の明細ごとの結果"""
+
+    index: int = Field(..., description="リクエスト内の明細番号（0始まり）")
+    transaction_id: UUID = Field(..., description="登録された取引ID")
+    cost_jpy: Decimal = Field(..., description="購入代金（円）")
+    asset: AssetResponse = Field(
+        ...,
+        description="この明細を反映した時点の資産情報（同じ銘柄の後続の明細は含まない）",
+    )
+
+
+class AssetPurchaseBatchResponse(BaseModel):
+    """株一括購入レスポンス用スキーマ"""
+
+    total_cost_jpy: Decimal = Field(..., description="合計購入代金（円）")
+    cash_balance: Decimal = Field(..., description="購入後の現金残高（円）")
+    results: list[AssetPurchaseBatchResult] = Field(..., description="明細ごとの結果")
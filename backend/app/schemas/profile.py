@@ -0,0 +1,19 @@
+"""
+プロファイル スキーマ
+
+リクエスト単位のプロファイリング結果（管理API）のスキーマ定義
+"""
+
+from datetime import datetime
+
+from pydantic import BaseModel, ConfigDict, Field
+
+
+class ProfileResponse(BaseModel):
+    """保存済みプロファイル一覧用スキーマ"""
+
+    id: str = Field(..., description="プロファイルID（X-Profile-Id ヘッダーの値）")
+    created_at: datetime = Field(..., description="保存日時（UTC）")
+    size_bytes: int = Field(..., description="pstats ファイルのサイズ")
+
+    model_config = ConfigDict(from_attributes=True)
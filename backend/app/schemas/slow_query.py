@@ -0,0 +1,28 @@
+"""
+スロークエリ スキーマ
+
+スロークエリレポート（管理API）のスキーマ定義
+"""
+
+from datetime import datetime
+
+from pydantic import BaseModel, ConfigDict, Field
+
+
+class SlowQueryResponse(BaseModel):
+    """スロークエリ（SQLの形ごとの集計）レスポンス用スキーマ"""
+
+    shape: str = Field(..., description="バインド値を ? に置き換えた SQL")
+    count: int = Field(..., description="しきい値を超えた実行回数")
+    total_seconds: float = Field(..., description="しきい値を超えた実行の合計時間（秒）")
+    max_seconds: float = Field(..., description="最大実行時間（秒）")
+    last_seen: datetime | None = Field(None, description="最後に記録された日時（UTC）")
+    parameter_types: list[str] = Field(default_factory=list, description="バインド値の型")
+    routes: dict[str, int] = Field(default_factory=dict, description="呼び出し元ルートと回数")
+    plan: str | None = Field(None, description="EXPLAIN (ANALYZE, BUFFERS) の結果")
+    plan_captured_at: datetime | None = Field(None, description="実行計画の取得日時（UTC）")
+    seq_scans: list[str] = Field(
+        default_factory=list, description="実行計画で Seq Scan になったテーブル"
+    )
+
+    model_config = ConfigDict(from_attributes=True)
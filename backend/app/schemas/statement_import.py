@@ -0,0 +1,18 @@
+"""
+取引明細取込 スキーマ
+
+証券会社の約定履歴CSV取込結果のスキーマ定義
+"""
+
+from pydantic import BaseModel, Field
+
+
+class StatementImportResponse(BaseModel):
+    """取引明細取込レスポンス用スキーマ"""
+
+    imported: int = Field(..., description="登録した取引件数")
+    skipped: int = Field(..., description="取引以外の行や解釈できなかった行の件数")
+    duplicates: int = Field(0, description="登録済みの取引と同じため取り込まなかった件数")
+    created_assets: int = Field(..., description="新規作成した資産数")
+    updated_assets: int = Field(..., description="数量・取得単価を再計算した既存資産数")
+    errors: list[str] = Field(default_factory=list, description="解釈できなかった行（先頭50件）")
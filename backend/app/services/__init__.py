@@ -1,5 +1,18 @@
 """Services module."""
 
+from app.services.data_version import DataVersion, bump_data_version, get_data_version
+from app.services.response_cache import CacheEntry, ResponseCache, response_cache
+from app.services.single_flight import SingleFlight
 from app.services.yfinance_service import PricePoint, YFinanceService
 
-__all__ = ["YFinanceService", "PricePoint"]
+__all__ = [
+    "YFinanceService",
+    "PricePoint",
+    "DataVersion",
+    "get_data_version",
+    "bump_data_version",
+    "ResponseCache",
+    "CacheEntry",
+    "response_cache",
+    "SingleFlight",
+]
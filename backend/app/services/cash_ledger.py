@@ -0,0 +1,242 @@
+"""
+Cash ledger with month-end balance checkpoints.
+
+Every cash movement is recorded as a signed ledger entry. Month-end
+checkpoints hold the running balance, so the balance on any date is one
+indexed checkpoint lookup plus a scan of at most one month of entries.
+"""
+
+import uuid
+from collections.abc import Sequence
+from datetime import date, timedelta
+from decimal import Decimal
+
+from sqlalchemy import Date, cast, delete, func, select, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models import Asset, CashBalanceCheckpoint, CashLedgerEntry
+from app.services.snapshot_invalidation import mark_snapshots_dirty
+
+# 現金カテゴリID
+CASH_CATEGORY_ID = 4
+
+
+async def lock_cash_asset(db: AsyncSession) -> Asset | None:
+    """
+    Load the cash asset row locked with ``FOR UPDATE``.
+
+    The purchase (single and batch) and deposit / withdraw endpoints read
+    the balance through this, so concurrent requests are serialized until
+    the caller commits instead of overwriting each other's debit.
+
+    Args:
+        db: Database session
+
+    Returns:
+        Cash asset, or None if it has not been created yet
+    """
+    result = await db.execute(
+        select(Asset).where(Asset.category_id == CASH_CATEGORY_ID).with_for_update()
+    )
+    return result.scalar_one_or_none()
+
+
+def _month_end(d: date) -> date:
+    """Last day of the month containing ``d``."""
+    next_month = (d.replace(day=1) + timedelta(days=32)).replace(day=1)
+    return next_month - timedelta(days=1)
+
+
+async def record_cash_movement(
+    db: AsyncSession,
+    entry_date: date,
+    amount: Decimal,
+    entry_type: str,
+    note: str | None = None,
+    transaction_id: uuid.UUID | None = None,
+) -> CashLedgerEntry:
+    """
+    Record a cash movement and keep checkpoints consistent.
+
+    Args:
+        db: Database session
+        entry_date: Date the movement takes effect
+        amount: Signed amount in JPY (deposits positive, withdrawals negative)
+        entry_type: "deposit", "withdraw", "buy" or "adjustment"
+        note: Optional memo
+        transaction_id: Related asset transaction, if any
+
+    Returns:
+        Created ledger entry
+    """
+    entry = CashLedgerEntry(
+        entry_date=entry_date,
+        amount=amount,
+        entry_type=entry_type,
+        note=note,
+        transaction_id=transaction_id,
+    )
+    await record_cash_movements(db, [entry])
+    return entry
+
+
+async def record_cash_movements(db: AsyncSession, entries: Sequence[CashLedgerEntry]) -> None:
+    """
+    Record several cash movements at once and keep checkpoints consistent.
+
+    Back-dated entries adjust every checkpoint on or after their date (one
+    UPDATE per distinct date); an entry older than the first checkpoint
+    rebuilds the checkpoints so the earlier months get one too. Back-dated
+    entries also mark the snapshots from their earliest date for recomputation.
+
+    Args:
+        db: Database session
+        entries: New (unsaved) ledger entries
+    """
+    if not entries:
+        return
+
+    amounts_by_date: dict[date, Decimal] = {}
+    for entry in entries:
+        amounts_by_date[entry.entry_date] = (
+            amounts_by_date.get(entry.entry_date, Decimal("0")) + entry.amount
+        )
+
+    first_checkpoint = await db.scalar(select(func.min(CashBalanceCheckpoint.checkpoint_date)))
+    if first_checkpoint is not None and _month_end(min(amounts_by_date)) < first_checkpoint:
+        await db.execute(delete(CashBalanceCheckpoint))
+    else:
+        for entry_date, amount in amounts_by_date.items():
+            await db.execute(
+                update(CashBalanceCheckpoint)
+                .where(CashBalanceCheckpoint.checkpoint_date >= entry_date)
+                .values(balance=CashBalanceCheckpoint.balance + amount)
+            )
+    db.add_all(entries)
+    await db.flush()
+
+    # 前月末までのチェックポイントを作成
+    await ensure_checkpoints(db, date.today().replace(day=1) - timedelta(days=1))
+    # 最も古い入出金日以降のスナップショットの現金残高が変わる
+    await mark_snapshots_dirty(db, min(amounts_by_date))
+
+
+async def ensure_checkpoints(db: AsyncSession, through: date) -> None:
+    """
+    Create missing month-end checkpoints up to ``through``.
+
+    Monthly totals after the latest checkpoint are fetched in one grouped query.
+
+    Args:
+        db: Database session
+        through: Last month-end date to create a checkpoint for
+    """
+    result = await db.execute(
+        select(CashBalanceCheckpoint.checkpoint_date, CashBalanceCheckpoint.balance)
+        .order_by(CashBalanceCheckpoint.checkpoint_date.desc())
+        .limit(1)
+    )
+    latest = result.one_or_none()
+    if latest is not None:
+        covered_through, balance = latest.checkpoint_date, latest.balance
+    else:
+        first_entry_date = await db.scalar(select(func.min(CashLedgerEntry.entry_date)))
+        if first_entry_date is None:
+            return
+        covered_through = first_entry_date.replace(day=1) - timedelta(days=1)
+        balance = Decimal("0")
+
+    if covered_through >= through:
+        return
+
+    # date_trunc は timestamptz を返し、asyncpg は UTC に変換するため date に戻して比較する
+    # （セッションのタイムゾーンが Asia/Tokyo などだと前月末の日付になる）
+    month = cast(func.date_trunc("month", CashLedgerEntry.entry_date), Date)
+    result = await db.execute(
+        select(month.label("month"), func.sum(CashLedgerEntry.amount).label("total"))
+        .where(
+            CashLedgerEntry.entry_date > covered_through,
+            CashLedgerEntry.entry_date <= through,
+        )
+        .group_by(month)
+    )
+    monthly_totals = {row.month: row.total for row in result}
+
+    checkpoints = []
+    checkpoint_date = _month_end(covered_through + timedelta(days=1))
+    while checkpoint_date <= through:
+        balance += monthly_totals.get(checkpoint_date.replace(day=1), Decimal("0"))
+        checkpoints.append({"checkpoint_date": checkpoint_date, "balance": balance})
+        checkpoint_date = _month_end(checkpoint_date + timedelta(days=1))
+
+    if checkpoints:
+        # 並行して作成された場合は既存を優先
+        await db.execute(insert(CashBalanceCheckpoint).values(checkpoints).on_conflict_do_nothing())
+
+
+async def get_cash_balance_on(db: AsyncSession, on_date: date) -> Decimal:
+    """
+    Cash balance at the end of ``on_date``.
+
+    Args:
+        db: Database session
+        on_date: Target date
+
+    Returns:
+        Balance in JPY
+    """
+    result = await db.execute(
+        select(CashBalanceCheckpoint.checkpoint_date, CashBalanceCheckpoint.balance)
+        .where(CashBalanceCheckpoint.checkpoint_date <= on_date)
+        .order_by(CashBalanceCheckpoint.checkpoint_date.desc())
+        .limit(1)
+    )
+    checkpoint = result.one_or_none()
+
+    stmt = select(func.coalesce(func.sum(CashLedgerEntry.amount), 0)).where(
+        CashLedgerEntry.entry_date <= on_date
+    )
+    if checkpoint is not None:
+        stmt = stmt.where(CashLedgerEntry.entry_date > checkpoint.checkpoint_date)
+    remainder = await db.scalar(stmt)
+
+    base = checkpoint.balance if checkpoint is not None else Decimal("0")
+    return base + Decimal(remainder)
+
+
+async def get_cash_balances(
+    db: AsyncSession,
+    start_date: date,
+    end_date: date,
+) -> dict[date, Decimal]:
+    """
+    End-of-day cash balance for every day in ``[start_date, end_date]``.
+
+    Args:
+        db: Database session
+        start_date: First day (inclusive)
+        end_date: Last day (inclusive)
+
+    Returns:
+        {date: balance}
+    """
+    balance = await get_cash_balance_on(db, start_date - timedelta(days=1))
+
+    result = await db.execute(
+        select(CashLedgerEntry.entry_date, func.sum(CashLedgerEntry.amount).label("total"))
+        .where(
+            CashLedgerEntry.entry_date >= start_date,
+            CashLedgerEntry.entry_date <= end_date,
+        )
+        .group_by(CashLedgerEntry.entry_date)
+    )
+    daily_totals = {row.entry_date: row.total for row in result}
+
+    balances: dict[date, Decimal] = {}
+    day = start_date
+    while day <= end_date:
+        balance += daily_totals.get(day, Decimal("0"))
+        balances[day] = balance
+        day += timedelta(days=1)
+    return balances
@@ -0,0 +1,250 @@
+"""
+HTTP response compression (gzip, and brotli when the ``brotli`` package is installed).
+
+:class:`CompressionMiddleware` compresses responses whose content type is
+in :data:`COMPRESSIBLE_TYPES` and whose body is at least
+``COMPRESSION_MIN_SIZE`` bytes, using the best encoding the client accepts.
+Streaming responses (CSV / NDJSON exports) are compressed incrementally.
+Responses that already carry ``Content-Encoding`` are passed through, which
+is how cached responses are served: :func:`app.http_cache.cached_json_response`
+stores the compressed body next to the cache entry, so repeated hits do not
+compress again.
+
+Bytes in / out and CPU time spent compressing are counted per encoding
+and exposed as metrics.
+"""
+
+import threading
+import time
+import zlib
+from dataclasses import dataclass
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.database import settings
+
+try:
+    import brotli
+except ImportError:  # brotli は任意（未インストールなら gzip のみ）
+    brotli = None
+
+# 圧縮対象の Content-Type（パラメータ部分を除いて比較）
+COMPRESSIBLE_TYPES = frozenset(
+    {
+        "application/json",
+        "application/x-ndjson",
+        "text/csv",
+        "text/plain",
+        "text/html",
+    }
+)
+# サーバー側の優先順（クライアントが両方受け付ける場合は brotli）
+SUPPORTED_ENCODINGS = ("br", "gzip") if brotli is not None else ("gzip",)
+
+
+@dataclass
+class EncodingStats:
+    """Totals for one content coding."""
+
+    responses: int = 0
+    # キャッシュ済みの圧縮結果を返した回数（圧縮処理なし）
+    precompressed: int = 0
+    bytes_in: int = 0
+    bytes_out: int = 0
+    cpu_seconds: float = 0.0
+
+
+_stats: dict[str, EncodingStats] = {encoding: EncodingStats() for encoding in SUPPORTED_ENCODINGS}
+_stats_lock = threading.Lock()
+
+
+def compression_stats() -> dict[str, EncodingStats]:
+    """Per-encoding totals since start (read by the metrics collector)."""
+    return _stats
+
+
+def record_precompressed(encoding: str, size: int, compressed_size: int) -> None:
+    """Count a response served from an already compressed body."""
+    with _stats_lock:
+        stats = _stats[encoding]
+        stats.responses += 1
+        stats.precompressed += 1
+        stats.bytes_in += size
+        stats.bytes_out += compressed_size
+
+
+def choose_encoding(accept_encoding: str) -> str | None:
+    """
+    Pick the preferred supported coding from an ``Accept-Encoding`` header.
+
+    Args:
+        accept_encoding: Header value, e.g. "gzip, deflate, br;q=0.9"
+
+    Returns:
+        "br" or "gzip", or None if the client accepts neither
+    """
+    accepted: dict[str, float] = {}
+    for item in accept_encoding.lower().split(","):
+        name, _, params = item.strip().partition(";")
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[name.strip()] = quality
+    for encoding in SUPPORTED_ENCODINGS:
+        quality = accepted.get(encoding, accepted.get("*", 0.0))
+        if quality > 0:
+            return encoding
+    return None
+
+
+def is_compressible(content_type: str) -> bool:
+    """Whether a ``Content-Type`` is on the allow-list."""
+    return content_type.partition(";")[0].strip().lower() in COMPRESSIBLE_TYPES
+
+
+class _Encoder:
+    """Incremental compressor for one response, accounting CPU time and sizes."""
+
+    def __init__(self, encoding: str):
+        self.encoding = encoding
+        if encoding == "br":
+            self._compressor = brotli.Compressor(quality=settings.COMPRESSION_BROTLI_QUALITY)
+        else:
+            # wbits=31: gzip ヘッダー付き
+            self._compressor = zlib.compressobj(settings.COMPRESSION_GZIP_LEVEL, zlib.DEFLATED, 31)
+        self._bytes_in = 0
+        self._bytes_out = 0
+        self._cpu_seconds = 0.0
+
+    def _run(self, fn, *args) -> bytes:
+        started = time.thread_time()
+        data = fn(*args)
+        self._cpu_seconds += time.thread_time() - started
+        self._bytes_out += len(data)
+        return data
+
+    def compress(self, chunk: bytes) -> bytes:
+        self._bytes_in += len(chunk)
+        if self.encoding == "br":
+            return self._run(self._compressor.process, chunk)
+        return self._run(self._compressor.compress, chunk)
+
+    def finish(self) -> bytes:
+        if self.encoding == "br":
+            data = self._run(self._compressor.finish)
+        else:
+            data = self._run(self._compressor.flush)
+        with _stats_lock:
+            stats = _stats[self.encoding]
+            stats.responses += 1
+            stats.bytes_in += self._bytes_in
+            stats.bytes_out += self._bytes_out
+            stats.cpu_seconds += self._cpu_seconds
+        return data
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    """
+    Compress a complete body (counted in the compression stats).
+
+    Args:
+        body: Uncompressed body
+        encoding: "br" or "gzip"
+
+    Returns:
+        Compressed body
+    """
+    encoder = _Encoder(encoding)
+    return encoder.compress(body) + encoder.finish()
+
+
+def weak_etag(etag: str) -> str:
+    """Strong ETags identify one representation; the compressed one gets a weak ETag."""
+    return etag if etag.startswith("W/") else f"W/{etag}"
+
+
+class CompressionMiddleware:
+    """ASGI middleware compressing responses; see module docstring."""
+
+    def __init__(self, app: ASGIApp, minimum_size: int = 1024):
+        """
+        Args:
+            app: ASGI application
+            minimum_size: Bodies smaller than this are sent uncompressed
+        """
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = choose_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message: Message | None = None
+        encoder: _Encoder | None = None
+        passthrough = False
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal start_message, encoder, passthrough
+            if passthrough:
+                await send(message)
+                return
+
+            if message["type"] == "http.response.start":
+                headers = Headers(raw=message["headers"])
+                if "content-encoding" in headers or not is_compressible(
+                    headers.get("content-type", "")
+                ):
+                    passthrough = True
+                    await send(message)
+                    return
+                # ボディを見るまで開始メッセージを保留する
+                start_message = message
+                return
+
+            if message["type"] != "http.response.body" or start_message is None:
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            if encoder is None:
+                headers = MutableHeaders(scope=start_message)
+                headers.add_vary_header("Accept-Encoding")
+                if not more_body and len(body) < self.minimum_size:
+                    # 小さいレスポンスはそのまま送る
+                    passthrough = True
+                    await send(start_message)
+                    await send(message)
+                    return
+                encoder = _Encoder(encoding)
+                headers["Content-Encoding"] = encoding
+                if "etag" in headers:
+                    headers["ETag"] = weak_etag(headers["etag"])
+                if more_body:
+                    # ストリーミング（エクスポート）は長さ不明のまま逐次圧縮する
+                    del headers["Content-Length"]
+                    await send(start_message)
+                else:
+                    compressed = encoder.compress(body) + encoder.finish()
+                    headers["Content-Length"] = str(len(compressed))
+                    await send(start_message)
+                    await send({"type": "http.response.body", "body": compressed})
+                    return
+
+            data = encoder.compress(body)
+            if not more_body:
+                data += encoder.finish()
+            if data or not more_body:
+                await send({"type": "http.response.body", "body": data, "more_body": more_body})
+
+        await self.app(scope, receive, send_wrapper)
@@ -0,0 +1,82 @@
+"""
+Portfolio data version counter.
+
+Every write path (purchase, cash, asset CRUD, refresh, snapshot create) bumps
+the counter inside its own transaction, so read endpoints can tell whether
+anything changed with a single primary-key lookup.
+"""
+
+from dataclasses import dataclass
+from datetime import UTC, datetime
+
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql import func
+
+from app.models import PortfolioDataVersion
+from app.services.response_cache import response_cache
+
+# 単一行テーブルの固定ID
+DATA_VERSION_ROW_ID = 1
+
+
+@dataclass(frozen=True)
+class DataVersion:
+    """Snapshot of the portfolio data version."""
+
+    version: int
+    updated_at: datetime
+
+
+async def get_data_version(db: AsyncSession) -> DataVersion:
+    """
+    Read the current portfolio data version.
+
+    Args:
+        db: Database session
+
+    Returns:
+        Current version (version 0 if the row does not exist yet)
+    """
+    result = await db.execute(
+        select(PortfolioDataVersion.version, PortfolioDataVersion.updated_at).where(
+            PortfolioDataVersion.id == DATA_VERSION_ROW_ID
+        )
+    )
+    row = result.one_or_none()
+    if row is None:
+        return DataVersion(version=0, updated_at=datetime(1970, 1, 1, tzinfo=UTC))
+    return DataVersion(version=row.version, updated_at=row.updated_at)
+
+
+async def bump_data_version(db: AsyncSession) -> int:
+    """
+    Increment the portfolio data version within the caller's transaction.
+
+    The row lock taken by the upsert serializes concurrent writers, and a
+    rollback of the caller's transaction also rolls back the bump. Cached
+    responses for older versions are dropped immediately.
+
+    Args:
+        db: Database session
+
+    Returns:
+        New version number
+    """
+    stmt = (
+        insert(PortfolioDataVersion)
+        .values(id=DATA_VERSION_ROW_ID, version=1, updated_at=func.now())
+        .on_conflict_do_update(
+            index_elements=[PortfolioDataVersion.id],
+            set_={
+                "version": PortfolioDataVersion.version + 1,
+                "updated_at": func.now(),
+            },
+        )
+        .returning(PortfolioDataVersion.version)
+    )
+    result = await db.execute(stmt)
+    new_version = result.scalar_one()
+    response_cache.invalidate_before(new_version)
+    return new_version
@@ -0,0 +1,142 @@
+"""
+Dedicated thread pools for blocking work.
+
+Market data provider calls (yfinance HTTP requests) and CPU-bound
+DataFrame conversion run on separate, bounded pools instead of the event
+loop or asyncio's shared default executor. A slow provider response then
+only occupies a provider thread, and a burst of provider calls cannot
+starve the conversion work (or vice versa).
+
+Each pool tracks queued / running tasks and busy time so saturation is
+visible before it turns into latency.
+"""
+
+import asyncio
+import functools
+import os
+import threading
+import time
+from collections.abc import Callable
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, ParamSpec, TypeVar
+
+from app.database import settings
+
+P = ParamSpec("P")
+T = TypeVar("T")
+
+
+class InstrumentedExecutor:
+    """ThreadPoolExecutor wrapper with queue depth and utilization counters."""
+
+    def __init__(self, name: str, max_workers: int):
+        self.name = name
+        self.max_workers = max_workers
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=name)
+        self._lock = threading.Lock()
+        self._queued = 0
+        self._active = 0
+        self._completed = 0
+        self._failed = 0
+        self._busy_seconds = 0.0
+        self._wait_seconds = 0.0
+        self._started_at = time.monotonic()
+
+    async def run(self, fn: Callable[P, T], *args: P.args, **kwargs: P.kwargs) -> T:
+        """
+        Run ``fn(*args, **kwargs)`` on this pool and await the result.
+
+        Args:
+            fn: Blocking callable
+            *args: Positional arguments
+            **kwargs: Keyword arguments
+
+        Returns:
+            Return value of ``fn``
+        """
+        submitted_at = time.monotonic()
+        with self._lock:
+            self._queued += 1
+        try:
+            future = self._executor.submit(
+                functools.partial(self._invoke, fn, submitted_at, *args, **kwargs)
+            )
+        except BaseException:
+            self._unqueue()
+            raise
+        # 待機中に呼び出し元がキャンセルされると（切断・タイムアウト）、開始前のジョブは
+        # 取り消されて _invoke が呼ばれないため、ここで待ち件数を戻す
+        future.add_done_callback(self._on_done)
+        return await asyncio.wrap_future(future)
+
+    def _unqueue(self) -> None:
+        with self._lock:
+            self._queued -= 1
+
+    def _on_done(self, future: Future) -> None:
+        # 取り消しに成功するのは開始前のジョブだけ（実行中のものは _invoke が数える）
+        if future.cancelled():
+            self._unqueue()
+
+    def _invoke(self, fn: Callable[..., T], submitted_at: float, *args: Any, **kwargs: Any) -> T:
+        started_at = time.monotonic()
+        with self._lock:
+            self._queued -= 1
+            self._active += 1
+            self._wait_seconds += started_at - submitted_at
+        failed = False
+        try:
+            return fn(*args, **kwargs)
+        except BaseException:
+            failed = True
+            raise
+        finally:
+            with self._lock:
+                self._active -= 1
+                self._completed += 1
+                self._failed += failed
+                self._busy_seconds += time.monotonic() - started_at
+
+    def stats(self) -> dict[str, Any]:
+        """
+        Snapshot of the pool counters.
+
+        ``utilization`` is the share of worker capacity in use right now;
+        ``busy_ratio`` is the average share since the pool was created.
+        """
+        with self._lock:
+            elapsed = max(time.monotonic() - self._started_at, 1e-9)
+            return {
+                "name": self.name,
+                "max_workers": self.max_workers,
+                "queued": self._queued,
+                "active": self._active,
+                "completed": self._completed,
+                "failed": self._failed,
+                "utilization": self._active / self.max_workers,
+                "busy_ratio": self._busy_seconds / (elapsed * self.max_workers),
+                "busy_seconds": round(self._busy_seconds, 3),
+                "wait_seconds": round(self._wait_seconds, 3),
+            }
+
+    def shutdown(self) -> None:
+        """Stop accepting work and release idle threads."""
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+# 外部APIのI/O待ちが主なのでコア数より多めに確保する
+provider_executor = InstrumentedExecutor("provider-io", settings.PROVIDER_EXECUTOR_WORKERS)
+cpu_executor = InstrumentedExecutor(
+    "cpu", settings.CPU_EXECUTOR_WORKERS or min(4, os.cpu_count() or 1)
+)
+
+
+def executor_stats() -> list[dict[str, Any]]:
+    """Counters of all dedicated pools."""
+    return [provider_executor.stats(), cpu_executor.stats()]
+
+
+def shutdown_executors() -> None:
+    """Shut down all dedicated pools (application shutdown)."""
+    provider_executor.shutdown()
+    cpu_executor.shutdown()
@@ -0,0 +1,82 @@
+"""
+Streaming CSV / NDJSON export backed by server-side cursors.
+
+Rows are fetched with ``AsyncSession.stream()`` and ``yield_per`` so only
+one partition of rows is held in the API process at a time; each partition
+is encoded and yielded as one chunk of the response body.
+"""
+
+import csv
+import io
+import json
+import uuid
+from collections.abc import AsyncIterator
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, Literal
+
+from sqlalchemy import Select
+
+from app.database import async_session_maker
+
+ExportFormat = Literal["csv", "ndjson"]
+
+MEDIA_TYPES: dict[ExportFormat, str] = {
+    "csv": "text/csv; charset=utf-8",
+    "ndjson": "application/x-ndjson",
+}
+
+
+def _json_default(value: Any) -> str:
+    # API レスポンスと同様に Decimal は文字列で出力する
+    if isinstance(value, Decimal | uuid.UUID):
+        return str(value)
+    if isinstance(value, date | datetime):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def _encode_csv(rows: list) -> bytes:
+    buffer = io.StringIO()
+    csv.writer(buffer, lineterminator="\n").writerows(rows)
+    return buffer.getvalue().encode()
+
+
+def _encode_ndjson(rows: list[tuple], columns: list[str]) -> bytes:
+    return "".join(
+        json.dumps(dict(zip(columns, row, strict=True)), ensure_ascii=False, default=_json_default)
+        + "\n"
+        for row in rows
+    ).encode()
+
+
+async def stream_export(
+    stmt: Select,
+    export_format: ExportFormat,
+    yield_per: int = 1000,
+) -> AsyncIterator[bytes]:
+    """
+    Stream the result of ``stmt`` as CSV or NDJSON.
+
+    Opens its own session because the response body is produced after the
+    endpoint (and its request-scoped session) has returned.
+
+    Args:
+        stmt: SELECT of plain columns; labels become the CSV header / JSON keys
+        export_format: "csv" or "ndjson"
+        yield_per: Rows fetched from the server-side cursor per round trip
+
+    Yields:
+        Encoded chunks (the CSV header is sent even when there are no rows)
+    """
+    columns = [column.name for column in stmt.selected_columns]
+    async with async_session_maker() as session:
+        result = await session.stream(stmt.execution_options(yield_per=yield_per))
+        if export_format == "csv":
+            yield _encode_csv([columns])
+        async for partition in result.partitions():
+            rows = [tuple(row) for row in partition]
+            if export_format == "csv":
+                yield _encode_csv(rows)
+            else:
+                yield _encode_ndjson(rows, columns)
@@ -0,0 +1,243 @@
+"""
+Holdings-over-time maintained as non-overlapping date intervals per asset.
+
+Each transaction adjusts the intervals from its effective date onwards, so
+the quantity held on any past date is one range lookup away and valuing a
+date range needs a single range join instead of a ledger replay per date.
+"""
+
+import uuid
+from collections.abc import Collection
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+from sqlalchemy import (
+    ColumnElement,
+    Date,
+    DateTime,
+    case,
+    cast,
+    delete,
+    func,
+    insert,
+    or_,
+    select,
+    update,
+)
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql.selectable import TableValuedAlias
+
+from app.models import HoldingInterval, Transaction
+from app.services.snapshot_invalidation import mark_snapshots_dirty
+
+
+def transaction_quantity_delta(transaction_type: str, quantity: Decimal) -> Decimal:
+    """
+    Signed quantity change of a transaction.
+
+    Args:
+        transaction_type: "buy" or "sell"
+        quantity: Transaction quantity (positive)
+
+    Returns:
+        Positive for buys, negative for sells
+    """
+    return -quantity if transaction_type == "sell" else quantity
+
+
+async def apply_holding_change(
+    db: AsyncSession,
+    asset_id: uuid.UUID,
+    effective_date: date | datetime,
+    quantity_delta: Decimal,
+) -> None:
+    """
+    Apply a quantity change effective from ``effective_date`` onwards.
+
+    Splits the interval containing the date (or opens a new one before the
+    first interval), shifts every interval from that date by the delta and
+    merges the boundary interval back into its predecessor if the quantities
+    end up equal. A back-dated change marks the snapshots from that date
+    for recomputation.
+
+    Args:
+        db: Database session
+        asset_id: Asset ID
+        effective_date: Trade date (datetimes are truncated to the date)
+        quantity_delta: Signed quantity change
+    """
+    if isinstance(effective_date, datetime):
+        effective_date = effective_date.date()
+    if quantity_delta == 0:
+        return
+
+    result = await db.execute(
+        select(HoldingInterval).where(
+            HoldingInterval.asset_id == asset_id,
+            HoldingInterval.valid_from <= effective_date,
+            or_(HoldingInterval.valid_to.is_(None), HoldingInterval.valid_to > effective_date),
+        )
+    )
+    containing = result.scalar_one_or_none()
+
+    if containing is None:
+        # 最初の区間より前（または区間なし）: 次の区間の開始日まで数量0の区間を作る
+        next_start = await db.scalar(
+            select(func.min(HoldingInterval.valid_from)).where(
+                HoldingInterval.asset_id == asset_id,
+                HoldingInterval.valid_from > effective_date,
+            )
+        )
+        db.add(
+            HoldingInterval(
+                asset_id=asset_id,
+                quantity=Decimal("0"),
+                valid_from=effective_date,
+                valid_to=next_start,
+            )
+        )
+    elif containing.valid_from < effective_date:
+        # 区間の途中: 取引日で分割する
+        db.add(
+            HoldingInterval(
+                asset_id=asset_id,
+                quantity=containing.quantity,
+                valid_from=effective_date,
+                valid_to=containing.valid_to,
+            )
+        )
+        containing.valid_to = effective_date
+    await db.flush()
+
+    await db.execute(
+        update(HoldingInterval)
+        .where(
+            HoldingInterval.asset_id == asset_id,
+            HoldingInterval.valid_from >= effective_date,
+        )
+        .values(quantity=HoldingInterval.quantity + quantity_delta)
+        .execution_options(synchronize_session="fetch")
+    )
+
+    # 直前の区間と数量が同じになった場合は結合する
+    result = await db.execute(
+        select(HoldingInterval)
+        .where(
+            HoldingInterval.asset_id == asset_id,
+            or_(
+                HoldingInterval.valid_to == effective_date,
+                HoldingInterval.valid_from == effective_date,
+            ),
+        )
+        .order_by(HoldingInterval.valid_from)
+    )
+    boundary = result.scalars().all()
+    if len(boundary) == 2 and boundary[0].quantity == boundary[1].quantity:
+        previous, current = boundary
+        await db.delete(current)
+        await db.flush()
+        previous.valid_to = current.valid_to
+        await db.flush()
+
+    # 取引日以降のスナップショットを再計算の対象にする
+    await mark_snapshots_dirty(db, effective_date)
+
+
+async def rebuild_holding_intervals(db: AsyncSession, asset_ids: Collection[uuid.UUID]) -> None:
+    """
+    Rebuild the intervals of ``asset_ids`` from their transaction history.
+
+    Used after bulk writes to ``transactions`` where replaying
+    :func:`apply_holding_change` per row would be too slow. Runs one DELETE
+    and one INSERT ... SELECT with a running sum per asset.
+
+    Args:
+        db: Database session
+        asset_ids: Assets whose intervals are rebuilt
+    """
+    if not asset_ids:
+        return
+
+    await db.execute(delete(HoldingInterval).where(HoldingInterval.asset_id.in_(asset_ids)))
+
+    day = cast(Transaction.transaction_date, Date)
+    delta = case(
+        (Transaction.transaction_type == "sell", -Transaction.quantity),
+        else_=Transaction.quantity,
+    )
+    daily = (
+        select(Transaction.asset_id, day.label("day"), func.sum(delta).label("delta"))
+        .where(Transaction.asset_id.in_(asset_ids))
+        .group_by(Transaction.asset_id, day)
+        .subquery()
+    )
+    window = {"partition_by": daily.c.asset_id, "order_by": daily.c.day}
+    await db.execute(
+        insert(HoldingInterval).from_select(
+            ["asset_id", "quantity", "valid_from", "valid_to"],
+            select(
+                daily.c.asset_id,
+                func.sum(daily.c.delta).over(**window),
+                daily.c.day,
+                func.lead(daily.c.day).over(**window),
+            ),
+            include_defaults=False,
+        )
+    )
+
+
+def day_series(start_date: date, end_date: date) -> tuple[TableValuedAlias, ColumnElement[date]]:
+    """
+    ``generate_series`` of the days in ``[start_date, end_date]``.
+
+    Args:
+        start_date: First day (inclusive)
+        end_date: Last day (inclusive)
+
+    Returns:
+        (FROM clause, its day column cast to DATE)
+    """
+    days = (
+        func.generate_series(
+            cast(start_date, DateTime), cast(end_date, DateTime), timedelta(days=1)
+        )
+        .table_valued("day")
+        .render_derived()
+    )
+    return days, cast(days.c.day, Date)
+
+
+async def get_holdings_by_date(
+    db: AsyncSession,
+    start_date: date,
+    end_date: date,
+) -> dict[date, dict[uuid.UUID, Decimal]]:
+    """
+    Quantity held of every asset on each day of ``[start_date, end_date]``.
+
+    Runs one range join between a generated day series and the intervals.
+
+    Args:
+        db: Database session
+        start_date: First day (inclusive)
+        end_date: Last day (inclusive)
+
+    Returns:
+        {date: {asset_id: quantity}} (assets with zero quantity are omitted)
+    """
+    days, day = day_series(start_date, end_date)
+    stmt = (
+        select(day.label("day"), HoldingInterval.asset_id, HoldingInterval.quantity)
+        .select_from(days)
+        .join(
+            HoldingInterval,
+            func.daterange(HoldingInterval.valid_from, HoldingInterval.valid_to).op("@>")(day),
+        )
+        .where(HoldingInterval.quantity != 0)
+    )
+    result = await db.execute(stmt)
+
+    holdings: dict[date, dict[uuid.UUID, Decimal]] = {}
+    for row in result:
+        holdings.setdefault(row.day, {})[row.asset_id] = row.quantity
+    return holdings
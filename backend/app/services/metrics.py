@@ -0,0 +1,455 @@
+"""
+Prometheus-style runtime metrics.
+
+A small in-process registry rendered in the Prometheus text exposition
+format (``GET /metrics``). It covers:
+
+* HTTP requests: latency histogram and count per route template
+  (``/api/assets/{asset_id}``, not the raw path) and requests in flight,
+* database: query count / duration per statement type and connection
+  pool usage,
+* market data provider (yfinance): call count, latency and errors per
+  call type,
+* response cache, response compression, single-flight groups and
+  dedicated thread pools.
+
+Counters kept by other components (cache hits, pool stats) are read at
+scrape time by collectors instead of being duplicated on the hot path.
+Values are per worker process.
+"""
+
+import bisect
+import re
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from typing import TypeVar
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.services.compression import compression_stats
+from app.services.executors import executor_stats
+from app.services.query_stats import record_query
+from app.services.response_cache import response_cache
+from app.services.single_flight import single_flight_stats
+from app.services.slow_queries import slow_query_log
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+LabelValues = tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names: tuple[str, ...], values: LabelValues, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values, strict=True)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric(ABC):
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self._lock = threading.Lock()
+
+    def _key(self, labels: dict[str, str]) -> LabelValues:
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    @abstractmethod
+    def samples(self) -> Iterator[str]:
+        """Exposition lines of this metric, without the HELP / TYPE header."""
+
+    def render(self) -> str:
+        header = f"# HELP {self.name} {self.documentation}\n# TYPE {self.name} {self.kind}\n"
+        return header + "".join(line + "\n" for line in self.samples())
+
+
+class _ValueMetric(_Metric):
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def set(self, value: float, **labels: str) -> None:
+        """Set the value (for counters, the total kept by another component)."""
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def samples(self) -> Iterator[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        for values, value in items:
+            yield f"{self.name}{_format_labels(self.labelnames, values)} {_format_value(value)}"
+
+
+class Counter(_ValueMetric):
+    """Monotonically increasing value."""
+
+    kind = "counter"
+
+
+class Gauge(_ValueMetric):
+    """Value that can go up and down."""
+
+    kind = "gauge"
+
+    def dec(self, amount: float = 1, **labels: str) -> None:
+        self.inc(-amount, **labels)
+
+
+class Histogram(_Metric):
+    """Bucketed distribution of observed values (cumulative buckets on output)."""
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # {labels: [bucket counts..., +Inf count, sum]}
+        self._series: dict[LabelValues, list[float]] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * (len(self.buckets) + 2)
+            series[index] += 1
+            series[-1] += value
+
+    def samples(self) -> Iterator[str]:
+        with self._lock:
+            items = sorted((key, list(series)) for key, series in self._series.items())
+        for values, series in items:
+            cumulative = 0
+            for bound, count in zip((*self.buckets, float("inf")), series[:-1], strict=True):
+                cumulative += count
+                labels = _format_labels(self.labelnames, values, f'le="{_format_value(bound)}"')
+                yield f"{self.name}_bucket{labels} {int(cumulative)}"
+            labels = _format_labels(self.labelnames, values)
+            yield f"{self.name}_sum{labels} {_format_value(series[-1])}"
+            yield f"{self.name}_count{labels} {int(cumulative)}"
+
+
+M = TypeVar("M", bound=_Metric)
+
+
+class MetricsRegistry:
+    """Set of metrics plus collectors that refresh values at scrape time."""
+
+    def __init__(self) -> None:
+        self._metrics: list[_Metric] = []
+        self._collectors: list[Callable[[], None]] = []
+
+    def register(self, metric: M) -> M:
+        self._metrics.append(metric)
+        return metric
+
+    def add_collector(self, collector: Callable[[], None]) -> None:
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        """Run the collectors and render all metrics in the text format."""
+        for collector in self._collectors:
+            collector()
+        return "".join(metric.render() for metric in self._metrics)
+
+
+registry = MetricsRegistry()
+
+# ---------------------------------------------------------------------------
+# HTTP
+# ---------------------------------------------------------------------------
+http_requests = registry.register(
+    Counter(
+        "http_requests_total", "HTTP requests by route and status", ("method", "route", "status")
+    )
+)
+http_request_duration = registry.register(
+    Histogram(
+        "http_request_duration_seconds",
+        "HTTP request latency until the response is complete",
+        ("method", "route"),
+    )
+)
+http_requests_in_flight = registry.register(
+    Gauge("http_requests_in_flight", "HTTP requests being processed", ("method",))
+)
+
+# ---------------------------------------------------------------------------
+# Database
+# ---------------------------------------------------------------------------
+_DB_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5)
+_OPERATION = re.compile(r"\s*(?:/\*.*?\*/\s*)?(\w+)", re.DOTALL)
+_OPERATIONS = {"SELECT", "INSERT", "UPDATE", "DELETE", "WITH", "TRUNCATE", "ANALYZE"}
+
+db_queries = registry.register(
+    Counter("db_queries_total", "SQL statements executed", ("operation",))
+)
+db_query_errors = registry.register(
+    Counter("db_query_errors_total", "SQL statements that raised an error", ("operation",))
+)
+db_query_duration = registry.register(
+    Histogram(
+        "db_query_duration_seconds",
+        "SQL statement execution time (driver round trip)",
+        ("operation",),
+        buckets=_DB_BUCKETS,
+    )
+)
+db_pool_connections = registry.register(
+    Gauge("db_pool_connections", "Connection pool usage", ("state",))
+)
+
+# ---------------------------------------------------------------------------
+# Market data provider
+# ---------------------------------------------------------------------------
+provider_calls = registry.register(
+    Counter("provider_calls_total", "Market data provider calls", ("call", "outcome"))
+)
+provider_call_duration = registry.register(
+    Histogram(
+        "provider_call_duration_seconds",
+        "Market data provider call latency",
+        ("call",),
+        buckets=(0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30),
+    )
+)
+
+# ---------------------------------------------------------------------------
+# Caches and thread pools (read from their own counters at scrape time)
+# ---------------------------------------------------------------------------
+cache_requests = registry.register(
+    Counter("response_cache_requests_total", "Response cache lookups", ("result",))
+)
+cache_hit_ratio = registry.register(
+    Gauge("response_cache_hit_ratio", "Response cache hits / lookups since start")
+)
+cache_entries = registry.register(Gauge("response_cache_entries", "Cached responses"))
+cache_bytes = registry.register(Gauge("response_cache_bytes", "Size of cached response bodies"))
+compression_responses = registry.register(
+    Counter(
+        "response_compression_responses_total",
+        "Compressed responses (precompressed = served from the response cache)",
+        ("encoding", "source"),
+    )
+)
+compression_bytes = registry.register(
+    Counter(
+        "response_compression_bytes_total",
+        "Response bytes before (in) and after (out) compression",
+        ("encoding", "direction"),
+    )
+)
+compression_ratio = registry.register(
+    Gauge(
+        "response_compression_ratio",
+        "Compressed / uncompressed bytes since start",
+        ("encoding",),
+    )
+)
+compression_cpu = registry.register(
+    Counter(
+        "response_compression_cpu_seconds_total",
+        "CPU time spent compressing responses",
+        ("encoding",),
+    )
+)
+single_flight_calls = registry.register(
+    Counter(
+        "single_flight_calls_total",
+        "Single-flight callers that executed or joined a call",
+        ("name", "result"),
+    )
+)
+executor_tasks = registry.register(
+    Gauge("executor_tasks", "Thread pool tasks by state", ("pool", "state"))
+)
+executor_completed = registry.register(
+    Counter("executor_tasks_completed_total", "Finished thread pool tasks", ("pool", "outcome"))
+)
+executor_busy = registry.register(
+    Counter("executor_busy_seconds_total", "Time spent running tasks", ("pool",))
+)
+executor_wait = registry.register(
+    Counter("executor_wait_seconds_total", "Time tasks spent queued", ("pool",))
+)
+
+
+def _collect_caches() -> None:
+    hits, misses = response_cache.hits, response_cache.misses
+    cache_requests.set(hits, result="hit")
+    cache_requests.set(misses, result="miss")
+    cache_hit_ratio.set(hits / (hits + misses) if hits + misses else 0)
+    cache_entries.set(len(response_cache))
+    cache_bytes.set(response_cache.size_bytes)
+    for stats in single_flight_stats():
+        single_flight_calls.set(stats["calls"], name=stats["name"], result="executed")
+        single_flight_calls.set(stats["coalesced"], name=stats["name"], result="coalesced")
+
+
+def _collect_compression() -> None:
+    for encoding, stats in compression_stats().items():
+        compressed = stats.responses - stats.precompressed
+        compression_responses.set(compressed, encoding=encoding, source="compressed")
+        compression_responses.set(stats.precompressed, encoding=encoding, source="precompressed")
+        compression_bytes.set(stats.bytes_in, encoding=encoding, direction="in")
+        compression_bytes.set(stats.bytes_out, encoding=encoding, direction="out")
+        compression_ratio.set(
+            stats.bytes_out / stats.bytes_in if stats.bytes_in else 0, encoding=encoding
+        )
+        compression_cpu.set(stats.cpu_seconds, encoding=encoding)
+
+
+def _collect_executors() -> None:
+    for stats in executor_stats():
+        pool = stats["name"]
+        executor_tasks.set(stats["queued"], pool=pool, state="queued")
+        executor_tasks.set(stats["active"], pool=pool, state="active")
+        executor_completed.set(stats["completed"] - stats["failed"], pool=pool, outcome="ok")
+        executor_completed.set(stats["failed"], pool=pool, outcome="error")
+        executor_busy.set(stats["busy_seconds"], pool=pool)
+        executor_wait.set(stats["wait_seconds"], pool=pool)
+
+
+registry.add_collector(_collect_caches)
+registry.add_collector(_collect_compression)
+registry.add_collector(_collect_executors)
+
+
+def render_metrics() -> str:
+    """Current metrics in the Prometheus text exposition format."""
+    return registry.render()
+
+
+# ---------------------------------------------------------------------------
+# Instrumentation
+# ---------------------------------------------------------------------------
+@contextmanager
+def observe_provider_call(call: str) -> Iterator[None]:
+    """
+    Time one blocking provider call (usable from worker threads).
+
+    Args:
+        call: Call type, e.g. "history", "info", "fast_info"
+    """
+    started = time.perf_counter()
+    outcome = "error"
+    try:
+        yield
+        outcome = "ok"
+    finally:
+        provider_call_duration.observe(time.perf_counter() - started, call=call)
+        provider_calls.inc(call=call, outcome=outcome)
+
+
+def _operation(statement: str) -> str:
+    match = _OPERATION.match(statement)
+    verb = match.group(1).upper() if match else ""
+    return verb if verb in _OPERATIONS else "OTHER"
+
+
+def instrument_engine(engine: AsyncEngine) -> None:
+    """
+    Count and time every statement and expose pool usage.
+
+    Args:
+        engine: Engine to instrument (listeners go on its sync engine)
+    """
+    sync_engine = engine.sync_engine
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["query_started"].pop()
+        operation = _operation(statement)
+        db_queries.inc(operation=operation)
+        db_query_duration.observe(elapsed, operation=operation)
+        record_query(statement, elapsed)
+        slow_query_log.observe(statement, parameters, elapsed, executemany)
+
+    @event.listens_for(sync_engine, "handle_error")
+    def handle_error(context):
+        started = context.connection.info.get("query_started") if context.connection else None
+        if started:
+            started.pop()
+        db_query_errors.inc(operation=_operation(context.statement or ""))
+
+    def collect_pool() -> None:
+        pool = sync_engine.pool
+        for state in ("size", "checkedin", "checkedout", "overflow"):
+            method = getattr(pool, state, None)
+            if method is not None:
+                db_pool_connections.set(method(), state=state)
+
+    registry.add_collector(collect_pool)
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware recording per-route latency, status and in-flight count.
+
+    Requests are labelled with the route template the router selected
+    (``scope["route"]``); unmatched paths share one label to keep
+    cardinality bounded. The route is only known once routing has run, so
+    the in-flight gauge is labelled by method.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        status = 500
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        http_requests_in_flight.inc(method=method)
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - started
+            http_requests_in_flight.dec(method=method)
+            route = getattr(scope.get("route"), "path", "<unmatched>")
+            http_request_duration.observe(elapsed, method=method, route=route)
+            http_requests.inc(method=method, route=route, status=str(status))
@@ -0,0 +1,213 @@
+"""
+Opt-in per-request profiling.
+
+A request is profiled when it carries ``X-Profile-Token`` matching
+``PROFILING_TOKEN`` or is picked by ``PROFILING_SAMPLE_RATE``. The profile
+(cProfile) is written to ``PROFILING_DIR`` as a ``.pstats`` file plus a
+text report, and its id is returned in the ``X-Profile-Id`` response
+header so it can be fetched from the admin endpoints. The files are written
+in the background after the request finishes, so they may appear a moment
+after the response.
+
+When neither option is set the middleware is not installed at all, so
+normal requests pay nothing.
+
+cProfile follows the event loop thread: awaits of other requests running
+concurrently show up in the profile too, and work on the thread pools
+does not. Only one request is profiled at a time per worker.
+"""
+
+import asyncio
+import cProfile
+import hmac
+import io
+import logging
+import pstats
+import random
+import re
+import time
+import uuid
+from dataclasses import dataclass
+from datetime import UTC, datetime
+from pathlib import Path
+
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.database import settings
+from app.services.executors import cpu_executor
+
+logger = logging.getLogger(__name__)
+
+TOKEN_HEADER = b"x-profile-token"
+_SLUG = re.compile(r"[^A-Za-z0-9]+")
+_PROFILE_ID = re.compile(r"^\d{8}T\d{6}-[A-Za-z0-9-]+$")
+
+
+@dataclass(frozen=True)
+class ProfileInfo:
+    """Metadata of a saved profile."""
+
+    id: str
+    created_at: datetime
+    size_bytes: int
+
+
+class ProfileStore:
+    """Directory of saved profiles, keeping only the newest ``max_profiles``."""
+
+    def __init__(self, directory: str, max_profiles: int):
+        self.directory = Path(directory)
+        self.max_profiles = max_profiles
+
+    @staticmethod
+    def new_id(method: str, path: str) -> str:
+        """Profile id: UTC timestamp, request and a random suffix."""
+        created = datetime.now(UTC).strftime("%Y%m%dT%H%M%S")
+        slug = _SLUG.sub("-", f"{method} {path}").strip("-")[:60]
+        return f"{created}-{slug}-{uuid.uuid4().hex[:8]}"
+
+    def save(
+        self,
+        profile_id: str,
+        profiler: cProfile.Profile,
+        request: str,
+        elapsed: float,
+    ) -> None:
+        """
+        Write the profile as ``.pstats`` and a cumulative-time text report.
+
+        Args:
+            profile_id: Id from :meth:`new_id`
+            profiler: Finished profiler
+            request: "METHOD /path" for the report header
+            elapsed: Wall time of the request in seconds
+        """
+        self.directory.mkdir(parents=True, exist_ok=True)
+        profiler.dump_stats(self.directory / f"{profile_id}.pstats")
+        report = io.StringIO()
+        report.write(f"{request}  {elapsed * 1000:.1f} ms\n\n")
+        pstats.Stats(profiler, stream=report).sort_stats("cumulative").print_stats(60)
+        (self.directory / f"{profile_id}.txt").write_text(report.getvalue())
+        self._prune()
+
+    def _prune(self) -> None:
+        stats_files = sorted(self.directory.glob("*.pstats"), key=lambda p: p.stat().st_mtime)
+        for stale in stats_files[: max(0, len(stats_files) - self.max_profiles)]:
+            stale.unlink(missing_ok=True)
+            stale.with_suffix(".txt").unlink(missing_ok=True)
+
+    def entries(self) -> list[ProfileInfo]:
+        """Saved profiles, newest first."""
+        if not self.directory.is_dir():
+            return []
+        profiles = []
+        for stats_file in self.directory.glob("*.pstats"):
+            stat = stats_file.stat()
+            profiles.append(
+                ProfileInfo(
+                    id=stats_file.stem,
+                    created_at=datetime.fromtimestamp(stat.st_mtime, UTC),
+                    size_bytes=stat.st_size,
+                )
+            )
+        return sorted(profiles, key=lambda p: p.created_at, reverse=True)
+
+    def path(self, profile_id: str, suffix: str) -> Path | None:
+        """
+        File of a saved profile.
+
+        Args:
+            profile_id: Id returned in ``X-Profile-Id``
+            suffix: ".pstats" or ".txt"
+
+        Returns:
+            Path, or None if the id is malformed or unknown
+        """
+        if not _PROFILE_ID.match(profile_id):
+            return None
+        path = self.directory / f"{profile_id}{suffix}"
+        return path if path.is_file() else None
+
+
+class ProfilingMiddleware:
+    """ASGI middleware profiling requests selected by token header or sampling."""
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        store: ProfileStore,
+        token: str = "",
+        sample_rate: float = 0.0,
+    ):
+        """
+        Args:
+            app: ASGI application
+            store: Where profiles are written
+            token: Value of ``X-Profile-Token`` that requests profiling ("" = off)
+            sample_rate: Share of requests profiled without a token (0 = off)
+        """
+        self.app = app
+        self.store = store
+        self.token = token.encode()
+        self.sample_rate = sample_rate
+        self._busy = False
+        # 書き出し中のタスク（完了まで参照を保持する）
+        self._saving: set[asyncio.Task] = set()
+
+    def _selected(self, scope: Scope) -> bool:
+        if self.token:
+            for name, value in scope["headers"]:
+                if name == TOKEN_HEADER and hmac.compare_digest(value, self.token):
+                    return True
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or self._busy or not self._selected(scope):
+            await self.app(scope, receive, send)
+            return
+
+        profile_id = self.store.new_id(scope["method"], scope["path"])
+
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                MutableHeaders(scope=message).append("X-Profile-Id", profile_id)
+            await send(message)
+
+        self._busy = True
+        profiler = cProfile.Profile()
+        started = time.perf_counter()
+        profiler.enable()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            profiler.disable()
+            self._busy = False
+            # CPU 用スレッドプールで書き出し、完了を待たずに応答を終える
+            # （待つと切断時のキャンセルで保存されず、書き込みの間この呼び出しも終わらない）
+            task = asyncio.get_running_loop().create_task(
+                self._save(
+                    profile_id,
+                    profiler,
+                    f"{scope['method']} {scope['path']}",
+                    time.perf_counter() - started,
+                )
+            )
+            self._saving.add(task)
+            task.add_done_callback(self._saving.discard)
+
+    async def _save(
+        self, profile_id: str, profiler: cProfile.Profile, request: str, elapsed: float
+    ) -> None:
+        try:
+            await cpu_executor.run(self.store.save, profile_id, profiler, request, elapsed)
+        except Exception:
+            logger.exception("Saving profile %s failed", profile_id)
+
+
+profile_store = ProfileStore(settings.PROFILING_DIR, settings.PROFILING_MAX_PROFILES)
+
+
+def profiling_enabled() -> bool:
+    """Whether the profiling middleware should be installed."""
+    return bool(settings.PROFILING_TOKEN) or settings.PROFILING_SAMPLE_RATE > 0
@@ -0,0 +1,156 @@
+"""
+Per-request SQL statement accounting.
+
+The engine hooks installed by :func:`app.services.metrics.instrument_engine`
+report every statement to :func:`record_query`. While a request is being
+handled, its statements are counted against a :class:`RequestQueryStats`
+held in a context variable, so extra queries hidden in helpers or loops
+become visible:
+
+* ``Server-Timing: db;dur=12.3;desc="7 queries", app;dur=48.1`` on every
+  response (shown in the browser's network panel),
+* a warning log when a request exceeds the query budget or repeats the
+  same statement shape (a likely N+1 pattern).
+"""
+
+import logging
+import re
+import time
+from collections import Counter
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+logger = logging.getLogger(__name__)
+
+_PARAM = re.compile(r"\$\d+")
+# 展開された IN (...) のプレースホルダー列（型キャスト付きを含む）
+_PARAM_LIST = re.compile(r"\?(?:::\w+(?:\([\d\s,]*\))?)?(?:\s*,\s*\?(?:::\w+(?:\([\d\s,]*\))?)?)+")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def statement_shape(statement: str) -> str:
+    """
+    Normalize a statement so executions that differ only in bind values match.
+
+    Args:
+        statement: SQL as sent to the driver
+
+    Returns:
+        Statement with placeholders (and expanded IN lists) collapsed to ``?``
+    """
+    shape = _PARAM_LIST.sub("?", _PARAM.sub("?", statement))
+    return _WHITESPACE.sub(" ", shape).strip()
+
+
+@dataclass
+class RequestQueryStats:
+    """Statements executed while handling one request."""
+
+    scope: Scope | None = None
+    count: int = 0
+    seconds: float = 0.0
+    # 生の SQL 文ごとの実行回数（正規化は集計時に行う）
+    statements: Counter[str] = field(default_factory=Counter)
+
+    def repeated(self, threshold: int) -> list[tuple[str, int]]:
+        """Statement shapes executed at least ``threshold`` times, most frequent first."""
+        shapes: Counter[str] = Counter()
+        for statement, count in self.statements.items():
+            shapes[statement_shape(statement)] += count
+        return [(shape, count) for shape, count in shapes.most_common() if count >= threshold]
+
+    def server_timing(self, elapsed: float) -> str:
+        """``Server-Timing`` header value for the statements so far."""
+        return (
+            f'db;dur={self.seconds * 1000:.1f};desc="{self.count} queries", '
+            f"app;dur={elapsed * 1000:.1f}"
+        )
+
+
+_current: ContextVar[RequestQueryStats | None] = ContextVar("request_query_stats", default=None)
+
+
+def current_route() -> str | None:
+    """
+    "METHOD /route/{template}" of the request being handled.
+
+    Falls back to the raw path before routing has run; None outside requests.
+    """
+    stats = _current.get()
+    if stats is None or stats.scope is None:
+        return None
+    scope = stats.scope
+    path = getattr(scope.get("route"), "path", scope["path"])
+    return f"{scope['method']} {path}"
+
+
+def record_query(statement: str, elapsed: float) -> None:
+    """Count one statement against the current request (no-op outside requests)."""
+    stats = _current.get()
+    if stats is not None:
+        stats.count += 1
+        stats.seconds += elapsed
+        stats.statements[statement] += 1
+
+
+class QueryStatsMiddleware:
+    """
+    ASGI middleware adding ``Server-Timing`` and warning about query-heavy requests.
+
+    Statements issued after the response has started (streamed bodies) are
+    not in the header but are included in the budget check.
+    """
+
+    def __init__(self, app: ASGIApp, budget: int = 0, repeat_threshold: int = 0):
+        """
+        Args:
+            app: ASGI application
+            budget: Warn when a request executes more statements (0 = off)
+            repeat_threshold: Warn when one statement shape runs this often (0 = off)
+        """
+        self.app = app
+        self.budget = budget
+        self.repeat_threshold = repeat_threshold
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestQueryStats(scope=scope)
+        token = _current.set(stats)
+        started = time.perf_counter()
+
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                headers = MutableHeaders(scope=message)
+                headers.append("Server-Timing", stats.server_timing(time.perf_counter() - started))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _current.reset(token)
+            self._check(scope, stats)
+
+    def _check(self, scope: Scope, stats: RequestQueryStats) -> None:
+        request = f"{scope['method']} {scope['path']}"
+        if self.budget and stats.count > self.budget:
+            logger.warning(
+                "%s executed %d SQL statements (budget %d, %.1f ms)",
+                request,
+                stats.count,
+                self.budget,
+                stats.seconds * 1000,
+            )
+        if self.repeat_threshold:
+            for shape, count in stats.repeated(self.repeat_threshold):
+                logger.warning(
+                    "%s repeated the same statement %d times (possible N+1): %s",
+                    request,
+                    count,
+                    shape[:300],
+                )
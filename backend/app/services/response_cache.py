@@ -0,0 +1,157 @@
+"""
+In-memory response cache keyed by (endpoint, params, data version).
+
+Entries hold already-serialized JSON bodies, so a hit costs one dict lookup.
+Compressed variants of a body (gzip / brotli) are added to its entry the
+first time a client asks for them and count towards the size limit.
+Because the data version is part of the key, an entry can never be served
+after a write; entries for older versions are purged as soon as a newer
+version is observed (by a write in this process or a read that sees a bump
+made by another worker or script).
+"""
+
+from collections import OrderedDict
+from collections.abc import Hashable
+from dataclasses import dataclass, field
+
+from app.database import settings
+
+CacheKey = tuple[str, tuple[Hashable, ...], int]
+
+
+@dataclass
+class CacheEntry:
+    """A serialized body and its compressed variants."""
+
+    body: bytes
+    # Content-Encoding → 圧縮済みのボディ
+    encoded: dict[str, bytes] = field(default_factory=dict)
+
+    @property
+    def size(self) -> int:
+        return len(self.body) + sum(len(data) for data in self.encoded.values())
+
+
+class ResponseCache:
+    """Size-bounded LRU cache of serialized responses."""
+
+    def __init__(self, max_entries: int, max_bytes: int) -> None:
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries: OrderedDict[CacheKey, CacheEntry] = OrderedDict()
+        self._size_bytes = 0
+        self._latest_version = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, endpoint: str, params: tuple[Hashable, ...], version: int) -> CacheEntry | None:
+        """
+        Look up a cached body.
+
+        Args:
+            endpoint: Endpoint name
+            params: Query parameters that affect the response
+            version: Current portfolio data version
+
+        Returns:
+            Cache entry, or None on a miss
+        """
+        self._observe(version)
+        key = (endpoint, params, version)
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry
+
+    def set(self, endpoint: str, params: tuple[Hashable, ...], version: int, body: bytes) -> None:
+        """
+        Store a serialized body, evicting least recently used entries if needed.
+
+        Args:
+            endpoint: Endpoint name
+            params: Query parameters that affect the response
+            version: Data version the body was computed from
+            body: Serialized body
+        """
+        if version < self._latest_version or len(body) > self.max_bytes:
+            return
+        self._observe(version)
+        key = (endpoint, params, version)
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self._size_bytes -= old.size
+        self._entries[key] = CacheEntry(body)
+        self._size_bytes += len(body)
+        self._evict()
+
+    def set_encoded(
+        self,
+        endpoint: str,
+        params: tuple[Hashable, ...],
+        version: int,
+        encoding: str,
+        data: bytes,
+    ) -> None:
+        """
+        Attach a compressed variant to a cached body (no-op if it was evicted meanwhile).
+
+        Args:
+            endpoint: Endpoint name
+            params: Query parameters that affect the response
+            version: Data version the body was computed from
+            encoding: Content-Encoding of ``data``
+            data: Compressed body
+        """
+        entry = self._entries.get((endpoint, params, version))
+        if entry is None or encoding in entry.encoded:
+            return
+        entry.encoded[encoding] = data
+        self._size_bytes += len(data)
+        self._evict()
+
+    def _evict(self) -> None:
+        while len(self._entries) > self.max_entries or self._size_bytes > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self._size_bytes -= evicted.size
+
+    def invalidate_before(self, version: int) -> None:
+        """
+        Drop every entry computed from a version older than ``version``.
+
+        Called by write paths right after bumping the version. The bump is
+        not committed yet, so this does not raise the observed version.
+
+        Args:
+            version: Newly bumped data version
+        """
+        stale = [key for key in self._entries if key[2] < version]
+        for key in stale:
+            self._size_bytes -= self._entries.pop(key).size
+
+    def _observe(self, version: int) -> None:
+        """Record a committed version seen by a reader and purge older entries."""
+        if version > self._latest_version:
+            self._latest_version = version
+            self.invalidate_before(version)
+
+    def clear(self) -> None:
+        """Remove all entries."""
+        self._entries.clear()
+        self._size_bytes = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def size_bytes(self) -> int:
+        """Total size of cached bodies (including compressed variants) in bytes."""
+        return self._size_bytes
+
+
+response_cache = ResponseCache(
+    max_entries=settings.RESPONSE_CACHE_MAX_ENTRIES,
+    max_bytes=settings.RESPONSE_CACHE_MAX_BYTES,
+)
@@ -0,0 +1,72 @@
+"""
+Async single-flight: coalesce identical concurrent calls.
+
+While a call for a key is in flight, further callers with the same key
+await that call instead of starting their own, and all of them receive the
+same result (or exception). Nothing is cached once the call finishes.
+"""
+
+import asyncio
+from collections.abc import Awaitable, Callable, Hashable
+from typing import Generic, TypeVar
+
+T = TypeVar("T")
+
+# 生成済みのインスタンス（メトリクス出力用）
+_flights: list["SingleFlight"] = []
+
+
+class SingleFlight(Generic[T]):
+    """Per-key deduplication of in-flight coroutines."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self._in_flight: dict[Hashable, asyncio.Task[T]] = {}
+        self.calls = 0
+        self.coalesced = 0
+        _flights.append(self)
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[T]]) -> T:
+        """
+        Run ``fn()`` once per key among concurrent callers.
+
+        The shared call runs as its own task and is shielded, so a caller
+        that is cancelled (e.g. client disconnect) does not cancel the fetch
+        for the others.
+
+        Args:
+            key: Identity of the call (e.g. (symbol, period))
+            fn: Zero-argument coroutine factory
+
+        Returns:
+            Result of the shared call
+        """
+        task = self._in_flight.get(key)
+        if task is None:
+            self.calls += 1
+            task = asyncio.ensure_future(fn())
+            self._in_flight[key] = task
+            task.add_done_callback(lambda t: self._finish(key, t))
+        else:
+            self.coalesced += 1
+        return await asyncio.shield(task)
+
+    def _finish(self, key: Hashable, task: asyncio.Task[T]) -> None:
+        self._in_flight.pop(key, None)
+        # 呼び出し元が全員キャンセルされた場合も例外を回収済みにする
+        if not task.cancelled():
+            task.exception()
+
+    def stats(self) -> dict[str, int | str]:
+        """Counters: executed calls, coalesced callers and calls in flight."""
+        return {
+            "name": self.name,
+            "calls": self.calls,
+            "coalesced": self.coalesced,
+            "in_flight": len(self._in_flight),
+        }
+
+
+def single_flight_stats() -> list[dict[str, int | str]]:
+    """Counters of all single-flight groups."""
+    return [flight.stats() for flight in _flights]
@@ -0,0 +1,153 @@
+"""
+Slow query log with sampled EXPLAIN (ANALYZE, BUFFERS) capture.
+
+Statements slower than ``SLOW_QUERY_MS`` are logged together with the
+originating route and the types of their bound parameters (never the
+values), and aggregated per statement shape into a rolling top-N report
+(``GET /api/admin/slow-queries``).
+
+For a sampled share of slow ``SELECT`` statements the plan is captured by
+re-running the statement under ``EXPLAIN (ANALYZE, BUFFERS)`` on a
+separate connection in a transaction that is rolled back. Sequential
+scans found in the plan are listed in the report, so a lost index on
+``asset_histories`` shows up as soon as the query turns slow.
+"""
+
+import asyncio
+import contextvars
+import logging
+import random
+import re
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from datetime import UTC, datetime
+from typing import Any
+
+from app.database import engine, settings
+from app.services.query_stats import current_route, statement_shape
+
+logger = logging.getLogger(__name__)
+
+# 同じ形の SQL の実行計画は一定間隔でのみ取り直す
+EXPLAIN_INTERVAL_SECONDS = 600
+# 集計する SQL の形の上限（超えたら累計時間の小さいものから捨てる）
+MAX_SHAPES = 500
+
+_READ_ONLY = re.compile(r"^\s*SELECT\b", re.IGNORECASE)
+_LOCKING = re.compile(r"\bFOR\s+(?:NO\s+KEY\s+)?(?:UPDATE|SHARE)\b", re.IGNORECASE)
+_SEQ_SCAN = re.compile(r"Seq Scan on (\w+)")
+
+
+@dataclass
+class SlowQuery:
+    """Aggregated slow executions of one statement shape."""
+
+    shape: str
+    count: int = 0
+    total_seconds: float = 0.0
+    max_seconds: float = 0.0
+    last_seen: datetime | None = None
+    parameter_types: tuple[str, ...] = ()
+    routes: Counter[str] = field(default_factory=Counter)
+    plan: str | None = None
+    plan_captured_at: datetime | None = None
+    seq_scans: list[str] = field(default_factory=list)
+
+
+def _parameter_types(parameters: Any, executemany: bool) -> tuple[str, ...]:
+    if executemany and parameters:
+        return (*_parameter_types(parameters[0], False), f"x{len(parameters)}")
+    if isinstance(parameters, dict):
+        return tuple(f"{key}:{type(value).__name__}" for key, value in sorted(parameters.items()))
+    if isinstance(parameters, list | tuple):
+        return tuple(type(value).__name__ for value in parameters)
+    return ()
+
+
+class SlowQueryLog:
+    """Records statements over the threshold; see module docstring."""
+
+    def __init__(self, threshold_ms: int, explain_rate: float, top_n: int):
+        self.threshold = threshold_ms / 1000
+        self.explain_rate = explain_rate
+        self.top_n = top_n
+        self._queries: dict[str, SlowQuery] = {}
+        self._explain_task: asyncio.Task | None = None
+
+    def observe(self, statement: str, parameters: Any, elapsed: float, executemany: bool) -> None:
+        """
+        Record one execution if it exceeded the threshold (called for every statement).
+
+        Args:
+            statement: SQL as sent to the driver
+            parameters: Bound parameters
+            elapsed: Execution time in seconds
+            executemany: Whether ``parameters`` is a batch
+        """
+        if not self.threshold or elapsed < self.threshold or statement.startswith("EXPLAIN"):
+            return
+
+        shape = statement_shape(statement)
+        route = current_route() or "(background)"
+        logger.warning("Slow query (%.1f ms) from %s: %s", elapsed * 1000, route, shape[:300])
+
+        entry = self._queries.get(shape)
+        if entry is None:
+            if len(self._queries) >= MAX_SHAPES:
+                smallest = min(self._queries.values(), key=lambda q: q.total_seconds)
+                del self._queries[smallest.shape]
+            entry = self._queries[shape] = SlowQuery(shape=shape)
+        entry.count += 1
+        entry.total_seconds += elapsed
+        entry.max_seconds = max(entry.max_seconds, elapsed)
+        entry.last_seen = datetime.now(UTC)
+        entry.parameter_types = _parameter_types(parameters, executemany)
+        entry.routes[route] += 1
+
+        if self._should_explain(entry, statement, executemany):
+            # リクエストの SQL 集計に含めないよう空のコンテキストで実行する
+            self._explain_task = asyncio.get_running_loop().create_task(
+                self._explain(entry, statement, parameters), context=contextvars.Context()
+            )
+
+    def _should_explain(self, entry: SlowQuery, statement: str, executemany: bool) -> bool:
+        if self._explain_task is not None and not self._explain_task.done():
+            return False
+        if executemany or random.random() >= self.explain_rate:
+            return False
+        # ANALYZE は実際に SQL を実行するため、更新系やロックを取る SQL は対象外
+        if not _READ_ONLY.match(statement) or _LOCKING.search(statement):
+            return False
+        captured = entry.plan_captured_at
+        return captured is None or time.time() - captured.timestamp() > EXPLAIN_INTERVAL_SECONDS
+
+    async def _explain(self, entry: SlowQuery, statement: str, parameters: Any) -> None:
+        try:
+            async with engine.connect() as conn:
+                result = await conn.exec_driver_sql(
+                    f"EXPLAIN (ANALYZE, BUFFERS) {statement}", parameters
+                )
+                plan = "\n".join(row[0] for row in result)
+                await conn.rollback()
+            entry.plan = plan
+            entry.plan_captured_at = datetime.now(UTC)
+            entry.seq_scans = sorted(set(_SEQ_SCAN.findall(plan)))
+        except Exception as e:
+            logger.warning("EXPLAIN failed for slow query: %s", e)
+
+    def report(self) -> list[SlowQuery]:
+        """Top ``top_n`` statement shapes by total slow time."""
+        return sorted(self._queries.values(), key=lambda q: q.total_seconds, reverse=True)[
+            : self.top_n
+        ]
+
+    def clear(self) -> None:
+        self._queries.clear()
+
+
+slow_query_log = SlowQueryLog(
+    threshold_ms=settings.SLOW_QUERY_MS,
+    explain_rate=settings.SLOW_QUERY_EXPLAIN_RATE,
+    top_n=settings.SLOW_QUERY_TOP_N,
+)
@@ -0,0 +1,138 @@
+"""
+Dirty-range tracking for snapshots.
+
+Snapshots are only regenerated by the valuation pipeline, so a write that
+changes the past (a back-dated purchase, a cash movement dated before
+today, an imported statement) would otherwise leave every later snapshot
+wrong. Such writes call :func:`mark_snapshots_dirty` with the earliest day
+they affect, inside their own transaction; the single-row
+``snapshot_invalidation`` table keeps the minimum of those days.
+:mod:`app.services.snapshot_worker` recomputes from that day onwards and
+clears the marker.
+
+Each mark also increments ``generation``. The worker clears the marker only
+if the generation is unchanged, so a mark made while it was recomputing is
+picked up by the next run instead of being lost.
+"""
+
+from dataclasses import dataclass
+from datetime import date, datetime
+
+from sqlalchemy import select, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql import func
+
+from app.models import SnapshotInvalidation
+
+# 単一行テーブルの固定ID
+INVALIDATION_ROW_ID = 1
+
+
+@dataclass(frozen=True)
+class DirtyRange:
+    """Pending invalidation: snapshots from ``dirty_from`` to today are stale."""
+
+    dirty_from: date
+    generation: int
+    attempts: int
+
+
+async def mark_snapshots_dirty(db: AsyncSession, from_date: date | datetime) -> None:
+    """
+    Mark the snapshots from ``from_date`` onwards as stale, within the caller's transaction.
+
+    Only back-dated changes mark anything: today's snapshot holds intraday
+    values and is rewritten by the next refresh, and later ones do not exist yet.
+
+    Args:
+        db: Database session
+        from_date: Earliest affected day (datetimes are truncated to the date)
+    """
+    if isinstance(from_date, datetime):
+        from_date = from_date.date()
+    if from_date >= date.today():
+        return
+
+    stmt = (
+        insert(SnapshotInvalidation)
+        .values(id=INVALIDATION_ROW_ID, dirty_from=from_date, generation=1, updated_at=func.now())
+        .on_conflict_do_update(
+            index_elements=[SnapshotInvalidation.id],
+            set_={
+                "dirty_from": func.least(
+                    func.coalesce(SnapshotInvalidation.dirty_from, from_date), from_date
+                ),
+                "generation": SnapshotInvalidation.generation + 1,
+                "attempts": 0,
+                "updated_at": func.now(),
+            },
+        )
+    )
+    await db.execute(stmt)
+
+
+async def get_dirty_range(db: AsyncSession) -> DirtyRange | None:
+    """
+    Read the pending invalidation.
+
+    Args:
+        db: Database session
+
+    Returns:
+        Pending range, or None if every snapshot is up to date
+    """
+    result = await db.execute(
+        select(
+            SnapshotInvalidation.dirty_from,
+            SnapshotInvalidation.generation,
+            SnapshotInvalidation.attempts,
+        ).where(
+            SnapshotInvalidation.id == INVALIDATION_ROW_ID,
+            SnapshotInvalidation.dirty_from.is_not(None),
+        )
+    )
+    row = result.one_or_none()
+    if row is None:
+        return None
+    return DirtyRange(dirty_from=row.dirty_from, generation=row.generation, attempts=row.attempts)
+
+
+async def clear_dirty_range(db: AsyncSession, generation: int) -> bool:
+    """
+    Clear the marker if nothing was marked since ``generation`` was read.
+
+    Args:
+        db: Database session
+        generation: Generation of the range that was recomputed
+
+    Returns:
+        True if cleared, False if a newer mark is pending
+    """
+    result = await db.execute(
+        update(SnapshotInvalidation)
+        .where(
+            SnapshotInvalidation.id == INVALIDATION_ROW_ID,
+            SnapshotInvalidation.generation == generation,
+        )
+        .values(dirty_from=None, attempts=0, updated_at=func.now())
+    )
+    return result.rowcount > 0
+
+
+async def record_failed_attempt(db: AsyncSession, generation: int) -> None:
+    """
+    Count a failed recomputation of ``generation`` (a newer mark resets the count).
+
+    Args:
+        db: Database session
+        generation: Generation of the range that failed
+    """
+    await db.execute(
+        update(SnapshotInvalidation)
+        .where(
+            SnapshotInvalidation.id == INVALIDATION_ROW_ID,
+            SnapshotInvalidation.generation == generation,
+        )
+        .values(attempts=SnapshotInvalidation.attempts + 1, updated_at=func.now())
+    )
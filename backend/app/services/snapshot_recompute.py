@@ -0,0 +1,137 @@
+"""
+Snapshot recomputation for a date range in one statement.
+
+``asset_snapshots`` is derived data: for each day, the category totals of
+``asset_histories`` (USD assets converted at that day's ``fx_rates`` rate),
+the cash balance from the cash ledger and the number of assets held.
+:func:`recompute_snapshots` regenerates any range with a single
+``INSERT ... SELECT ... ON CONFLICT DO UPDATE``: one grouped pass over the
+histories joined with FX, a running sum over the daily ledger totals, and
+an upsert keyed on the snapshot date. Nothing is deleted, so callers can
+recompute just the days a change affects.
+
+Days holding USD assets without an FX rate for that day are left out
+(and reported by the caller) rather than written with a wrong total.
+"""
+
+from datetime import date, timedelta
+
+from sqlalchemy import and_, case, func, literal, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models import Asset, AssetHistory, AssetSnapshot, CashLedgerEntry, FxRate
+from app.services.cash_ledger import get_cash_balance_on
+from app.services.holdings import day_series
+
+# 円換算に使う為替レート
+USD_JPY_PAIR = "USDJPY"
+# 現金カテゴリID（現金は台帳の残高を使う）
+CASH_CATEGORY_ID = 4
+
+# カテゴリID → スナップショットの列
+CATEGORY_COLUMNS = {1: "japanese_stocks", 2: "us_stocks", 3: "investment_trusts"}
+
+
+async def recompute_snapshots(db: AsyncSession, start_date: date, end_date: date) -> list[date]:
+    """
+    Regenerate the snapshots of every day in ``[start_date, end_date]``.
+
+    Runs the opening cash balance lookup plus one INSERT ... SELECT; the
+    caller commits (and bumps the data version).
+
+    Args:
+        db: Database session
+        start_date: First day (inclusive)
+        end_date: Last day (inclusive)
+
+    Returns:
+        Days written, in order (days missing an FX rate are not included)
+    """
+    if start_date > end_date:
+        return []
+
+    days, day = day_series(start_date, end_date)
+
+    # 銘柄の評価額（円）。USD 建てでその日のレートがなければ NULL
+    value_jpy = AssetHistory.value * case((Asset.currency == "USD", FxRate.rate), else_=literal(1))
+    histories = (
+        select(
+            AssetHistory.record_date.label("day"),
+            *(
+                func.round(
+                    func.coalesce(func.sum(value_jpy).filter(Asset.category_id == category), 0),
+                    2,
+                ).label(column)
+                for category, column in CATEGORY_COLUMNS.items()
+            ),
+            func.count().label("holding_count"),
+            func.bool_or(and_(Asset.currency == "USD", FxRate.rate.is_(None))).label("missing_fx"),
+        )
+        .join(Asset, Asset.id == AssetHistory.asset_id)
+        .outerjoin(
+            FxRate,
+            and_(FxRate.pair == USD_JPY_PAIR, FxRate.rate_date == AssetHistory.record_date),
+        )
+        .where(
+            AssetHistory.record_date >= start_date,
+            AssetHistory.record_date <= end_date,
+            Asset.category_id != CASH_CATEGORY_ID,
+        )
+        .group_by(AssetHistory.record_date)
+        .subquery("histories")
+    )
+
+    ledger = (
+        select(
+            CashLedgerEntry.entry_date.label("day"),
+            func.sum(CashLedgerEntry.amount).label("amount"),
+        )
+        .where(CashLedgerEntry.entry_date >= start_date, CashLedgerEntry.entry_date <= end_date)
+        .group_by(CashLedgerEntry.entry_date)
+        .subquery("ledger")
+    )
+
+    # 期首残高 + 期間内の入出金の累計（欠損日を除く前に累計する）
+    opening_cash = await get_cash_balance_on(db, start_date - timedelta(days=1))
+    cash = literal(opening_cash) + func.coalesce(
+        func.sum(func.coalesce(ledger.c.amount, 0)).over(order_by=day), 0
+    )
+    daily = (
+        select(
+            day.label("snapshot_date"),
+            *(
+                func.coalesce(histories.c[column], 0).label(column)
+                for column in CATEGORY_COLUMNS.values()
+            ),
+            cash.label("cash"),
+            func.coalesce(histories.c.holding_count, 0).label("holding_count"),
+            func.coalesce(histories.c.missing_fx, False).label("missing_fx"),
+        )
+        .select_from(days)
+        .outerjoin(histories, histories.c.day == day)
+        .outerjoin(ledger, ledger.c.day == day)
+        .subquery("daily")
+    )
+
+    columns = [*CATEGORY_COLUMNS.values(), "cash", "holding_count"]
+    rows = select(
+        daily.c.snapshot_date,
+        *(daily.c[column] for column in columns),
+        (
+            daily.c.japanese_stocks + daily.c.us_stocks + daily.c.investment_trusts + daily.c.cash
+        ).label("total_assets"),
+    ).where(daily.c.missing_fx.is_(False))
+
+    stmt = insert(AssetSnapshot).from_select(
+        ["snapshot_date", *columns, "total_assets"], rows, include_defaults=False
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["snapshot_date"],
+        set_={
+            **{column: stmt.excluded[column] for column in [*columns, "total_assets"]},
+            "created_at": func.now(),
+        },
+    ).returning(AssetSnapshot.snapshot_date)
+    result = await db.execute(stmt)
+    return sorted(result.scalars())
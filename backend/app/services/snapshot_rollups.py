@@ -0,0 +1,94 @@
+"""
+Snapshot rollups computed in SQL.
+
+Picks the last daily snapshot of each week / month / quarter / year with
+``DISTINCT ON (date_trunc(...))`` so only one row per bucket is transferred
+and hydrated, regardless of how many daily snapshots the window contains.
+"""
+
+from collections.abc import Sequence
+from datetime import date, timedelta
+from typing import Literal
+
+from sqlalchemy import Row, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models import AssetSnapshot
+
+RollupUnit = Literal["week", "month", "quarter", "year"]
+
+
+def bucket_start(unit: RollupUnit, d: date) -> date:
+    """
+    Return the first day of the bucket containing ``d``.
+
+    Matches PostgreSQL ``date_trunc`` (weeks start on Monday).
+
+    Args:
+        unit: Bucket unit
+        d: Any date
+
+    Returns:
+        First day of the bucket
+    """
+    if unit == "week":
+        return d - timedelta(days=d.weekday())
+    if unit == "month":
+        return d.replace(day=1)
+    if unit == "quarter":
+        return date(d.year, (d.month - 1) // 3 * 3 + 1, 1)
+    return date(d.year, 1, 1)
+
+
+def shift_buckets(unit: RollupUnit, start: date, count: int) -> date:
+    """
+    Move a bucket start date by ``count`` buckets (negative moves backwards).
+
+    Args:
+        unit: Bucket unit
+        start: First day of a bucket
+        count: Number of buckets to move
+
+    Returns:
+        First day of the target bucket
+    """
+    if unit == "week":
+        return start + timedelta(weeks=count)
+    months_per_bucket = {"month": 1, "quarter": 3, "year": 12}[unit]
+    month_index = start.year * 12 + start.month - 1 + count * months_per_bucket
+    return date(month_index // 12, month_index % 12 + 1, 1)
+
+
+async def fetch_bucket_closing_snapshots(
+    db: AsyncSession,
+    unit: RollupUnit,
+    start_date: date,
+) -> Sequence[Row]:
+    """
+    Fetch the last snapshot of each bucket on or after ``start_date``.
+
+    Args:
+        db: Database session
+        unit: Bucket unit passed to ``date_trunc``
+        start_date: First date to include
+
+    Returns:
+        Rows (snapshot_date, japanese_stocks, us_stocks, investment_trusts, cash,
+        total_assets) ordered by bucket, one per bucket
+    """
+    bucket = func.date_trunc(unit, AssetSnapshot.snapshot_date)
+    stmt = (
+        select(
+            AssetSnapshot.snapshot_date,
+            AssetSnapshot.japanese_stocks,
+            AssetSnapshot.us_stocks,
+            AssetSnapshot.investment_trusts,
+            AssetSnapshot.cash,
+            AssetSnapshot.total_assets,
+        )
+        .where(AssetSnapshot.snapshot_date >= start_date)
+        .distinct(bucket)
+        .order_by(bucket, AssetSnapshot.snapshot_date.desc())
+    )
+    result = await db.execute(stmt)
+    return result.all()
@@ -0,0 +1,192 @@
+"""
+Background recomputation of invalidated snapshots.
+
+Started from the application lifespan. Every ``SNAPSHOT_WORKER_INTERVAL``
+seconds it reads the marker kept by
+:mod:`app.services.snapshot_invalidation` and, if some day is dirty:
+
+1. rewrites the quantity and value of the ``asset_histories`` rows from
+   that day whose holding changed (the price is kept; rows of days on which
+   the asset is no longer held are deleted),
+2. runs :func:`app.services.valuation.run_daily_valuation` from that day
+   with ``resume``, which fetches only the newly held days and regenerates
+   the snapshots of the range,
+3. clears the marker unless a newer mark arrived in the meantime (that
+   one is processed on the next tick).
+
+Only the range from the earliest dirty day to today is recomputed, never
+the whole history. With several worker processes a PostgreSQL advisory lock
+makes sure only one of them recomputes at a time. A failing run is retried
+on the next tick, up to ``SNAPSHOT_WORKER_MAX_ATTEMPTS`` times per mark.
+"""
+
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+from datetime import date, datetime
+
+from sqlalchemy import and_, delete, exists, func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql.elements import ColumnElement
+
+from app.database import async_session_maker, engine, settings
+from app.models import AssetHistory, HoldingInterval
+from app.services.snapshot_invalidation import (
+    clear_dirty_range,
+    get_dirty_range,
+    record_failed_attempt,
+)
+from app.services.valuation import run_daily_valuation
+
+logger = logging.getLogger(__name__)
+
+# 複数プロセスで同時に再計算しないためのアドバイザリロックのキー
+ADVISORY_LOCK_KEY = 0x5A5F_0050
+
+
+@dataclass
+class SnapshotWorkerState:
+    """Activity of the snapshot worker in this process."""
+
+    runs: int = 0
+    failures: int = 0
+    last_run_at: datetime | None = None
+    last_dirty_from: date | None = None
+    last_duration_ms: float | None = None
+    last_snapshots: int = 0
+    error: str | None = None
+
+    def as_dict(self) -> dict:
+        return {
+            "enabled": settings.SNAPSHOT_WORKER_INTERVAL > 0,
+            "runs": self.runs,
+            "failures": self.failures,
+            "last_run_at": self.last_run_at.isoformat() if self.last_run_at else None,
+            "last_dirty_from": self.last_dirty_from.isoformat() if self.last_dirty_from else None,
+            "last_duration_ms": (
+                round(self.last_duration_ms, 1) if self.last_duration_ms is not None else None
+            ),
+            "last_snapshots": self.last_snapshots,
+            "error": self.error,
+        }
+
+
+snapshot_worker_state = SnapshotWorkerState()
+
+
+def _covering(day: ColumnElement[date]) -> ColumnElement[bool]:
+    """Holding interval of the history row's asset that contains ``day``."""
+    return and_(
+        HoldingInterval.asset_id == AssetHistory.asset_id,
+        func.daterange(HoldingInterval.valid_from, HoldingInterval.valid_to).op("@>")(day),
+    )
+
+
+async def _sync_history_quantities(db: AsyncSession, start: date) -> None:
+    """
+    Align the stored history rows from ``start`` with the holding intervals.
+
+    Rows are revalued at their stored price; days without a row are left
+    to the valuation pipeline, which fetches them.
+    """
+    await db.execute(
+        update(AssetHistory)
+        .where(
+            AssetHistory.record_date >= start,
+            _covering(AssetHistory.record_date),
+            HoldingInterval.quantity != 0,
+            AssetHistory.quantity.is_distinct_from(HoldingInterval.quantity),
+        )
+        .values(
+            quantity=HoldingInterval.quantity,
+            value=func.round(AssetHistory.price * HoldingInterval.quantity, 2),
+        )
+        .execution_options(synchronize_session=False)
+    )
+    # 売却済みの日の行は削除する（区間のない日付は移行前のデータなので残す）
+    await db.execute(
+        delete(AssetHistory)
+        .where(
+            AssetHistory.record_date >= start,
+            exists(
+                select(HoldingInterval.id).where(
+                    _covering(AssetHistory.record_date), HoldingInterval.quantity == 0
+                )
+            ),
+        )
+        .execution_options(synchronize_session=False)
+    )
+    await db.commit()
+
+
+async def process_dirty_snapshots() -> bool:
+    """
+    Recompute the invalidated snapshots once, if any.
+
+    Returns:
+        True if a range was recomputed (or attempted), False if there was
+        nothing to do or another process holds the lock
+    """
+    async with engine.connect() as lock_conn:
+        locked = await lock_conn.scalar(select(func.pg_try_advisory_lock(ADVISORY_LOCK_KEY)))
+        await lock_conn.commit()
+        if not locked:
+            return False
+        try:
+            async with async_session_maker() as session:
+                dirty = await get_dirty_range(session)
+                await session.commit()
+                if dirty is None or dirty.attempts >= settings.SNAPSHOT_WORKER_MAX_ATTEMPTS:
+                    return False
+                await _recompute(session, dirty.dirty_from, dirty.generation)
+            return True
+        finally:
+            await lock_conn.scalar(select(func.pg_advisory_unlock(ADVISORY_LOCK_KEY)))
+            await lock_conn.commit()
+
+
+async def _recompute(session: AsyncSession, dirty_from: date, generation: int) -> None:
+    state = snapshot_worker_state
+    state.runs += 1
+    state.last_run_at = datetime.now()
+    state.last_dirty_from = dirty_from
+    started = time.perf_counter()
+    try:
+        await _sync_history_quantities(session, dirty_from)
+        result = await run_daily_valuation(session, start_date=dirty_from, resume=True)
+        cleared = await clear_dirty_range(session, generation)
+        await session.commit()
+    except Exception as e:
+        await session.rollback()
+        await record_failed_attempt(session, generation)
+        await session.commit()
+        state.failures += 1
+        state.error = str(e) or type(e).__name__
+        logger.exception("Snapshot recomputation from %s failed", dirty_from)
+        return
+    finally:
+        state.last_duration_ms = (time.perf_counter() - started) * 1000
+
+    state.last_snapshots = result.snapshots
+    state.error = None
+    logger.info(
+        "Recomputed %d snapshots from %s in %.0f ms%s",
+        result.snapshots,
+        dirty_from,
+        state.last_duration_ms,
+        "" if cleared else " (newer changes pending)",
+    )
+
+
+async def run_snapshot_worker() -> None:
+    """Poll for invalidated snapshots until cancelled."""
+    interval = settings.SNAPSHOT_WORKER_INTERVAL
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await process_dirty_snapshots()
+        except Exception as e:
+            # DB に接続できないなど: 次の周期で再試行する
+            snapshot_worker_state.error = str(e) or type(e).__name__
+            logger.warning("Snapshot worker tick failed: %s", snapshot_worker_state.error)
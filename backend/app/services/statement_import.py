@@ -0,0 +1,788 @@
+"""
+Streaming importer for broker trade statements (CSV).
+
+Rows are parsed incrementally from a byte stream and written to
+``transactions`` in fixed-size bulk INSERT batches, so memory use does not
+grow with the file size (apart from one small key per distinct trade).
+Tickers are normalized like the purchase endpoint stores them ("7203" ->
+"7203.T") and resolved through an in-memory cache (one IN query per batch
+for unseen tickers).
+
+Trades already recorded are skipped, so importing the same statement (or
+overlapping ones) twice does not double the holdings. A trade is identified
+by asset, trade date, side, quantity and price; if the statement holds the
+same trade n times and m of them are already recorded, n - m are imported.
+
+Foreign-currency trades need a JPY rate: the statement's rate column, else
+the USD/JPY rate in ``fx_rates`` for the trade date. Rows without one are
+reported in the errors instead of being booked as if they were in JPY.
+
+Quantities entered or edited by hand on an existing asset are first
+recorded as balancing trades, so the recompute from transactions keeps them.
+
+After the last batch the
+affected assets' quantity, average cost and ``total_cost_jpy`` are
+recomputed in a single streamed pass over their transactions and their
+holding intervals are rebuilt.
+
+Cash balances are not touched: broker statements describe trades settled
+in the broker account, not movements of the tracked cash. The snapshots
+from the earliest imported trade date are marked for recomputation.
+"""
+
+import codecs
+import csv
+import re
+import uuid
+from bisect import bisect_right
+from collections import Counter, deque
+from collections.abc import AsyncIterable, AsyncIterator
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta
+from decimal import Decimal, InvalidOperation
+from typing import Literal
+
+from sqlalchemy import Date, case, cast, func, insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models import Asset, FxRate, HoldingInterval, Transaction
+from app.services.holdings import rebuild_holding_intervals
+from app.services.snapshot_invalidation import mark_snapshots_dirty
+from app.services.snapshot_recompute import USD_JPY_PAIR
+from app.services.yfinance_service import YFinanceService
+
+BrokerName = Literal["sbi", "rakuten", "ibkr"]
+
+# 現金カテゴリID
+CASH_CATEGORY_ID = 4
+
+# エラー行として返す最大件数
+MAX_REPORTED_ERRORS = 50
+# 為替レート列のない外貨建て取引: 約定日のレートがなければ何日前まで遡るか
+FX_LOOKBACK_DAYS = 10
+
+_JP_CODE = re.compile(r"^\d{3}[0-9A-Z]$")
+_DATE = re.compile(r"^(\d{4})[/-]?(\d{1,2})[/-]?(\d{1,2})(?!\d)")
+
+
+@dataclass(frozen=True)
+class BrokerFormat:
+    """Column layout of one broker's trade history export."""
+
+    encoding: str
+    date_columns: tuple[str, ...]
+    ticker_columns: tuple[str, ...]
+    name_columns: tuple[str, ...]
+    side_columns: tuple[str, ...]
+    quantity_columns: tuple[str, ...]
+    price_columns: tuple[str, ...]
+    currency_columns: tuple[str, ...] = ()
+    rate_columns: tuple[str, ...] = ()
+    buy_markers: tuple[str, ...] = ("買",)
+    sell_markers: tuple[str, ...] = ("売",)
+    default_currency: str = "JPY"
+
+
+BROKER_FORMATS: dict[BrokerName, BrokerFormat] = {
+    # SBI証券 約定履歴（取引: 株式現物買 / 株式現物売）
+    "sbi": BrokerFormat(
+        encoding="cp932",
+        date_columns=("約定日",),
+        ticker_columns=("銘柄コード", "ティッカー"),
+        name_columns=("銘柄", "銘柄名"),
+        side_columns=("取引", "売買"),
+        quantity_columns=("約定数量", "数量"),
+        price_columns=("約定単価", "単価"),
+        currency_columns=("決済通貨", "通貨"),
+        rate_columns=("為替レート", "約定為替レート"),
+    ),
+    # 楽天証券 約定履歴（売買区分: 買付 / 売付、国内・米国株）
+    "rakuten": BrokerFormat(
+        encoding="cp932",
+        date_columns=("約定日",),
+        ticker_columns=("銘柄コード", "ティッカー"),
+        name_columns=("銘柄名", "銘柄"),
+        side_columns=("売買区分",),
+        quantity_columns=("数量［株］", "数量[株]", "数量"),
+        price_columns=("単価［円］", "単価［USドル］", "単価[円]", "単価[USドル]", "単価"),
+        currency_columns=("決済通貨",),
+        rate_columns=("為替レート",),
+    ),
+    # Interactive Brokers Flex Query (Trades)。売りは数量が負でも判定する
+    "ibkr": BrokerFormat(
+        encoding="utf-8-sig",
+        date_columns=("TradeDate", "Date/Time", "Trade Date"),
+        ticker_columns=("Symbol",),
+        name_columns=("Description", "Symbol"),
+        side_columns=("Buy/Sell",),
+        quantity_columns=("Quantity",),
+        price_columns=("TradePrice", "T. Price", "Price"),
+        currency_columns=("CurrencyPrimary", "Currency"),
+        rate_columns=("FXRateToBase",),
+        buy_markers=("BUY",),
+        sell_markers=("SELL",),
+        default_currency="USD",
+    ),
+}
+
+
+@dataclass
+class StatementRow:
+    """One trade parsed from a statement."""
+
+    line_number: int
+    trade_date: date
+    ticker_symbol: str
+    name: str
+    transaction_type: str  # "buy" / "sell"
+    quantity: Decimal
+    price: Decimal
+    currency: str
+    usd_jpy_rate: Decimal | None
+
+    @property
+    def total_cost_jpy(self) -> Decimal:
+        """Trade amount in JPY (same rounding as the purchase endpoint)."""
+        if self.currency == "JPY":
+            price_in_jpy = self.price.quantize(Decimal("0.01"))
+        elif self.usd_jpy_rate is None:
+            raise ValueError(f"{self.currency} の取引に為替レートがありません")
+        else:
+            price_in_jpy = (self.price * self.usd_jpy_rate).quantize(Decimal("0.01"))
+        return (self.quantity * price_in_jpy).quantize(Decimal("0.01"))
+
+
+@dataclass
+class StatementImportResult:
+    """Summary of an import run."""
+
+    imported: int = 0
+    skipped: int = 0
+    duplicates: int = 0
+    created_assets: int = 0
+    updated_assets: int = 0
+    errors: list[str] = field(default_factory=list)
+
+
+class StatementFormatError(ValueError):
+    """Raised when the statement header cannot be recognised."""
+
+
+class _LineFeed:
+    """Iterator over queued lines; lets one ``csv.reader`` consume an async stream."""
+
+    def __init__(self) -> None:
+        self.lines: deque[str] = deque()
+
+    def __iter__(self) -> "_LineFeed":
+        return self
+
+    def __next__(self) -> str:
+        if not self.lines:
+            raise StopIteration
+        return self.lines.popleft()
+
+
+async def iter_csv_rows(
+    chunks: AsyncIterable[bytes],
+    encoding: str,
+) -> AsyncIterator[tuple[int, list[str]]]:
+    """
+    Decode a byte stream incrementally and yield CSV rows.
+
+    Text is split at line feeds only (not at the other characters
+    ``str.splitlines`` breaks on), and a record is passed to the reader once
+    its lines hold an even number of quote characters, so quoted fields
+    spanning lines parse the same wherever the chunks are cut. Only the
+    current chunk and one unfinished record are held in memory.
+
+    Args:
+        chunks: Raw bytes (e.g. ``Request.stream()``)
+        encoding: Text encoding of the statement
+
+    Yields:
+        (line number of the first line of the record, starting at 1, cells)
+    """
+    decoder = codecs.getincrementaldecoder(encoding)(errors="replace")
+    feed = _LineFeed()
+    reader = csv.reader(feed)
+    pending = ""
+    # 未完了のレコード（引用符内で改行している行）
+    record: list[str] = []
+    quotes = 0
+    line_number = 0
+
+    def add_line(line: str) -> bool:
+        nonlocal quotes, line_number
+        line_number += 1
+        record.append(line)
+        quotes += line.count('"')
+        return quotes % 2 == 0
+
+    def take_record() -> tuple[int, list[str]]:
+        nonlocal quotes
+        start = line_number - len(record) + 1
+        feed.lines.extend(record)
+        record.clear()
+        quotes = 0
+        return start, next(reader, [])
+
+    async for chunk in chunks:
+        pending += decoder.decode(chunk)
+        *lines, pending = pending.split("\n")
+        for line in lines:
+            if add_line(line + "\n"):
+                yield take_record()
+    pending += decoder.decode(b"", final=True)
+    if pending:
+        add_line(pending)
+    if record:
+        # 末尾の改行なし、または閉じられていない引用符
+        yield take_record()
+
+
+def _find_column(header: list[str], candidates: tuple[str, ...]) -> int | None:
+    for name in candidates:
+        if name in header:
+            return header.index(name)
+    return None
+
+
+def _parse_decimal(value: str) -> Decimal | None:
+    value = value.strip().replace(",", "")
+    if not value or value in ("-", "--"):
+        return None
+    try:
+        return Decimal(value)
+    except InvalidOperation:
+        return None
+
+
+def _parse_date(value: str) -> date:
+    # "2024/01/05", "2024-01-05", "20240105", "2024-01-05, 10:30:00", "20240105;103000"
+    # strptime は行数分呼ぶと遅いため正規表現で分解する
+    match = _DATE.match(value.strip())
+    if match is None:
+        raise ValueError(f"日付を解釈できません: {value}")
+    return date(*(int(part) for part in match.groups()))
+
+
+def _category_for(ticker_symbol: str, currency: str) -> int:
+    """Infer the asset category of a newly seen ticker (1=日本株, 2=米国株, 3=投資信託)."""
+    if currency != "JPY":
+        return 2
+    return 1 if _JP_CODE.match(ticker_symbol.removesuffix(".T")) else 3
+
+
+def _normalize_ticker(ticker_symbol: str, category_id: int) -> str:
+    """Ticker as stored by the purchase endpoint (e.g. "7203" -> "7203.T" for 日本株)."""
+    return YFinanceService._get_ticker_symbol(ticker_symbol.upper(), category_id)
+
+
+class StatementParser:
+    """Maps CSV rows of one broker format to :class:`StatementRow`."""
+
+    def __init__(self, broker_format: BrokerFormat):
+        self.format = broker_format
+        self.columns: dict[str, int | None] | None = None
+
+    def _detect_header(self, cells: list[str]) -> bool:
+        header = [c.strip() for c in cells]
+        fmt = self.format
+        columns = {
+            "date": _find_column(header, fmt.date_columns),
+            "ticker": _find_column(header, fmt.ticker_columns),
+            "name": _find_column(header, fmt.name_columns),
+            "side": _find_column(header, fmt.side_columns),
+            "quantity": _find_column(header, fmt.quantity_columns),
+            "price": _find_column(header, fmt.price_columns),
+            "currency": _find_column(header, fmt.currency_columns),
+            "rate": _find_column(header, fmt.rate_columns),
+        }
+        required = ("date", "ticker", "quantity", "price")
+        if all(columns[key] is not None for key in required):
+            self.columns = columns
+            return True
+        return False
+
+    def parse(self, line_number: int, cells: list[str]) -> StatementRow | None:
+        """
+        Parse one CSV row.
+
+        Returns ``None`` for preamble lines before the header, the header
+        itself and rows that are not trades (dividends, deposits, ...).
+
+        Raises:
+            ValueError: If a trade row has malformed values
+        """
+        if self.columns is None:
+            self._detect_header(cells)
+            return None
+
+        def cell(key: str) -> str:
+            index = self.columns[key]
+            if index is None or index >= len(cells):
+                return ""
+            return cells[index].strip()
+
+        ticker_symbol = cell("ticker")
+        quantity = _parse_decimal(cell("quantity"))
+        price = _parse_decimal(cell("price"))
+        if not ticker_symbol or quantity is None or price is None or quantity == 0:
+            return None
+
+        side = cell("side")
+        if any(marker in side for marker in self.format.sell_markers):
+            transaction_type = "sell"
+        elif any(marker in side for marker in self.format.buy_markers):
+            transaction_type = "buy"
+        elif not side:
+            transaction_type = "sell" if quantity < 0 else "buy"
+        else:
+            return None
+
+        currency = (cell("currency") or self.format.default_currency).upper()
+        if currency in ("円", "JPY", "日本円"):
+            currency = "JPY"
+        elif currency in ("USドル", "米ドル"):
+            currency = "USD"
+        rate = _parse_decimal(cell("rate")) if currency != "JPY" else None
+        if rate == 1:
+            # IBKR の USD 建て口座では FXRateToBase が 1（円のレートではない）
+            rate = None
+
+        return StatementRow(
+            line_number=line_number,
+            trade_date=_parse_date(cell("date")),
+            ticker_symbol=_normalize_ticker(ticker_symbol, _category_for(ticker_symbol, currency)),
+            name=cell("name") or ticker_symbol,
+            transaction_type=transaction_type,
+            quantity=abs(quantity),
+            price=price,
+            currency=currency,
+            usd_jpy_rate=rate,
+        )
+
+
+class StatementImporter:
+    """
+    Writes parsed statement rows to the database in bulk batches.
+
+    The caller owns the transaction: nothing is committed here, so a failed
+    import can be rolled back as a whole.
+    """
+
+    def __init__(self, db: AsyncSession, batch_size: int = 1000):
+        self.db = db
+        self.batch_size = batch_size
+        self.result = StatementImportResult()
+        self._asset_ids: dict[str, uuid.UUID] = {}
+        self._touched: set[uuid.UUID] = set()
+        self._created: set[uuid.UUID] = set()
+        # 取り込んだ最も古い約定日（この日以降のスナップショットを再計算する）
+        self._earliest: date | None = None
+        self._batch: list[StatementRow] = []
+        # 取引のキー → 取込前に登録済みの件数 / この取込で出現した件数
+        self._recorded: dict[tuple, int] = {}
+        self._occurrences: Counter[tuple] = Counter()
+
+    async def run(self, rows: AsyncIterable[tuple[int, list[str]]], broker: BrokerName) -> None:
+        """
+        Import all rows and recompute the affected assets.
+
+        Args:
+            rows: (line number, cells) pairs, e.g. from :func:`iter_csv_rows`
+            broker: Statement format
+
+        Raises:
+            StatementFormatError: If no header row was found
+        """
+        parser = StatementParser(BROKER_FORMATS[broker])
+        async for line_number, cells in rows:
+            in_body = parser.columns is not None
+            try:
+                row = parser.parse(line_number, cells)
+            except ValueError as e:
+                self._record_error(f"{line_number}行目: {e}")
+                continue
+            if row is None:
+                if in_body and any(c.strip() for c in cells):
+                    self.result.skipped += 1
+                continue
+            self._batch.append(row)
+            if len(self._batch) >= self.batch_size:
+                await self._flush()
+
+        if parser.columns is None:
+            raise StatementFormatError(
+                "ヘッダー行が見つかりません。証券会社の形式を確認してください"
+            )
+
+        await self._flush()
+        await self._recompute_assets()
+        await rebuild_holding_intervals(self.db, self._touched)
+        if self._earliest is not None:
+            await mark_snapshots_dirty(self.db, self._earliest)
+        self.result.created_assets = len(self._created)
+        self.result.updated_assets = len(self._touched - self._created)
+
+    def _record_error(self, message: str) -> None:
+        self.result.skipped += 1
+        if len(self.result.errors) < MAX_REPORTED_ERRORS:
+            self.result.errors.append(message)
+
+    async def _resolve_assets(self, rows: list[StatementRow]) -> None:
+        """Resolve unseen tickers with one query; create the missing assets in bulk."""
+        unseen: dict[str, StatementRow] = {}
+        for row in rows:
+            if row.ticker_symbol not in self._asset_ids:
+                unseen.setdefault(row.ticker_symbol, row)
+        if not unseen:
+            return
+
+        # 手入力の資産は "7203" のように接尾辞なしで登録されていることもある
+        # （同じ銘柄が複数あれば正規化済みの表記、次に古い資産を使う）
+        candidates = set(unseen) | {ticker.removesuffix(".T") for ticker in unseen}
+        result = await self.db.execute(
+            select(Asset.id, Asset.ticker_symbol, Asset.category_id)
+            .where(
+                Asset.ticker_symbol.in_(candidates),
+                Asset.category_id != CASH_CATEGORY_ID,
+            )
+            .order_by(Asset.ticker_symbol.in_(unseen).desc(), Asset.created_at)
+        )
+        existing: dict[str, uuid.UUID] = {}
+        for row in result:
+            ticker = _normalize_ticker(row.ticker_symbol, row.category_id)
+            if ticker in unseen:
+                existing.setdefault(ticker, row.id)
+        if existing:
+            await self._record_untracked_quantities(list(existing.values()))
+            self._asset_ids.update(existing)
+
+        missing = [row for ticker, row in unseen.items() if ticker not in existing]
+        if missing:
+            result = await self.db.execute(
+                insert(Asset).returning(Asset.id, Asset.ticker_symbol),
+                [
+                    {
+                        "id": uuid.uuid4(),
+                        "category_id": _category_for(row.ticker_symbol, row.currency),
+                        "name": row.name,
+                        "ticker_symbol": row.ticker_symbol,
+                        "quantity": Decimal("0"),
+                        "currency": row.currency,
+                        "total_cost_jpy": Decimal("0"),
+                        "created_at": datetime.combine(row.trade_date, datetime.min.time()),
+                    }
+                    for row in missing
+                ],
+            )
+            created = {row.ticker_symbol: row.id for row in result}
+            self._asset_ids.update(created)
+            self._created.update(created.values())
+
+    async def _record_untracked_quantities(self, asset_ids: list[uuid.UUID]) -> None:
+        """
+        Record quantity changes made outside ``transactions`` as buys / sells.
+
+        Quantities entered or edited by hand (asset registration, PUT) only
+        move the holding intervals; without this the recompute from
+        transactions and the interval rebuild would drop them. Wherever an
+        interval differs from the quantity the transactions add up to, a
+        balancing trade is inserted on the interval's first day at the
+        asset's average cost. Assets without intervals are balanced against
+        ``Asset.quantity`` on their registration date.
+        """
+        result = await self.db.execute(
+            select(
+                Asset.id,
+                Asset.quantity,
+                Asset.average_cost,
+                Asset.current_price,
+                Asset.total_cost_jpy,
+                Asset.currency,
+                Asset.created_at,
+            ).where(Asset.id.in_(asset_ids))
+        )
+        assets = {row.id: row for row in result}
+
+        result = await self.db.execute(
+            select(HoldingInterval.asset_id, HoldingInterval.valid_from, HoldingInterval.quantity)
+            .where(HoldingInterval.asset_id.in_(asset_ids))
+            .order_by(HoldingInterval.asset_id, HoldingInterval.valid_from)
+        )
+        points: dict[uuid.UUID, list[tuple[date, Decimal]]] = {}
+        for row in result:
+            points.setdefault(row.asset_id, []).append((row.valid_from, row.quantity))
+
+        day = cast(Transaction.transaction_date, Date)
+        result = await self.db.execute(
+            select(
+                Transaction.asset_id,
+                day.label("day"),
+                func.sum(
+                    case(
+                        (Transaction.transaction_type == "sell", -Transaction.quantity),
+                        else_=Transaction.quantity,
+                    )
+                ).label("delta"),
+            )
+            .where(Transaction.asset_id.in_(asset_ids))
+            .group_by(Transaction.asset_id, day)
+            .order_by(Transaction.asset_id, day)
+        )
+        deltas: dict[uuid.UUID, list[tuple[date, Decimal]]] = {}
+        for row in result:
+            deltas.setdefault(row.asset_id, []).append((row.day, row.delta))
+
+        adjustments = []
+        for asset_id, asset in assets.items():
+            traded = deltas.get(asset_id, [])
+            # 区間のない資産（区間の導入前のデータ）は全取引の合計と比べ、登録日に計上する
+            held = points.get(asset_id) or [(date.max, asset.quantity)]
+            price = asset.average_cost or asset.current_price or Decimal("0")
+            unit_cost = asset.total_cost_jpy / asset.quantity if asset.quantity else Decimal("0")
+            index = 0
+            from_transactions = balanced = Decimal("0")
+            for valid_from, quantity in held:
+                while index < len(traded) and traded[index][0] <= valid_from:
+                    from_transactions += traded[index][1]
+                    index += 1
+                gap = quantity - from_transactions - balanced
+                if not gap:
+                    continue
+                balanced += gap
+                adjustments.append(
+                    {
+                        "asset_id": asset_id,
+                        "transaction_type": "buy" if gap > 0 else "sell",
+                        "quantity": abs(gap),
+                        "price": price,
+                        "currency": asset.currency,
+                        "total_cost_jpy": (abs(gap) * unit_cost).quantize(Decimal("0.01")),
+                        "transaction_date": (
+                            datetime.combine(valid_from, datetime.min.time())
+                            if valid_from != date.max
+                            else asset.created_at
+                        ),
+                        "note": "取込前の数量調整",
+                    }
+                )
+        if adjustments:
+            await self.db.execute(insert(Transaction), adjustments)
+
+    async def _flush(self) -> None:
+        """Write the pending batch with one bulk INSERT."""
+        if not self._batch:
+            return
+        batch, self._batch = self._batch, []
+
+        batch = await self._fill_fx_rates(batch)
+        if not batch:
+            return
+        await self._resolve_assets(batch)
+        batch = await self._drop_recorded(batch)
+        if not batch:
+            return
+        await self.db.execute(
+            insert(Transaction),
+            [
+                {
+                    "asset_id": self._asset_ids[row.ticker_symbol],
+                    "transaction_type": row.transaction_type,
+                    "quantity": row.quantity,
+                    "price": row.price,
+                    "usd_jpy_rate": row.usd_jpy_rate,
+                    "currency": row.currency,
+                    "total_cost_jpy": row.total_cost_jpy,
+                    "transaction_date": datetime.combine(row.trade_date, datetime.min.time()),
+                }
+                for row in batch
+            ],
+        )
+        self._touched.update(self._asset_ids[row.ticker_symbol] for row in batch)
+        first = min(row.trade_date for row in batch)
+        self._earliest = first if self._earliest is None else min(self._earliest, first)
+        self.result.imported += len(batch)
+
+    async def _fill_fx_rates(self, batch: list[StatementRow]) -> list[StatementRow]:
+        """
+        Fill missing USD/JPY rates from ``fx_rates``; reject rows still without one.
+
+        The rate of the trade date is used, or the latest one up to
+        :data:`FX_LOOKBACK_DAYS` before it (weekends, holidays).
+        """
+        missing = [r for r in batch if r.currency != "JPY" and r.usd_jpy_rate is None]
+        if not missing:
+            return batch
+
+        usd_days = [r.trade_date for r in missing if r.currency == "USD"]
+        rate_days: list[date] = []
+        rates: list[Decimal] = []
+        if usd_days:
+            result = await self.db.execute(
+                select(FxRate.rate_date, FxRate.rate)
+                .where(
+                    FxRate.pair == USD_JPY_PAIR,
+                    FxRate.rate_date >= min(usd_days) - timedelta(days=FX_LOOKBACK_DAYS),
+                    FxRate.rate_date <= max(usd_days),
+                )
+                .order_by(FxRate.rate_date)
+            )
+            for rate_day, rate in result:
+                rate_days.append(rate_day)
+                rates.append(rate)
+
+        kept = []
+        for row in batch:
+            if row.currency != "JPY" and row.usd_jpy_rate is None:
+                index = bisect_right(rate_days, row.trade_date) - 1
+                if (
+                    row.currency != "USD"
+                    or index < 0
+                    or (row.trade_date - rate_days[index]).days > FX_LOOKBACK_DAYS
+                ):
+                    self._record_error(
+                        f"{row.line_number}行目: {row.trade_date} の {row.currency}/JPY の"
+                        "為替レートがありません（為替レート列を含めて出力してください）"
+                    )
+                    continue
+                # transactions.usd_jpy_rate の精度（2桁）に合わせる
+                row.usd_jpy_rate = rates[index].quantize(Decimal("0.01"))
+            kept.append(row)
+        return kept
+
+    def _trade_key(self, row: StatementRow) -> tuple:
+        # 列の精度（数量は小数4桁、単価は2桁）に丸めて登録済みの値と比較する
+        return (
+            self._asset_ids[row.ticker_symbol],
+            datetime.combine(row.trade_date, datetime.min.time()),
+            row.transaction_type,
+            row.quantity.quantize(Decimal("0.0001")),
+            row.price.quantize(Decimal("0.01")),
+        )
+
+    async def _drop_recorded(self, batch: list[StatementRow]) -> list[StatementRow]:
+        """Skip trades already in ``transactions`` (one grouped query per batch)."""
+        keys = [self._trade_key(row) for row in batch]
+        unknown = {key for key in keys if key not in self._recorded}
+        if unknown:
+            result = await self.db.execute(
+                select(
+                    Transaction.asset_id,
+                    Transaction.transaction_date,
+                    Transaction.transaction_type,
+                    Transaction.quantity,
+                    Transaction.price,
+                    func.count(),
+                )
+                .where(
+                    Transaction.asset_id.in_({key[0] for key in unknown}),
+                    Transaction.transaction_date.in_({key[1] for key in unknown}),
+                )
+                .group_by(
+                    Transaction.asset_id,
+                    Transaction.transaction_date,
+                    Transaction.transaction_type,
+                    Transaction.quantity,
+                    Transaction.price,
+                )
+            )
+            counts = {tuple(row[:5]): row[5] for row in result}
+            for key in unknown:
+                self._recorded[key] = counts.get(key, 0)
+
+        kept = []
+        for row, key in zip(batch, keys, strict=True):
+            occurrence = self._occurrences[key]
+            self._occurrences[key] += 1
+            if occurrence < self._recorded[key]:
+                self.result.duplicates += 1
+                continue
+            kept.append(row)
+        return kept
+
+    async def _recompute_assets(self) -> None:
+        """
+        Recompute quantity, moving-average cost and ``total_cost_jpy``.
+
+        Streams the affected assets' transactions in date order once; sells
+        reduce the cost basis proportionally and leave the average unchanged.
+        """
+        if not self._touched:
+            return
+
+        result = await self.db.execute(
+            select(Asset.id, Asset.quantity, Asset.current_value).where(Asset.id.in_(self._touched))
+        )
+        previous = {row.id: row for row in result}
+
+        stream = await self.db.stream(
+            select(
+                Transaction.asset_id,
+                Transaction.transaction_type,
+                Transaction.quantity,
+                Transaction.price,
+                Transaction.usd_jpy_rate,
+                Transaction.currency,
+                Transaction.total_cost_jpy,
+            )
+            .where(Transaction.asset_id.in_(self._touched))
+            .order_by(Transaction.asset_id, Transaction.transaction_date, Transaction.created_at)
+            .execution_options(yield_per=self.batch_size)
+        )
+
+        updates: list[dict] = []
+        current_id: uuid.UUID | None = None
+        quantity = average_cost = total_cost = last_price = Decimal("0")
+        last_rate: Decimal | None = None
+        last_currency = "JPY"
+
+        def finish() -> None:
+            before = previous[current_id]
+            if current_id not in self._created and before.quantity and before.current_value:
+                # 既存資産は時価単価を維持して数量だけ反映
+                current_value = before.current_value / before.quantity * quantity
+            elif last_currency == "JPY":
+                current_value = quantity * last_price
+            elif last_rate is not None:
+                current_value = quantity * last_price * last_rate
+            else:
+                # レートのない外貨建ての取引（取込以外で登録されたもの）: 取得総額で評価
+                current_value = total_cost
+            values = {
+                "id": current_id,
+                "quantity": quantity,
+                "average_cost": average_cost.quantize(Decimal("0.01")),
+                "total_cost_jpy": total_cost.quantize(Decimal("0.01")),
+                "current_value": current_value.quantize(Decimal("0.01")),
+            }
+            if current_id in self._created:
+                values["current_price"] = last_price
+            updates.append(values)
+
+        async for row in stream:
+            if row.asset_id != current_id:
+                if current_id is not None:
+                    finish()
+                current_id = row.asset_id
+                quantity = average_cost = total_cost = Decimal("0")
+            if row.transaction_type == "sell":
+                if quantity > 0:
+                    total_cost -= total_cost * min(row.quantity / quantity, Decimal("1"))
+                quantity -= row.quantity
+            else:
+                new_quantity = quantity + row.quantity
+                if new_quantity > 0:
+                    average_cost = (
+                        quantity * average_cost + row.quantity * row.price
+                    ) / new_quantity
+                quantity = new_quantity
+                total_cost += row.total_cost_jpy
+            last_price, last_rate, last_currency = row.price, row.usd_jpy_rate, row.currency
+        if current_id is not None:
+            finish()
+
+        if updates:
+            await self.db.execute(update(Asset), updates)
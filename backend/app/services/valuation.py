@@ -0,0 +1,450 @@
+"""
+Daily valuation pipeline: market data -> asset histories -> snapshots.
+
+Shared by the nightly CLI (``scripts/update_daily.py``) and
+``POST /api/assets/refresh`` so both entry points produce the same numbers:
+
+1. plan: per asset, the first day of the range that is held and has no
+   final ``asset_histories`` row. Rows are provisional (fetched again) when
+   they hold an intraday price of the current day or a price carried
+   forward after a failed fetch. The USDJPY rate in ``fx_rates`` is planned
+   the same way,
+2. fetch: one history request per pending ticker, in parallel on the
+   provider pool, starting a few days before the first pending day so
+   weekends and holidays can be forward-filled,
+3. write: one row per held day (close, quantity held that day, value in the
+   asset's currency), bulk-upserted and committed in chunks as the fetches
+   complete. The committed rows are the checkpoint: an interrupted run
+   picks up at the tickers that are still pending,
+4. snapshot: the cash balance checkpoints are extended to the last month
+   end, the range is regenerated with
+   :func:`app.services.snapshot_recompute.recompute_snapshots` and the
+   latest prices are written back to ``assets``.
+
+Amounts are kept to 0.01 like the columns they are stored in.
+"""
+
+import asyncio
+import logging
+import uuid
+from collections.abc import Callable, Sequence
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from typing import Any
+
+from sqlalchemy import Numeric, and_, bindparam, func, or_, select, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models import Asset, AssetHistory, AssetSnapshot, FxRate, HoldingInterval
+from app.services.cash_ledger import ensure_checkpoints
+from app.services.data_version import bump_data_version
+from app.services.executors import provider_executor
+from app.services.holdings import day_series, get_holdings_by_date
+from app.services.metrics import observe_provider_call
+from app.services.snapshot_recompute import USD_JPY_PAIR, recompute_snapshots
+from app.services.yfinance_service import YFinanceService
+
+logger = logging.getLogger(__name__)
+
+# 為替レートの yfinance のシンボル（fx_rates.pair は USD_JPY_PAIR）
+USD_JPY_SYMBOL = "USDJPY=X"
+# 土日・祝日を前日値で埋めるため、最初の未取得日より前から取得する日数
+LOOKBACK_DAYS = 10
+# 一括 UPSERT 1文あたりの行数（asyncpg のパラメータ数上限 32767 未満に収める）
+UPSERT_CHUNK_ROWS = 4000
+# 現金カテゴリID（評価額は現金台帳から求める）
+CASH_CATEGORY_ID = 4
+
+CENT = Decimal("0.01")
+
+
+@dataclass
+class ValuationResult:
+    """Summary of one pipeline run."""
+
+    start_date: date
+    end_date: date
+    usd_jpy_rate: Decimal | None = None
+    # 取得に成功したシンボル / 失敗したシンボル → エラー内容
+    fetched: list[str] = field(default_factory=list)
+    failed: dict[str, str] = field(default_factory=dict)
+    history_rows: int = 0
+    snapshots: int = 0
+    # 為替レートがなく評価できなかった日
+    skipped_days: list[date] = field(default_factory=list)
+    updated_count: int = 0
+
+    def as_dict(self) -> dict[str, Any]:
+        return {
+            "start_date": self.start_date,
+            "end_date": self.end_date,
+            "usd_jpy_rate": self.usd_jpy_rate,
+            "fetched": self.fetched,
+            "failed": self.failed,
+            "history_rows": self.history_rows,
+            "snapshots": self.snapshots,
+            "skipped_days": self.skipped_days,
+            "updated_count": self.updated_count,
+        }
+
+
+def _fetch_closes(symbol: str, start: date, end: date, digits: int) -> dict[date, Decimal]:
+    """Daily closes in ``[start, end]`` (blocking; run on the provider pool)."""
+    with observe_provider_call("history"):
+        hist = YFinanceService.ticker(symbol).history(
+            start=start.isoformat(), end=(end + timedelta(days=1)).isoformat()
+        )
+    if hist.empty:
+        raise ValueError(f"No data found for ticker: {symbol}")
+    return {
+        ts.date(): Decimal(str(round(close, digits)))
+        for ts, close in zip(hist.index, hist["Close"], strict=True)
+    }
+
+
+def _forward_fill(closes: dict[date, Decimal], days: Sequence[date]) -> dict[date, Decimal]:
+    """Close of each day, or of the latest earlier day with a close."""
+    ordered = sorted(closes.items())
+    filled: dict[date, Decimal] = {}
+    last: Decimal | None = None
+    i = 0
+    for day in days:
+        while i < len(ordered) and ordered[i][0] <= day:
+            last = ordered[i][1]
+            i += 1
+        if last is not None:
+            filled[day] = last
+    return filled
+
+
+def _days(start: date, end: date) -> list[date]:
+    return [start + timedelta(days=i) for i in range((end - start).days + 1)]
+
+
+async def _default_start(db: AsyncSession, end: date) -> date:
+    """Latest snapshot day (it may hold intraday values), or the first holding day."""
+    latest = await db.scalar(select(func.max(AssetSnapshot.snapshot_date)))
+    if latest is None:
+        latest = await db.scalar(select(func.min(HoldingInterval.valid_from)))
+    return min(latest or end, end)
+
+
+async def _pending_assets(
+    db: AsyncSession, start: date, end: date, fresh_since: datetime | None
+) -> dict[uuid.UUID, date]:
+    """First held day per asset without a final history row."""
+    days, day = day_series(start, end)
+    final = AssetHistory.provisional.is_(False)
+    if fresh_since is not None:
+        final = or_(final, AssetHistory.created_at >= fresh_since)
+    result = await db.execute(
+        select(HoldingInterval.asset_id, func.min(day).label("first_day"))
+        .select_from(days)
+        .join(
+            HoldingInterval,
+            func.daterange(HoldingInterval.valid_from, HoldingInterval.valid_to).op("@>")(day),
+        )
+        .outerjoin(
+            AssetHistory,
+            and_(
+                AssetHistory.asset_id == HoldingInterval.asset_id,
+                AssetHistory.record_date == day,
+                final,
+            ),
+        )
+        .where(HoldingInterval.quantity != 0, AssetHistory.id.is_(None))
+        .group_by(HoldingInterval.asset_id)
+    )
+    return {row.asset_id: row.first_day for row in result}
+
+
+async def _first_pending_fx_day(
+    db: AsyncSession, start: date, end: date, fresh_since: datetime | None
+) -> date | None:
+    days, day = day_series(start, end)
+    final = FxRate.provisional.is_(False)
+    if fresh_since is not None:
+        final = or_(final, FxRate.created_at >= fresh_since)
+    return await db.scalar(
+        select(func.min(day))
+        .select_from(days)
+        .outerjoin(FxRate, and_(FxRate.pair == USD_JPY_PAIR, FxRate.rate_date == day, final))
+        .where(FxRate.rate_date.is_(None))
+    )
+
+
+async def _upsert(db: AsyncSession, model: type, rows: list[dict], keys: list[str]) -> None:
+    """
+    Bulk INSERT ... ON CONFLICT (``keys``) DO UPDATE of ``rows``.
+
+    Every other key of the rows is updated; ``created_at`` is reset to the
+    write time (``resume`` uses it to tell rows fetched today).
+    """
+    for i in range(0, len(rows), UPSERT_CHUNK_ROWS):
+        chunk = rows[i : i + UPSERT_CHUNK_ROWS]
+        stmt = insert(model).values(chunk)
+        updated = {key: stmt.excluded[key] for key in chunk[0] if key not in keys}
+        if "created_at" in model.__table__.c:
+            updated["created_at"] = func.now()
+        await db.execute(stmt.on_conflict_do_update(index_elements=keys, set_=updated))
+
+
+async def _last_price_before(db: AsyncSession, asset_id: uuid.UUID, day: date) -> Decimal | None:
+    return await db.scalar(
+        select(AssetHistory.price)
+        .where(AssetHistory.asset_id == asset_id, AssetHistory.record_date < day)
+        .order_by(AssetHistory.record_date.desc())
+        .limit(1)
+    )
+
+
+async def _update_fx(
+    db: AsyncSession,
+    start: date,
+    end: date,
+    fresh_since: datetime | None,
+    result: ValuationResult,
+    log: Callable[[str], None],
+) -> None:
+    """Fetch and store the pending USDJPY days; sets ``result.usd_jpy_rate``."""
+    today = date.today()
+    first = await _first_pending_fx_day(db, start, end, fresh_since)
+    if first is not None:
+        days = _days(first, end)
+        carried = False
+        try:
+            closes = await provider_executor.run(
+                _fetch_closes, USD_JPY_SYMBOL, first - timedelta(days=LOOKBACK_DAYS), end, 4
+            )
+            result.fetched.append(USD_JPY_SYMBOL)
+        except Exception as e:
+            result.failed[USD_JPY_SYMBOL] = str(e)
+            log(f"  [Error] {USD_JPY_SYMBOL}: {e}")
+            # 取得できなければ直近の保存済みレートを引き継ぐ（次回取り直す）
+            last = await db.scalar(
+                select(FxRate.rate)
+                .where(FxRate.pair == USD_JPY_PAIR, FxRate.rate_date < first)
+                .order_by(FxRate.rate_date.desc())
+                .limit(1)
+            )
+            closes = {first: last} if last is not None else {}
+            carried = True
+        rates = _forward_fill(closes, days)
+        rows = [
+            {
+                "pair": USD_JPY_PAIR,
+                "rate_date": day,
+                "rate": rate,
+                "provisional": carried or day >= today,
+            }
+            for day, rate in rates.items()
+        ]
+        if rows:
+            await _upsert(db, FxRate, rows, keys=["pair", "rate_date"])
+            await db.commit()
+
+    result.usd_jpy_rate = await db.scalar(
+        select(FxRate.rate)
+        .where(FxRate.pair == USD_JPY_PAIR, FxRate.rate_date <= end)
+        .order_by(FxRate.rate_date.desc())
+        .limit(1)
+    )
+
+
+async def _update_histories(
+    db: AsyncSession,
+    assets: Sequence[Asset],
+    start: date,
+    end: date,
+    fresh_since: datetime | None,
+    result: ValuationResult,
+    log: Callable[[str], None],
+) -> dict[uuid.UUID, Decimal]:
+    """
+    Fetch and store the pending history rows of every asset.
+
+    Returns:
+        {asset_id: latest fetched price}
+    """
+    today = date.today()
+    pending = await _pending_assets(db, start, end, fresh_since)
+    if not pending:
+        return {}
+    holdings = await get_holdings_by_date(db, min(pending.values()), end)
+
+    # 同じシンボルの銘柄はまとめて1回だけ取得する
+    by_symbol: dict[str, list[Asset]] = {}
+    manual: list[Asset] = []
+    for asset in assets:
+        if asset.id not in pending:
+            continue
+        if asset.ticker_symbol:
+            symbol = YFinanceService._get_ticker_symbol(asset.ticker_symbol, asset.category_id)
+            by_symbol.setdefault(symbol, []).append(asset)
+        else:
+            manual.append(asset)
+
+    latest_prices: dict[uuid.UUID, Decimal] = {}
+    buffered: list[dict] = []
+
+    async def flush() -> None:
+        # 書き込んだ行がチェックポイントになる（中断時は未書き込みの銘柄から再開）
+        if buffered:
+            await _upsert(db, AssetHistory, buffered, keys=["asset_id", "record_date"])
+            result.history_rows += len(buffered)
+            buffered.clear()
+        await db.commit()
+
+    def add(asset: Asset, prices: dict[date, Decimal], carried: bool) -> None:
+        for day, price in prices.items():
+            quantity = holdings.get(day, {}).get(asset.id)
+            if quantity is None:
+                continue
+            buffered.append(
+                {
+                    "asset_id": asset.id,
+                    "record_date": day,
+                    "price": price,
+                    "quantity": quantity,
+                    "value": (price * quantity).quantize(CENT),
+                    "provisional": carried or day >= today,
+                }
+            )
+            if not carried:
+                latest_prices[asset.id] = price
+
+    async def fetch(symbol: str) -> tuple[str, dict[date, Decimal] | Exception]:
+        first = min(pending[asset.id] for asset in by_symbol[symbol])
+        try:
+            closes = await provider_executor.run(
+                _fetch_closes, symbol, first - timedelta(days=LOOKBACK_DAYS), end, 2
+            )
+        except Exception as e:
+            return symbol, e
+        return symbol, closes
+
+    # 取得は並列、書き込みは取得できた順に UPSERT_CHUNK_ROWS 行ずつまとめてコミットする
+    for next_done in asyncio.as_completed([fetch(symbol) for symbol in by_symbol]):
+        symbol, closes = await next_done
+        if isinstance(closes, Exception):
+            result.failed[symbol] = str(closes)
+            log(f"  [Error] {symbol}: {closes}")
+        else:
+            result.fetched.append(symbol)
+        for asset in by_symbol[symbol]:
+            days = _days(pending[asset.id], end)
+            if isinstance(closes, Exception):
+                # 取得できなければ直近の保存済み価格を引き継ぐ（次回取り直す）
+                last = await _last_price_before(db, asset.id, days[0])
+                carried_closes = {days[0]: last} if last is not None else {}
+                add(asset, _forward_fill(carried_closes, days), carried=True)
+            else:
+                add(asset, _forward_fill(closes, days), carried=False)
+        if len(buffered) >= UPSERT_CHUNK_ROWS:
+            await flush()
+
+    # ティッカーのない銘柄（手入力の投資信託など）は登録済みの現在価格で評価する
+    for asset in manual:
+        if asset.current_price is not None:
+            add(asset, dict.fromkeys(_days(pending[asset.id], end), asset.current_price), False)
+    await flush()
+
+    return latest_prices
+
+
+async def _write_current_prices(db: AsyncSession, prices: list[dict]) -> None:
+    """
+    Store the latest prices and revalue the assets in one executemany UPDATE.
+
+    The value is computed from the ``quantity`` column at write time, not
+    from the rows loaded before the fetches, so a purchase committed while
+    prices were being fetched is not overwritten with the old quantity.
+    """
+    if not prices:
+        return
+    price = bindparam("price", type_=Asset.current_price.type)
+    await db.execute(
+        update(Asset.__table__)
+        .where(Asset.__table__.c.id == bindparam("asset_id"))
+        .values(
+            current_price=price,
+            current_value=func.round(
+                price * Asset.__table__.c.quantity * bindparam("rate", type_=Numeric), 2
+            ),
+        ),
+        prices,
+    )
+
+
+async def run_daily_valuation(
+    db: AsyncSession,
+    start_date: date | None = None,
+    end_date: date | None = None,
+    resume: bool = False,
+    log: Callable[[str], None] = logger.info,
+) -> ValuationResult:
+    """
+    Run the valuation pipeline for ``[start_date, end_date]``; see module docstring.
+
+    Idempotent: days that already have final rows are neither fetched nor
+    rewritten, and running it again only refreshes provisional rows.
+
+    Args:
+        db: Database session (committed after each chunk of rows and at the end)
+        start_date: First day (default: latest snapshot day, or the first holding day)
+        end_date: Last day (default: today)
+        resume: Treat provisional rows written today as done, to continue an
+            interrupted run without fetching the finished tickers again
+        log: Progress output
+
+    Returns:
+        Run summary
+    """
+    end = end_date or date.today()
+    start = start_date or await _default_start(db, end)
+    result = ValuationResult(start_date=start, end_date=end)
+    if start > end:
+        return result
+    fresh_since = datetime.combine(date.today(), datetime.min.time()) if resume else None
+    log(f"Valuation {start} - {end}")
+
+    await _update_fx(db, start, end, fresh_since, result, log)
+    if result.usd_jpy_rate is not None:
+        log(f"  USD/JPY: {result.usd_jpy_rate}")
+
+    assets_result = await db.execute(select(Asset).where(Asset.category_id != CASH_CATEGORY_ID))
+    assets = assets_result.scalars().all()
+    latest_prices = await _update_histories(db, assets, start, end, fresh_since, result, log)
+    log(f"  histories: {result.history_rows:,} rows, {len(result.failed)} failed")
+
+    # 入出金がない月が続いても月末チェックポイントが途切れないよう、前月末まで作成する
+    # （スナップショットの現金残高はチェックポイントから求める）
+    await ensure_checkpoints(db, date.today().replace(day=1) - timedelta(days=1))
+    written = await recompute_snapshots(db, start, end)
+    result.snapshots = len(written)
+    result.skipped_days = sorted(set(_days(start, end)) - set(written))
+    log(f"  snapshots: {result.snapshots:,} days")
+    if result.skipped_days:
+        log(f"  [Skip] no USD/JPY rate for {len(result.skipped_days)} days")
+
+    # 最新日まで評価した場合のみ、銘柄の現在価格・評価額（円）を更新する
+    if end >= date.today():
+        prices = []
+        for asset in assets:
+            price = latest_prices.get(asset.id)
+            if price is None or not asset.ticker_symbol:
+                continue
+            rate = Decimal("1")
+            if asset.currency == "USD":
+                if result.usd_jpy_rate is None:
+                    continue
+                rate = result.usd_jpy_rate
+            prices.append({"asset_id": asset.id, "price": price, "rate": rate})
+        await _write_current_prices(db, prices)
+        result.updated_count = len(prices)
+
+    await bump_data_version(db)
+    await db.commit()
+    return result
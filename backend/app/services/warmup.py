@@ -0,0 +1,190 @@
+"""
+Startup warm-up and readiness.
+
+Started from the application lifespan as a background task, so liveness
+(``/health``) answers immediately while readiness (``/health/ready``)
+reports 503 until warm-up has finished:
+
+1. open ``pool_size`` connections at once, so the first requests do not
+   pay TCP / authentication setup,
+2. run the hot read statements (data version, category master, latest
+   snapshot) on every one of those connections, which compiles them into
+   SQLAlchemy's statement cache and prepares them in asyncpg's
+   per-connection prepared statement cache,
+3. build the responses the screens open with (passed in as
+   ``cache_primers``: dashboard stats and portfolio, the default chart)
+   into the versioned response cache, so the first page load is a cache hit,
+4. optionally (``WARMUP_PREFETCH_QUOTES``) fetch one quote for a held
+   ticker, which imports yfinance / pandas and obtains Yahoo's cookie and
+   crumb.
+
+If the database is not reachable yet the warm-up is retried, and the
+worker stays not-ready until it succeeds. A failed response prime or quote
+prefetch only logs a warning: the request builds the response itself, and
+the provider is not needed to serve cached data.
+"""
+
+import asyncio
+import logging
+import time
+from collections.abc import Awaitable, Callable, Sequence
+from dataclasses import dataclass, field
+from typing import TypeVar
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncSession
+
+from app.database import engine, settings
+from app.models import Asset, AssetCategory, AssetSnapshot
+from app.services.data_version import get_data_version
+from app.services.yfinance_service import YFinanceService
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# セッションを受け取り、レスポンスキャッシュにエントリを載せる関数
+CachePrimer = Callable[[AsyncSession], Awaitable[None]]
+
+# DB に接続できなかった場合の再試行間隔（秒）
+RETRY_DELAY_SECONDS = 2
+# 株価の事前取得を待つ最大秒数（超えたら諦めて ready にする）
+QUOTE_PREFETCH_TIMEOUT_SECONDS = 15
+# 株価を取得するカテゴリ（1=日本株, 2=米国株）
+QUOTE_CATEGORY_IDS = (1, 2)
+
+
+@dataclass
+class WarmupState:
+    """Progress of the warm-up in this worker."""
+
+    ready: bool = False
+    attempts: int = 0
+    connections: int = 0
+    # ステップ名 → 所要時間（ミリ秒）
+    steps: dict[str, float] = field(default_factory=dict)
+    error: str | None = None
+
+    def as_dict(self) -> dict:
+        return {
+            "ready": self.ready,
+            "attempts": self.attempts,
+            "connections": self.connections,
+            "steps_ms": {name: round(ms, 1) for name, ms in self.steps.items()},
+            "error": self.error,
+        }
+
+
+warmup_state = WarmupState()
+
+
+async def _prime_connection(conn: AsyncConnection) -> None:
+    """Run the hot statements (as issued by the routers) on one connection."""
+    session = AsyncSession(bind=conn)
+    try:
+        await get_data_version(session)
+        categories = await session.execute(select(AssetCategory).order_by(AssetCategory.id))
+        categories.scalars().all()
+        latest = await session.execute(
+            select(AssetSnapshot).order_by(AssetSnapshot.snapshot_date.desc()).limit(1)
+        )
+        latest.scalar_one_or_none()
+    finally:
+        await session.close()
+
+
+async def _warm_pool() -> int:
+    """Open ``pool_size`` connections concurrently and prime each of them."""
+    size = getattr(engine.pool, "size", lambda: 1)()
+    conns = await asyncio.gather(*(engine.connect() for _ in range(size)), return_exceptions=True)
+    opened = [c for c in conns if isinstance(c, AsyncConnection)]
+    try:
+        failures = [c for c in conns if isinstance(c, BaseException)]
+        if failures:
+            raise failures[0]
+        await asyncio.gather(*(_prime_connection(conn) for conn in opened))
+    finally:
+        # 閉じるとプールに戻る（接続は維持される）
+        for conn in opened:
+            await conn.close()
+    return len(opened)
+
+
+async def _prime_response_cache(primers: Sequence[CachePrimer]) -> None:
+    """Build the given responses into the response cache with one session."""
+    async with AsyncSession(engine) as session:
+        for prime in primers:
+            await prime(session)
+
+
+async def _prefetch_quote() -> None:
+    """Fetch the price of one held ticker to initialize the market data provider."""
+    async with AsyncSession(engine) as session:
+        result = await session.execute(
+            select(Asset.ticker_symbol, Asset.category_id)
+            .where(
+                Asset.category_id.in_(QUOTE_CATEGORY_IDS),
+                Asset.ticker_symbol.is_not(None),
+                Asset.quantity > 0,
+            )
+            .limit(1)
+        )
+        held = result.first()
+    if held is None:
+        return
+    await YFinanceService.fetch_price_history(held.ticker_symbol, held.category_id, "7d")
+
+
+async def _timed(name: str, coro: Awaitable[T]) -> T:
+    started = time.perf_counter()
+    try:
+        return await coro
+    finally:
+        warmup_state.steps[name] = (time.perf_counter() - started) * 1000
+
+
+async def warm_up(cache_primers: Sequence[CachePrimer] = ()) -> None:
+    """
+    Warm up this worker and mark it ready (runs until it succeeds or is cancelled).
+
+    Args:
+        cache_primers: Functions that put the most requested responses into
+            the response cache
+    """
+    while True:
+        warmup_state.attempts += 1
+        try:
+            warmup_state.connections = await _timed("database", _warm_pool())
+            break
+        except Exception as e:
+            warmup_state.error = str(e) or type(e).__name__
+            logger.warning(
+                "Warm-up attempt %d failed, retrying in %ds: %s",
+                warmup_state.attempts,
+                RETRY_DELAY_SECONDS,
+                warmup_state.error,
+            )
+            await asyncio.sleep(RETRY_DELAY_SECONDS)
+
+    if cache_primers:
+        try:
+            await _timed("responses", _prime_response_cache(cache_primers))
+        except Exception as e:
+            logger.warning("Response cache priming failed during warm-up: %s", e)
+
+    if settings.WARMUP_PREFETCH_QUOTES:
+        try:
+            await _timed(
+                "quotes",
+                asyncio.wait_for(_prefetch_quote(), QUOTE_PREFETCH_TIMEOUT_SECONDS),
+            )
+        except Exception as e:
+            logger.warning("Quote prefetch failed during warm-up: %s", e)
+
+    warmup_state.error = None
+    warmup_state.ready = True
+    logger.info(
+        "Warm-up finished (%d connections): %s",
+        warmup_state.connections,
+        ", ".join(f"{name} {ms:.0f} ms" for name, ms in warmup_state.steps.items()),
+    )
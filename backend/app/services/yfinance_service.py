@@ -1,13 +1,24 @@
 """
 yfinance service for fetching historical stock price data.
+
+yfinance (and pandas / numpy behind it) is imported on first use rather
+than at module load, so API workers and scripts that never touch market
+data do not pay its import time and memory.
 """
 
 from decimal import Decimal
-from typing import Optional
+from typing import TYPE_CHECKING, Optional
 
-import yfinance as yf
 from pydantic import BaseModel
 
+from app.services.executors import cpu_executor, provider_executor
+from app.services.metrics import observe_provider_call
+from app.services.single_flight import SingleFlight
+
+if TYPE_CHECKING:
+    import pandas as pd
+    import yfinance as yf
+
 
 class PricePoint(BaseModel):
     """Single price data point."""
@@ -20,9 +31,28 @@ class PricePoint(BaseModel):
     volume: int
 
 
+# 同一銘柄・同一期間の同時リクエストは 1 回の取得を共有する
+price_history_flight: SingleFlight[list[PricePoint]] = SingleFlight("price_history")
+
+
 class YFinanceService:
     """Service for fetching stock price data from yfinance."""
 
+    @staticmethod
+    def ticker(formatted_ticker: str) -> "yf.Ticker":
+        """
+        Create a yfinance Ticker, importing yfinance on the first call.
+
+        Args:
+            formatted_ticker: Ticker symbol in yfinance format
+
+        Returns:
+            yfinance Ticker
+        """
+        import yfinance
+
+        return yfinance.Ticker(formatted_ticker)
+
     @staticmethod
     def _get_ticker_symbol(ticker: str, category_id: int) -> str:
         """
@@ -41,6 +71,42 @@ class YFinanceService:
                 return f"{ticker}.T"
         return ticker
 
+    @staticmethod
+    def _fetch_history(formatted_ticker: str, period: str) -> "pd.DataFrame":
+        """Blocking HTTP request to Yahoo Finance (run on the provider pool)."""
+        with observe_provider_call("history"):
+            return YFinanceService.ticker(formatted_ticker).history(period=period)
+
+    @staticmethod
+    def _fetch_info(formatted_ticker: str) -> dict:
+        """Blocking quote summary request (run on the provider pool)."""
+        with observe_provider_call("info"):
+            return YFinanceService.ticker(formatted_ticker).info
+
+    @staticmethod
+    def _to_price_points(hist: "pd.DataFrame") -> list[PricePoint]:
+        """Convert a history DataFrame to price points (run on the CPU pool)."""
+        # iterrows は行ごとに Series を生成して遅いため列単位で走査する
+        return [
+            PricePoint(
+                date=date_idx.strftime("%Y-%m-%d"),
+                open=Decimal(str(round(open_, 2))),
+                high=Decimal(str(round(high, 2))),
+                low=Decimal(str(round(low, 2))),
+                close=Decimal(str(round(close, 2))),
+                volume=int(volume),
+            )
+            for date_idx, open_, high, low, close, volume in zip(
+                hist.index,
+                hist["Open"],
+                hist["High"],
+                hist["Low"],
+                hist["Close"],
+                hist["Volume"],
+                strict=True,
+            )
+        ]
+
     @staticmethod
     def get_price_history(
         ticker_symbol: str,
@@ -48,7 +114,7 @@ class YFinanceService:
         period: str = "1mo",
     ) -> list[PricePoint]:
         """
-        Fetch historical price data from yfinance.
+        Fetch historical price data from yfinance (blocking; for scripts).
 
         Args:
             ticker_symbol: Stock ticker symbol
@@ -62,35 +128,72 @@ class YFinanceService:
             ValueError: If ticker is invalid or data cannot be fetched
         """
         try:
-            # Format ticker for yfinance
             formatted_ticker = YFinanceService._get_ticker_symbol(ticker_symbol, category_id)
-
-            # Fetch data from yfinance
-            ticker = yf.Ticker(formatted_ticker)
-            hist = ticker.history(period=period)
+            hist = YFinanceService._fetch_history(formatted_ticker, period)
 
             if hist.empty:
                 raise ValueError(f"No data found for ticker: {formatted_ticker}")
 
-            # Convert to our format
-            price_points = []
-            for date_idx, row in hist.iterrows():
-                price_points.append(
-                    PricePoint(
-                        date=date_idx.strftime("%Y-%m-%d"),
-                        open=Decimal(str(round(row["Open"], 2))),
-                        high=Decimal(str(round(row["High"], 2))),
-                        low=Decimal(str(round(row["Low"], 2))),
-                        close=Decimal(str(round(row["Close"], 2))),
-                        volume=int(row["Volume"]),
-                    )
-                )
-
-            return price_points
+            return YFinanceService._to_price_points(hist)
 
         except Exception as e:
             raise ValueError(f"Failed to fetch price data: {e!s}") from e
 
+    @staticmethod
+    async def fetch_price_history(
+        ticker_symbol: str,
+        category_id: int,
+        period: str = "1mo",
+    ) -> list[PricePoint]:
+        """
+        Fetch historical price data without blocking the event loop.
+
+        The HTTP request runs on the provider I/O pool and the DataFrame
+        conversion on the CPU pool. Concurrent calls for the same ticker and
+        period share one fetch.
+
+        Args:
+            ticker_symbol: Stock ticker symbol
+            category_id: Asset category ID (1=日本株, 2=米国株)
+            period: Time period (7d, 1mo, 3mo, 1y, max)
+
+        Returns:
+            List of price data points
+
+        Raises:
+            ValueError: If ticker is invalid or data cannot be fetched
+        """
+        formatted_ticker = YFinanceService._get_ticker_symbol(ticker_symbol, category_id)
+
+        async def fetch() -> list[PricePoint]:
+            try:
+                hist = await provider_executor.run(
+                    YFinanceService._fetch_history, formatted_ticker, period
+                )
+
+                if hist.empty:
+                    raise ValueError(f"No data found for ticker: {formatted_ticker}")
+
+                return await cpu_executor.run(YFinanceService._to_price_points, hist)
+
+            except Exception as e:
+                raise ValueError(f"Failed to fetch price data: {e!s}") from e
+
+        return await price_history_flight.do((formatted_ticker, period), fetch)
+
+    @staticmethod
+    async def fetch_info(formatted_ticker: str) -> dict:
+        """
+        Fetch the quote summary (``Ticker.info``) on the provider I/O pool.
+
+        Args:
+            formatted_ticker: Ticker symbol in yfinance format
+
+        Returns:
+            Info dict (empty-ish when the symbol is unknown)
+        """
+        return await provider_executor.run(YFinanceService._fetch_info, formatted_ticker)
+
     @staticmethod
     def get_current_price(ticker_symbol: str, category_id: int) -> Optional[Decimal]:
         """
@@ -105,8 +208,8 @@ class YFinanceService:
         """
         try:
             formatted_ticker = YFinanceService._get_ticker_symbol(ticker_symbol, category_id)
-            ticker = yf.Ticker(formatted_ticker)
-            hist = ticker.history(period="1d")
+            with observe_provider_call("history"):
+                hist = YFinanceService.ticker(formatted_ticker).history(period="1d")
 
             if hist.empty:
                 return None
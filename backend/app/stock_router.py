@@ -8,10 +8,12 @@ yfinance を使用して株式シンボルから銘柄情報を検索します
 
 from decimal import Decimal
 
-import yfinance as yf
 from fastapi import APIRouter, Query
 from pydantic import BaseModel
 
+from app.services import YFinanceService
+from app.services.single_flight import SingleFlight
+
 stock_router = APIRouter(
     prefix="/api/stocks",
     tags=["株式検索"],
@@ -36,6 +38,9 @@ class StockSearchResponse(BaseModel):
     error: str | None = None
 
 
+stock_search_flight: SingleFlight[StockSearchResponse] = SingleFlight("stock_search")
+
+
 @stock_router.get(
     "/search",
     response_model=StockSearchResponse,
@@ -64,6 +69,12 @@ async def search_stock(
     Returns:
         銘柄情報（シンボル、銘柄名、通貨、現在価格、市場）
     """
+    # 同じ (シンボル, 市場) の同時リクエストは 1 回の検索結果を共有する
+    return await stock_search_flight.do((symbol, market), lambda: _search_stock(symbol, market))
+
+
+async def _search_stock(symbol: str, market: str) -> StockSearchResponse:
+    """yfinance で銘柄情報を検索（search_stock の本体）"""
     try:
         # 市場の判定とシンボル形式の調整
         if market == "jp" or (market == "auto" and symbol.isdigit()):
@@ -79,8 +90,7 @@ async def search_stock(
             detected_market = "US"
 
         # yfinance で情報を取得
-        ticker = yf.Ticker(full_symbol)
-        info = ticker.info
+        info = await YFinanceService.fetch_info(full_symbol)
 
         # 銘柄名を取得（複数のフィールドを試行）
         name = info.get("longName") or info.get("shortName") or info.get("displayName") or ""
@@ -89,8 +99,7 @@ async def search_stock(
             # 米国株として見つからない場合、日本株として再試行
             if detected_market == "US" and market == "auto":
                 jp_symbol = f"{symbol}.T"
-                ticker = yf.Ticker(jp_symbol)
-                info = ticker.info
+                info = await YFinanceService.fetch_info(jp_symbol)
                 name = (
                     info.get("longName") or info.get("shortName") or info.get("displayName") or ""
                 )
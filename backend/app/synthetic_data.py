@@ -0,0 +1,431 @@
+"""
+Scalable synthetic data generator for load-test and benchmark databases.
+
+Unlike ``app.seed`` (a fixed year of hand-written snapshots inserted row by
+row), this generates a full portfolio history:
+
+* a USD/JPY random-walk FX series (``fx_rates``),
+* geometric random-walk prices for thousands of assets,
+* buy/sell transactions that never oversell, with matching cash ledger
+  entries and monthly deposits,
+* per-asset daily ``asset_histories`` and the derived ``asset_snapshots``.
+
+Rows are streamed into PostgreSQL with ``COPY ... FROM STDIN`` (CSV) one
+asset at a time, so memory stays bounded by a single asset's history and
+tens of millions of rows load in minutes. Each asset is simulated from its
+own seeded RNG, which lets every table be written in its own streaming pass
+without keeping the generated rows around.
+
+Usage:
+    python -m app.synthetic_data --assets 2000 --days 7300 --transactions 500000 --truncate
+"""
+
+import argparse
+import asyncio
+import time
+import uuid
+from collections.abc import AsyncIterator, Callable, Iterator
+from dataclasses import dataclass
+from datetime import date, timedelta
+
+import numpy as np
+from sqlalchemy import select, text, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database import async_session_maker
+from app.models import Asset
+from app.services import bump_data_version
+from app.services.cash_ledger import ensure_checkpoints
+from app.services.holdings import rebuild_holding_intervals
+
+# 1回の COPY 送信で束ねるバイト数の目安
+COPY_CHUNK_BYTES = 1 << 20
+
+# カテゴリの割り当て順（日本株:米国株:投資信託 = 2:2:1）
+CATEGORY_CYCLE = (1, 2, 1, 2, 3)
+
+# (初値の範囲, 売買単位) per category
+PRICE_RANGES = {1: (300.0, 10000.0), 2: (10.0, 500.0), 3: (8000.0, 30000.0)}
+LOT_SIZES = {1: 100, 2: 1, 3: 10}
+
+SELL_PROBABILITY = 0.25
+
+
+@dataclass(frozen=True)
+class SyntheticScale:
+    """Size and shape of the generated portfolio."""
+
+    assets: int = 50
+    days: int = 730
+    transactions: int = 2000
+    seed: int = 42
+    end_date: date | None = None  # 最終日（既定: 昨日）
+    monthly_deposit: int = 100_000
+
+    @property
+    def start_date(self) -> date:
+        end = self.end_date or date.today() - timedelta(days=1)
+        return end - timedelta(days=self.days - 1)
+
+
+@dataclass
+class _AssetPath:
+    category_id: int
+    currency: str
+    prices: np.ndarray  # native currency, rounded to 0.01
+    holdings: np.ndarray  # quantity held at the end of each day
+    # (day, transaction_type, quantity, price, total_cost_jpy, transaction_id)
+    trades: list[tuple[int, str, int, float, float, uuid.UUID]]
+    average_cost: float
+    total_cost_jpy: float
+
+
+class SyntheticPortfolio:
+    """Deterministic simulation of one portfolio; see module docstring."""
+
+    def __init__(self, scale: SyntheticScale):
+        self.scale = scale
+        self.dates = [scale.start_date + timedelta(days=i) for i in range(scale.days)]
+        self.date_strings = [d.isoformat() for d in self.dates]
+
+        rng = np.random.default_rng([scale.seed, 0])
+        # USD/JPY は対数ランダムウォーク（日次ボラティリティ 0.4%）
+        self.fx = np.round(110 * np.exp(np.cumsum(rng.normal(0, 0.004, scale.days))), 2)
+        self.trade_counts = rng.multinomial(scale.transactions, [1 / scale.assets] * scale.assets)
+        self.asset_ids = [uuid.UUID(bytes=rng.bytes(16), version=4) for _ in range(scale.assets)]
+        self.deposit_days = [i for i, d in enumerate(self.dates) if d.day == 1]
+
+    def simulate(self, index: int) -> _AssetPath:
+        """Simulate one asset. Always returns the same path for the same index."""
+        days = self.scale.days
+        rng = np.random.default_rng([self.scale.seed, index + 1])
+        category_id = CATEGORY_CYCLE[index % len(CATEGORY_CYCLE)]
+        currency = "USD" if category_id == 2 else "JPY"
+
+        low, high = PRICE_RANGES[category_id]
+        mu = rng.normal(0.0002, 0.0003)
+        sigma = rng.uniform(0.008, 0.03)
+        log_returns = rng.normal(mu - sigma**2 / 2, sigma, days)
+        prices = rng.uniform(low, high) * np.exp(np.cumsum(log_returns))
+        prices = np.maximum(np.round(prices, 2), 0.01)
+
+        count = int(self.trade_counts[index])
+        trade_days = np.sort(rng.integers(0, days, count))
+        lots = rng.integers(1, 6, count) * LOT_SIZES[category_id]
+        sell_draws = rng.random(count)
+        trade_ids = rng.bytes(16 * count)
+
+        trades = []
+        deltas = np.zeros(days)
+        holding = 0
+        average_cost = total_cost = 0.0
+        for j in range(count):
+            day, quantity = int(trade_days[j]), int(lots[j])
+            price = float(prices[day])
+            price_jpy = round(price * float(self.fx[day]), 2) if currency == "USD" else price
+            cost = round(quantity * price_jpy, 2)
+            if sell_draws[j] < SELL_PROBABILITY and holding >= quantity:
+                total_cost -= total_cost * quantity / holding
+                holding -= quantity
+                deltas[day] -= quantity
+                transaction_type = "sell"
+            else:
+                average_cost = (holding * average_cost + quantity * price) / (holding + quantity)
+                total_cost += cost
+                holding += quantity
+                deltas[day] += quantity
+                transaction_type = "buy"
+            transaction_id = uuid.UUID(bytes=trade_ids[16 * j : 16 * (j + 1)], version=4)
+            trades.append((day, transaction_type, quantity, price, cost, transaction_id))
+
+        return _AssetPath(
+            category_id=category_id,
+            currency=currency,
+            prices=prices,
+            holdings=np.cumsum(deltas),
+            trades=trades,
+            average_cost=average_cost,
+            total_cost_jpy=total_cost,
+        )
+
+    def paths(self) -> Iterator[tuple[int, uuid.UUID, _AssetPath]]:
+        for index, asset_id in enumerate(self.asset_ids):
+            yield index, asset_id, self.simulate(index)
+
+
+async def _chunked(lines: Iterator[str]) -> AsyncIterator[bytes]:
+    """Group CSV lines into ~1 MiB chunks for COPY."""
+    buffer: list[str] = []
+    size = 0
+    for line in lines:
+        buffer.append(line)
+        size += len(line)
+        if size >= COPY_CHUNK_BYTES:
+            yield "".join(buffer).encode()
+            buffer, size = [], 0
+            # 生成処理でイベントループを占有しない
+            await asyncio.sleep(0)
+    if buffer:
+        yield "".join(buffer).encode()
+
+
+async def _copy(session: AsyncSession, table: str, columns: list[str], lines: Iterator[str]) -> str:
+    """Stream CSV lines into ``table`` via asyncpg's COPY FROM STDIN."""
+    connection = await session.connection()
+    raw = await connection.get_raw_connection()
+    return await raw.driver_connection.copy_to_table(
+        table, source=_chunked(lines), columns=columns, format="csv"
+    )
+
+
+async def generate_portfolio(
+    session: AsyncSession,
+    scale: SyntheticScale,
+    truncate: bool = False,
+    log: Callable[[str], None] = print,
+) -> None:
+    """
+    Generate a synthetic portfolio into the database (caller commits).
+
+    Args:
+        session: Database session
+        scale: Portfolio size
+        truncate: Delete existing portfolio data first
+        log: Progress output
+
+    Raises:
+        RuntimeError: If assets already exist and ``truncate`` is False
+    """
+    if truncate:
+        await session.execute(
+            text(
+                "TRUNCATE assets, asset_snapshots, cash_ledger_entries, "
+                "cash_balance_checkpoints, fx_rates CASCADE"
+            )
+        )
+    elif await session.scalar(select(Asset.id).limit(1)) is not None:
+        raise RuntimeError("assets テーブルにデータがあります。--truncate を指定してください")
+
+    portfolio = SyntheticPortfolio(scale)
+    days, dates, date_strings = scale.days, portfolio.dates, portfolio.date_strings
+    fx = portfolio.fx
+    started = time.perf_counter()
+
+    # 1. 銘柄（数量・取得単価は履歴の生成後に更新する）
+    def asset_lines() -> Iterator[str]:
+        created = f"{dates[0].isoformat()} 00:00:00"
+        for index, asset_id in enumerate(portfolio.asset_ids):
+            category_id = CATEGORY_CYCLE[index % len(CATEGORY_CYCLE)]
+            ticker = {1: str(1000 + index), 2: f"SYN{index}", 3: ""}[category_id]
+            currency = "USD" if category_id == 2 else "JPY"
+            yield f"{asset_id},{category_id},Synthetic {index},{ticker},0,{currency},0,{created}\n"
+        yield f"{uuid.uuid4()},4,現金,,0,JPY,0,{created}\n"
+
+    await _copy(
+        session,
+        "assets",
+        [
+            "id",
+            "category_id",
+            "name",
+            "ticker_symbol",
+            "quantity",
+            "currency",
+            "total_cost_jpy",
+            "created_at",
+        ],
+        asset_lines(),
+    )
+
+    # 為替レート（スナップショットの円換算に使う）
+    await _copy(
+        session,
+        "fx_rates",
+        ["pair", "rate_date", "rate"],
+        (f"USDJPY,{date_strings[day]},{fx[day]:.2f}\n" for day in range(days)),
+    )
+
+    # 2. 資産履歴（保有している日のみ）。スナップショットの集計と現金の増減も同時に求める
+    category_totals = {1: np.zeros(days), 2: np.zeros(days), 3: np.zeros(days)}
+    holding_counts = np.zeros(days, dtype=np.int64)
+    cash_flows = np.zeros(days)
+    cash_flows[portfolio.deposit_days] += scale.monthly_deposit
+    asset_states: list[dict] = []
+    history_rows = 0
+
+    def history_lines() -> Iterator[str]:
+        nonlocal history_rows
+        for _, asset_id, path in portfolio.paths():
+            held = np.nonzero(path.holdings > 0)[0]
+            values = np.round(path.prices * path.holdings, 2)
+            rate = fx if path.currency == "USD" else 1
+            category_totals[path.category_id] += path.prices * path.holdings * rate
+            holding_counts[held] += 1
+            for day, transaction_type, _, _, cost, _ in path.trades:
+                cash_flows[day] += cost if transaction_type == "sell" else -cost
+            history_rows += len(held)
+
+            # numpy スカラーの書式化は遅いので Python の値に変換してから組み立てる
+            prices, holdings, values = (a.tolist() for a in (path.prices, path.holdings, values))
+            asset_key = str(asset_id)
+            for day in held.tolist():
+                yield (
+                    f"{asset_key},{date_strings[day]},{prices[day]:.2f},"
+                    f"{holdings[day]:.4f},{values[day]:.2f}\n"
+                )
+
+            last_rate = float(fx[-1]) if path.currency == "USD" else 1.0
+            asset_states.append(
+                {
+                    "id": asset_id,
+                    "quantity": float(holdings[-1]),
+                    "average_cost": round(path.average_cost, 2),
+                    "current_price": float(prices[-1]),
+                    "current_value": round(float(holdings[-1] * prices[-1]) * last_rate, 2),
+                    "total_cost_jpy": round(path.total_cost_jpy, 2),
+                }
+            )
+
+    await _copy(
+        session,
+        "asset_histories",
+        ["asset_id", "record_date", "price", "quantity", "value"],
+        history_lines(),
+    )
+    await session.execute(update(Asset), asset_states)
+    log(f"  asset_histories: {history_rows:,} rows ({time.perf_counter() - started:.1f}s)")
+
+    # 現金がマイナスにならないよう初期入金額を決める
+    running = np.cumsum(cash_flows)
+    opening_deposit = float(np.ceil(max(0.0, -running.min()) / 1e6) * 1e6 + 1e6)
+    cash = opening_deposit + running
+    await session.execute(
+        update(Asset)
+        .where(Asset.category_id == 4)
+        .values(
+            quantity=round(float(cash[-1]), 2),
+            average_cost=1,
+            current_price=1,
+            current_value=round(float(cash[-1]), 2),
+        )
+    )
+
+    # 3. 取引履歴
+    transaction_rows = 0
+
+    def transaction_lines() -> Iterator[str]:
+        nonlocal transaction_rows
+        for _, asset_id, path in portfolio.paths():
+            transaction_rows += len(path.trades)
+            for day, transaction_type, quantity, price, cost, transaction_id in path.trades:
+                rate = f"{fx[day]:.2f}" if path.currency == "USD" else ""
+                yield (
+                    f"{transaction_id},{asset_id},{transaction_type},{quantity},{price:.2f},"
+                    f"{rate},{path.currency},{cost:.2f},{date_strings[day]} 00:00:00\n"
+                )
+
+    await _copy(
+        session,
+        "transactions",
+        [
+            "id",
+            "asset_id",
+            "transaction_type",
+            "quantity",
+            "price",
+            "usd_jpy_rate",
+            "currency",
+            "total_cost_jpy",
+            "transaction_date",
+        ],
+        transaction_lines(),
+    )
+    log(f"  transactions: {transaction_rows:,} rows ({time.perf_counter() - started:.1f}s)")
+
+    # 4. 現金台帳（初期入金・毎月の入金・売買）
+    def ledger_lines() -> Iterator[str]:
+        yield f"{date_strings[0]},{opening_deposit:.2f},deposit,,初期入金\n"
+        for day in portfolio.deposit_days:
+            yield f"{date_strings[day]},{scale.monthly_deposit:.2f},deposit,,積立入金\n"
+        for index, _, path in portfolio.paths():
+            for day, transaction_type, _, _, cost, transaction_id in path.trades:
+                if transaction_type == "sell":
+                    amount, entry_type, note = cost, "adjustment", f"Synthetic {index} 売却"
+                else:
+                    amount, entry_type, note = -cost, "buy", f"Synthetic {index} 購入"
+                yield f"{date_strings[day]},{amount:.2f},{entry_type},{transaction_id},{note}\n"
+
+    await _copy(
+        session,
+        "cash_ledger_entries",
+        ["entry_date", "amount", "entry_type", "transaction_id", "note"],
+        ledger_lines(),
+    )
+
+    # 5. スナップショット（日次の集計値）
+    def snapshot_lines() -> Iterator[str]:
+        for day in range(days):
+            jp, us, trusts = (category_totals[c][day] for c in (1, 2, 3))
+            total = jp + us + trusts + cash[day]
+            yield (
+                f"{date_strings[day]},{total:.2f},{jp:.2f},{us:.2f},{trusts:.2f},"
+                f"{cash[day]:.2f},{holding_counts[day]}\n"
+            )
+
+    await _copy(
+        session,
+        "asset_snapshots",
+        [
+            "snapshot_date",
+            "total_assets",
+            "japanese_stocks",
+            "us_stocks",
+            "investment_trusts",
+            "cash",
+            "holding_count",
+        ],
+        snapshot_lines(),
+    )
+
+    # 6. 派生テーブル（保有区間・現金チェックポイント）
+    await rebuild_holding_intervals(session, portfolio.asset_ids)
+    await ensure_checkpoints(session, date.today().replace(day=1) - timedelta(days=1))
+    await bump_data_version(session)
+    for table in ("assets", "asset_histories", "transactions", "asset_snapshots"):
+        await session.execute(text(f"ANALYZE {table}"))
+
+    log(
+        f"✓ Generated {scale.assets:,} assets x {days:,} days, "
+        f"{transaction_rows:,} transactions, {history_rows:,} histories "
+        f"in {time.perf_counter() - started:.1f}s"
+    )
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description="合成データの生成（負荷試験・ベンチマーク用）")
+    parser.add_argument("--assets", type=int, default=SyntheticScale.assets, help="銘柄数")
+    parser.add_argument("--days", type=int, default=SyntheticScale.days, help="日数")
+    parser.add_argument(
+        "--transactions", type=int, default=SyntheticScale.transactions, help="取引件数"
+    )
+    parser.add_argument("--seed", type=int, default=SyntheticScale.seed, help="乱数シード")
+    parser.add_argument(
+        "--monthly-deposit", type=int, default=SyntheticScale.monthly_deposit, help="毎月の入金額"
+    )
+    parser.add_argument("--truncate", action="store_true", help="既存データを削除してから生成")
+    args = parser.parse_args()
+
+    scale = SyntheticScale(
+        assets=args.assets,
+        days=args.days,
+        transactions=args.transactions,
+        seed=args.seed,
+        monthly_deposit=args.monthly_deposit,
+    )
+    async with async_session_maker() as session:
+        await generate_portfolio(session, scale, truncate=args.truncate)
+        await session.commit()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
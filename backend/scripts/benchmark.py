@@ -0,0 +1,443 @@
+"""
+API エンドポイントのベンチマーク
+
+合成ポートフォリオ（N 銘柄 × M 日分の asset_histories / asset_snapshots、K 件の取引）を
+ベンチマーク専用DBに投入し、各ルーターのエンドポイントを ASGI クライアント経由で
+叩いて p50 / p95 / p99 レイテンシとスループットを計測する。
+yfinance はオフラインの決定的なスタンドインに差し替えるため、ネットワークは使わない。
+
+使い方:
+    # 投入 + 計測（既定: 50 銘柄 × 730 日、取引 2,000 件）
+    python scripts/benchmark.py --assets 200 --days 1825 --transactions 20000
+
+    # 結果をベースラインとして保存
+    python scripts/benchmark.py --output bench-baseline.json
+
+    # 回帰チェック（p95 がベースラインより 20% 以上悪化したら終了コード 1）
+    python scripts/benchmark.py --skip-seed --baseline bench-baseline.json --max-regression 0.2
+
+ベンチマーク用DB（既定: {POSTGRES_DB}_bench）は存在しなければ作成し、マイグレーションを適用する。
+投入時に既存データはすべて削除されるため、開発用DBを指定しないこと。
+"""
+
+import argparse
+import asyncio
+import json
+
+# プロジェクトルートにパスを通す（backendディレクトリ）
+import os
+import random
+import statistics
+import sys
+import time
+import zlib
+from collections.abc import Awaitable, Callable
+from dataclasses import asdict, dataclass, field
+from datetime import date, timedelta
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+if TYPE_CHECKING:
+    from app.synthetic_data import SyntheticScale
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+
+# ==============================================
+# オフラインの市場データ（yfinance のスタンドイン）
+# ==============================================
+class _FastInfo:
+    def __init__(self, last_price: float):
+        self.last_price = last_price
+
+
+class OfflineTicker:
+    """
+    yfinance.Ticker と同じ属性を持つ決定的なスタンドイン。
+
+    価格はシンボルのハッシュから生成するランダムウォーク。
+    latency 秒だけ待つことで外部APIの応答時間を模擬できる。
+    """
+
+    latency = 0.0
+
+    def __init__(self, symbol: str):
+        self.symbol = symbol
+        self._seed = zlib.crc32(symbol.encode())
+        self._base = 150.0 if "=X" in symbol else 50 + self._seed % 5000
+
+    def _wait(self) -> None:
+        if self.latency:
+            time.sleep(self.latency)
+
+    @property
+    def fast_info(self) -> _FastInfo:
+        self._wait()
+        return _FastInfo(self._base)
+
+    @property
+    def info(self) -> dict:
+        self._wait()
+        return {
+            "longName": f"Synthetic {self.symbol}",
+            "currency": "JPY" if self.symbol.endswith(".T") else "USD",
+            "currentPrice": self._base,
+        }
+
+    def history(self, period: str | None = None, start=None, end=None):
+        import pandas as pd
+
+        self._wait()
+        end_ts = pd.Timestamp(end) if end else pd.Timestamp(date.today())
+        if start:
+            start_ts = pd.Timestamp(start)
+        else:
+            days = {"7d": 7, "1mo": 31, "3mo": 92, "1y": 366, "max": 3650}.get(period or "1mo", 31)
+            start_ts = end_ts - pd.Timedelta(days=days)
+        index = pd.bdate_range(start_ts, end_ts - pd.Timedelta(days=1))
+        rng = random.Random(self._seed)
+        closes, price = [], self._base
+        for _ in index:
+            price *= 1 + rng.uniform(-0.02, 0.02)
+            closes.append(round(price, 4))
+        return pd.DataFrame(
+            {
+                "Open": closes,
+                "High": [c * 1.01 for c in closes],
+                "Low": [c * 0.99 for c in closes],
+                "Close": closes,
+                "Volume": [1000 + i for i in range(len(closes))],
+            },
+            index=index,
+        )
+
+
+# ==============================================
+# ベンチマーク用DBの準備
+# ==============================================
+def prepare_database(db_name: str) -> None:
+    """ベンチマーク用DBを作成（なければ）し、マイグレーションを適用する"""
+    import asyncpg
+
+    async def create_if_missing() -> None:
+        conn = await asyncpg.connect(
+            host=os.getenv("POSTGRES_HOST", "localhost"),
+            port=int(os.getenv("POSTGRES_PORT", "5432")),
+            user=os.getenv("POSTGRES_USER", "postgres"),
+            password=os.getenv("POSTGRES_PASSWORD", "postgres"),
+            database="postgres",
+        )
+        try:
+            exists = await conn.fetchval("SELECT 1 FROM pg_database WHERE datname = $1", db_name)
+            if not exists:
+                await conn.execute(f'CREATE DATABASE "{db_name}"')
+                print(f"✓ Created database {db_name}")
+        finally:
+            await conn.close()
+
+    asyncio.run(create_if_missing())
+
+    from alembic.config import Config
+
+    from alembic import command
+
+    config = Config(str(BACKEND_DIR / "alembic.ini"))
+    config.set_main_option("script_location", str(BACKEND_DIR / "alembic"))
+    command.upgrade(config, "head")
+
+
+# ==============================================
+# 合成ポートフォリオの投入
+# ==============================================
+async def seed_portfolio(scale: "SyntheticScale") -> None:
+    """既存データを削除し、合成ポートフォリオを投入する（app.synthetic_data を使用）"""
+    from app.database import async_session_maker
+    from app.synthetic_data import generate_portfolio
+
+    async with async_session_maker() as session:
+        await generate_portfolio(session, scale, truncate=True)
+        await session.commit()
+
+
+# ==============================================
+# 計測
+# ==============================================
+@dataclass
+class Endpoint:
+    name: str
+    method: str
+    path: str
+    params: dict = field(default_factory=dict)
+    # 破壊的なエンドポイントは回数・並列数を個別に絞る
+    requests: int | None = None
+    concurrency: int | None = None
+    setup: Callable[[], Awaitable[None]] | None = None
+
+
+@dataclass
+class Result:
+    name: str
+    requests: int
+    errors: int
+    p50_ms: float
+    p95_ms: float
+    p99_ms: float
+    mean_ms: float
+    throughput_rps: float
+
+
+def _percentiles(latencies: list[float]) -> tuple[float, float, float]:
+    if len(latencies) == 1:
+        return latencies[0], latencies[0], latencies[0]
+    cuts = statistics.quantiles(latencies, n=100, method="inclusive")
+    return cuts[49], cuts[94], cuts[98]
+
+
+async def run_endpoint(client, endpoint: Endpoint, requests: int, concurrency: int, cold: bool):
+    """1 エンドポイントを指定回数・並列数で実行して集計する"""
+    from app.services import response_cache
+
+    requests = endpoint.requests or requests
+    concurrency = endpoint.concurrency or concurrency
+    latencies: list[float] = []
+    errors = 0
+    queue: asyncio.Queue[int] = asyncio.Queue()
+    for i in range(requests):
+        queue.put_nowait(i)
+
+    async def worker() -> None:
+        nonlocal errors
+        while not queue.empty():
+            queue.get_nowait()
+            if endpoint.setup:
+                await endpoint.setup()
+            if cold:
+                response_cache.clear()
+            started = time.perf_counter()
+            response = await client.request(endpoint.method, endpoint.path, params=endpoint.params)
+            await response.aread()
+            latencies.append((time.perf_counter() - started) * 1000)
+            if response.status_code >= 400:
+                errors += 1
+
+    # ウォームアップ（コネクションプール・テンプレートキャッシュ）
+    await client.request(endpoint.method, endpoint.path, params=endpoint.params)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    p50, p95, p99 = _percentiles(latencies)
+    return Result(
+        name=endpoint.name,
+        requests=len(latencies),
+        errors=errors,
+        p50_ms=round(p50, 2),
+        p95_ms=round(p95, 2),
+        p99_ms=round(p99, 2),
+        mean_ms=round(statistics.fmean(latencies), 2),
+        throughput_rps=round(len(latencies) / elapsed, 1),
+    )
+
+
+async def build_endpoints(backfill_days: int) -> list[Endpoint]:
+    """計測対象のエンドポイント一覧（ID などは投入済みデータから決める）"""
+    from sqlalchemy import delete, select
+
+    from app.database import async_session_maker
+    from app.models import Asset, AssetHistory, AssetSnapshot, FxRate
+
+    async with async_session_maker() as session:
+        asset_id = await session.scalar(
+            select(Asset.id).where(Asset.category_id == 2).order_by(Asset.name).limit(1)
+        )
+
+    async def trim_snapshots() -> None:
+        # 直近の数日分を削除して /refresh にバックフィルさせる
+        since = date.today() - timedelta(days=backfill_days)
+        async with async_session_maker() as session:
+            await session.execute(delete(AssetSnapshot).where(AssetSnapshot.snapshot_date >= since))
+            await session.execute(delete(AssetHistory).where(AssetHistory.record_date >= since))
+            await session.execute(delete(FxRate).where(FxRate.rate_date >= since))
+            await session.commit()
+
+    today = date.today()
+    endpoints = [
+        Endpoint("categories", "GET", "/api/categories"),
+        Endpoint("assets", "GET", "/api/assets"),
+        Endpoint("dashboard_stats", "GET", "/api/dashboard/stats"),
+        Endpoint("dashboard_portfolio", "GET", "/api/dashboard/portfolio"),
+        Endpoint(
+            "snapshots",
+            "GET",
+            "/api/snapshots",
+            {"start_date": str(today - timedelta(days=365)), "limit": 365},
+        ),
+        Endpoint("snapshots_latest", "GET", "/api/snapshots/latest"),
+        Endpoint("cash_balance", "GET", "/api/cash/balance"),
+        Endpoint("goals", "GET", "/api/goals"),
+        Endpoint("stock_search", "GET", "/api/stocks/search", {"symbol": "AAPL"}),
+        Endpoint("export_snapshots_csv", "GET", "/api/export/snapshots", requests=20),
+    ]
+    for period in ("day", "week", "month", "quarter", "year"):
+        endpoints.append(
+            Endpoint(f"snapshots_chart_{period}", "GET", "/api/snapshots/chart", {"period": period})
+        )
+    if asset_id:
+        endpoints += [
+            Endpoint("asset_detail", "GET", f"/api/assets/{asset_id}"),
+            Endpoint("asset_history", "GET", f"/api/assets/{asset_id}/history", {"days": 365}),
+            Endpoint("asset_transactions", "GET", f"/api/assets/{asset_id}/transactions"),
+            Endpoint(
+                "asset_price_history",
+                "GET",
+                f"/api/assets/{asset_id}/price-history",
+                {"period": "1y"},
+            ),
+        ]
+    endpoints.append(
+        Endpoint(
+            "assets_refresh",
+            "POST",
+            "/api/assets/refresh",
+            requests=5,
+            concurrency=1,
+            setup=trim_snapshots if backfill_days else None,
+        )
+    )
+    return endpoints
+
+
+def print_results(results: list[Result]) -> None:
+    header = (
+        f"{'endpoint':<28}{'n':>6}{'err':>5}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'req/s':>10}"
+    )
+    print(header)
+    print("-" * len(header))
+    for r in results:
+        print(
+            f"{r.name:<28}{r.requests:>6}{r.errors:>5}{r.p50_ms:>10.2f}"
+            f"{r.p95_ms:>10.2f}{r.p99_ms:>10.2f}{r.throughput_rps:>10.1f}"
+        )
+
+
+def check_regressions(results: list[Result], baseline_path: Path, max_regression: float) -> bool:
+    """ベースラインと p95 を比較し、閾値を超えて悪化したものを表示する"""
+    baseline = {r["name"]: r for r in json.loads(baseline_path.read_text())["results"]}
+    regressions = []
+    for r in results:
+        base = baseline.get(r.name)
+        if base is None or not base["p95_ms"]:
+            continue
+        ratio = r.p95_ms / base["p95_ms"] - 1
+        if ratio > max_regression:
+            regressions.append((r.name, base["p95_ms"], r.p95_ms, ratio))
+
+    if regressions:
+        print(f"\n✗ p95 regressions over {max_regression:.0%}:")
+        for name, before, after, ratio in regressions:
+            print(f"  {name}: {before:.2f}ms -> {after:.2f}ms (+{ratio:.0%})")
+        return False
+    print(f"\n✓ No p95 regression over {max_regression:.0%} against {baseline_path}")
+    return True
+
+
+async def run_benchmarks(args: argparse.Namespace, scale: "SyntheticScale") -> list[Result]:
+    import httpx
+    import yfinance
+
+    from app.database import engine
+
+    # SQL ログ出力は計測値を歪めるため無効化
+    engine.echo = False
+    # 外部APIはオフラインのスタンドインに差し替える
+    OfflineTicker.latency = args.provider_latency / 1000
+    yfinance.Ticker = OfflineTicker
+
+    from src.main import app
+
+    if not args.skip_seed:
+        await seed_portfolio(scale)
+
+    endpoints = await build_endpoints(args.backfill_days)
+    if args.endpoints:
+        selected = set(args.endpoints.split(","))
+        endpoints = [e for e in endpoints if e.name in selected]
+
+    results = []
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=300) as c:
+        for endpoint in endpoints:
+            results.append(
+                await run_endpoint(c, endpoint, args.requests, args.concurrency, args.cold)
+            )
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="API エンドポイントのベンチマーク")
+    parser.add_argument("--assets", type=int, default=50, help="銘柄数")
+    parser.add_argument("--days", type=int, default=730, help="履歴・スナップショットの日数")
+    parser.add_argument("--transactions", type=int, default=2000, help="取引件数")
+    parser.add_argument("--seed", type=int, default=42, help="乱数シード")
+    parser.add_argument("--skip-seed", action="store_true", help="投入済みのデータで計測する")
+    parser.add_argument(
+        "--requests", type=int, default=200, help="エンドポイントごとのリクエスト数"
+    )
+    parser.add_argument("--concurrency", type=int, default=10, help="同時リクエスト数")
+    parser.add_argument("--endpoints", help="計測するエンドポイント名（カンマ区切り）")
+    parser.add_argument(
+        "--cold", action="store_true", help="リクエストごとにレスポンスキャッシュを破棄する"
+    )
+    parser.add_argument(
+        "--provider-latency", type=float, default=0, help="市場データ取得の模擬遅延（ms）"
+    )
+    parser.add_argument(
+        "--backfill-days",
+        type=int,
+        default=30,
+        help="/refresh の前に削除する直近スナップショットの日数（バックフィルを計測）",
+    )
+    parser.add_argument("--database", help="ベンチマーク用DB名（既定: {POSTGRES_DB}_bench）")
+    parser.add_argument("--output", type=Path, help="結果を JSON で保存するパス")
+    parser.add_argument("--baseline", type=Path, help="比較するベースライン JSON")
+    parser.add_argument(
+        "--max-regression", type=float, default=0.2, help="許容する p95 の悪化率（0.2 = 20%%）"
+    )
+    args = parser.parse_args()
+
+    # app をインポートする前にDB名を差し替える（Settings は環境変数から読む）
+    db_name = args.database or f"{os.getenv('POSTGRES_DB', 'appdb')}_bench"
+    os.environ["POSTGRES_DB"] = db_name
+    prepare_database(db_name)
+
+    from app.synthetic_data import SyntheticScale
+
+    scale = SyntheticScale(args.assets, args.days, args.transactions, args.seed)
+    results = asyncio.run(run_benchmarks(args, scale))
+
+    print()
+    if not args.skip_seed:
+        print(
+            f"scale: {scale.assets} assets x {scale.days} days, {scale.transactions} transactions"
+        )
+    print(f"concurrency: {args.concurrency}{' / cold cache' if args.cold else ''}")
+    print_results(results)
+
+    if args.output:
+        args.output.write_text(
+            json.dumps(
+                {"scale": asdict(scale), "results": [asdict(r) for r in results]},
+                indent=2,
+            )
+        )
+        print(f"\n✓ Saved results to {args.output}")
+
+    if args.baseline and not check_regressions(results, args.baseline, args.max_regression):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
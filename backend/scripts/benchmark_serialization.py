@@ -0,0 +1,153 @@
+"""
+レスポンスのシリアライズ方式のベンチマーク
+
+/api/assets（AssetResponse）と /api/snapshots（AssetSnapshotResponse）相当のレスポンスを
+大量の ORM オブジェクトから組み立て、JSON 化の方式ごとの所要時間を比較する。
+DB には接続しない（ORM オブジェクトはメモリ上で生成する）。
+
+比較する方式:
+- fastapi: response_model 経由の既定の経路（検証 + Pydantic による JSON 出力）
+- jsonable_encoder: 既定以外の response_class 指定時の経路（検証 + dict 化 + json.dumps）
+- orjson: 検証 + dict 化 + orjson（ORJSONResponse）
+- orjson float: 上記で Decimal を数値で出力（numeric=float）
+- rows: 一覧系エンドポイントの高速経路（SQL の行の dict を検証せずに orjson で出力）
+
+使い方:
+    # 既定: 10,000 行 × 5 回（最速値を表示）
+    python scripts/benchmark_serialization.py
+
+    python scripts/benchmark_serialization.py --rows 50000 --repeat 3
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+import uuid
+from collections.abc import Callable
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+from fastapi.encoders import jsonable_encoder
+from pydantic import TypeAdapter
+
+from app.models import Asset, AssetCategory, AssetSnapshot
+from app.responses import dumps
+from app.schemas import AssetResponse, AssetSnapshotResponse
+
+
+def build_assets(rows: int) -> list[Asset]:
+    """カテゴリを読み込み済みの Asset を生成"""
+    categories = [
+        AssetCategory(id=i, name=name, name_en=name_en, color="indigo", icon=None)
+        for i, name, name_en in (
+            (1, "日本株", "japanese_stocks"),
+            (2, "米国株", "us_stocks"),
+            (3, "投資信託", "investment_trusts"),
+            (4, "現金", "cash"),
+        )
+    ]
+    now = datetime.now()
+    assets = []
+    for i in range(rows):
+        category = categories[i % 4]
+        assets.append(
+            Asset(
+                id=uuid.uuid4(),
+                category_id=category.id,
+                category=category,
+                name=f"銘柄{i:05d}",
+                ticker_symbol=f"{1000 + i % 9000}",
+                quantity=Decimal("100.0000"),
+                average_cost=Decimal("2512.34"),
+                current_price=Decimal("2800.00") + i % 100,
+                current_value=Decimal("280000.00") + i,
+                currency="JPY",
+                total_cost_jpy=Decimal("251234.00"),
+                created_at=now,
+                updated_at=now,
+            )
+        )
+    return assets
+
+
+def build_snapshots(rows: int) -> list[AssetSnapshot]:
+    """日次の AssetSnapshot を生成"""
+    start = date.today() - timedelta(days=rows)
+    now = datetime.now()
+    return [
+        AssetSnapshot(
+            id=uuid.uuid4(),
+            snapshot_date=start + timedelta(days=i),
+            total_assets=Decimal("4610000.00") + i,
+            japanese_stocks=Decimal("1350000.00"),
+            us_stocks=Decimal("1600000.00") + i,
+            investment_trusts=Decimal("1050000.00"),
+            cash=Decimal("610000.00"),
+            holding_count=12,
+            yield_rate=Decimal("3.24"),
+            created_at=now,
+        )
+        for i in range(rows)
+    ]
+
+
+def to_rows(objects: list, adapter: TypeAdapter) -> list[dict]:
+    """SQL の行（レスポンスモデルのフィールド名をキーとする dict）に相当するデータ"""
+    return adapter.dump_python(adapter.validate_python(objects, from_attributes=True))
+
+
+def serializers(adapter: TypeAdapter) -> dict[str, Callable[[list], bytes]]:
+    """方式名 → ORM オブジェクトのリストを JSON バイト列にする関数（rows 以外）"""
+
+    def validate(rows: list):
+        return adapter.validate_python(rows, from_attributes=True)
+
+    return {
+        "fastapi": lambda rows: adapter.dump_json(validate(rows)),
+        "jsonable_encoder": lambda rows: json.dumps(
+            jsonable_encoder(adapter.dump_python(validate(rows)))
+        ).encode("utf-8"),
+        "orjson": lambda rows: dumps(adapter.dump_python(validate(rows))),
+        "orjson float": lambda rows: dumps(adapter.dump_python(validate(rows)), "float"),
+    }
+
+
+def measure(fn: Callable[[list], bytes], rows: list, repeat: int) -> tuple[float, int]:
+    """最速の所要時間（秒）と出力サイズ（バイト）"""
+    best = float("inf")
+    size = 0
+    for _ in range(repeat):
+        started = time.perf_counter()
+        size = len(fn(rows))
+        best = min(best, time.perf_counter() - started)
+    return best, size
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="レスポンスのシリアライズ方式のベンチマーク")
+    parser.add_argument("--rows", type=int, default=10_000, help="1レスポンスあたりの行数")
+    parser.add_argument("--repeat", type=int, default=5, help="計測回数（最速値を表示）")
+    args = parser.parse_args()
+
+    cases = [
+        ("/api/assets", TypeAdapter(list[AssetResponse]), build_assets(args.rows)),
+        ("/api/snapshots", TypeAdapter(list[AssetSnapshotResponse]), build_snapshots(args.rows)),
+    ]
+    for endpoint, adapter, rows in cases:
+        print(f"{endpoint}  ({args.rows:,} rows)")
+        print(f"  {'method':<20} {'ms':>9} {'rows/s':>12} {'bytes':>12}")
+        results = {
+            name: measure(fn, rows, args.repeat) for name, fn in serializers(adapter).items()
+        }
+        results["rows"] = measure(dumps, to_rows(rows, adapter), args.repeat)
+        for name, (seconds, size) in results.items():
+            print(f"  {name:<20} {seconds * 1000:>9.1f} {len(rows) / seconds:>12,.0f} {size:>12,}")
+        print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+API 起動時のインポート時間チェック
+
+`python -X importtime` で src.main のインポートを計測し、次の場合に終了コード 1 を返す。
+- インポート時間の合計が予算を超えた場合
+- 初回利用時まで遅延させるべきモジュール（yfinance / pandas / numpy）が起動時に読み込まれた場合
+
+使い方:
+    # 計測（既定の予算: 1500 ms）
+    python scripts/check_import_time.py
+
+    # 予算と表示件数を指定
+    python scripts/check_import_time.py --budget-ms 1200 --top 20
+"""
+
+import argparse
+import resource
+import subprocess
+import sys
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+# 起動時に読み込んではいけないモジュール（市場データ取得時に遅延インポートする）
+DEFERRED_MODULES = ("yfinance", "pandas", "numpy")
+
+
+def measure(module: str) -> tuple[list[tuple[int, int, str]], int]:
+    """
+    別プロセスでモジュールをインポートし、-X importtime の結果を取得
+
+    Args:
+        module: インポートするモジュール名
+
+    Returns:
+        (self_us, cumulative_us, モジュール名（インデント付き）) のリストと子プロセスの最大RSS（KB）
+    """
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=BACKEND_DIR,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    rows = []
+    for line in completed.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line.removeprefix("import time:").split("|", 2)
+        rows.append((int(self_us), int(cumulative_us), name.rstrip()))
+    return rows, resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="API 起動時のインポート時間チェック")
+    parser.add_argument("--module", default="src.main", help="計測するモジュール")
+    parser.add_argument("--budget-ms", type=float, default=1500, help="インポート時間の予算（ms）")
+    parser.add_argument("--top", type=int, default=15, help="表示する上位モジュール数")
+    args = parser.parse_args()
+
+    rows, max_rss_kb = measure(args.module)
+    # インデントなし = トップレベルのインポート（合計するとインポート全体の時間）
+    total_ms = sum(cumulative for _, cumulative, name in rows if not name.startswith("  ")) / 1000
+    loaded = {name.strip().split(".")[0] for _, _, name in rows}
+    deferred = [module for module in DEFERRED_MODULES if module in loaded]
+
+    print(f"{'cumulative ms':>14}  {'self ms':>8}  module")
+    for self_us, cumulative_us, name in sorted(rows, key=lambda r: r[1], reverse=True)[: args.top]:
+        print(f"{cumulative_us / 1000:>14.1f}  {self_us / 1000:>8.1f}  {name.strip()}")
+    print()
+    print(f"total: {total_ms:.0f} ms (budget {args.budget_ms:.0f} ms)")
+    print(f"max RSS: {max_rss_kb // 1024} MB")
+
+    ok = True
+    if total_ms > args.budget_ms:
+        print(f"✗ インポート時間が予算を超えています: {total_ms:.0f} ms > {args.budget_ms:.0f} ms")
+        ok = False
+    if deferred:
+        print(f"✗ 起動時に読み込まれています（遅延インポートにすること）: {', '.join(deferred)}")
+        ok = False
+    if ok:
+        print("✓ OK")
+    else:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""
+証券会社の約定履歴CSVを取引履歴として取り込むスクリプト
+
+使い方:
+    python scripts/import_statement.py --broker sbi SaveFile.csv
+    python scripts/import_statement.py --broker ibkr --encoding utf-8 trades.csv
+
+ファイルはチャンク単位で読み込み、一定件数ごとにまとめて INSERT する。
+取込後に対象資産の数量・平均取得単価・取得総額（円）を再計算する。
+"""
+
+import argparse
+import asyncio
+
+# プロジェクトルートにパスを通す（backendディレクトリ）
+import os
+import sys
+from collections.abc import AsyncIterator
+from pathlib import Path
+
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+from app.database import async_session_maker, settings
+from app.services import bump_data_version
+from app.services.statement_import import (
+    BROKER_FORMATS,
+    StatementImporter,
+    iter_csv_rows,
+)
+
+# 1回に読み込むバイト数
+CHUNK_SIZE = 64 * 1024
+
+
+async def read_chunks(path: Path) -> AsyncIterator[bytes]:
+    """ファイルをチャンク単位で読み込む"""
+    with path.open("rb") as f:
+        while chunk := f.read(CHUNK_SIZE):
+            yield chunk
+
+
+async def import_statement(path: Path, broker: str, encoding: str | None) -> None:
+    """約定履歴CSVを取り込む"""
+    encoding = encoding or BROKER_FORMATS[broker].encoding
+    async with async_session_maker() as session:
+        importer = StatementImporter(session, batch_size=settings.STATEMENT_IMPORT_BATCH_SIZE)
+        await importer.run(iter_csv_rows(read_chunks(path), encoding), broker)
+        await bump_data_version(session)
+        await session.commit()
+
+    result = importer.result
+    print(f"✓ Imported {result.imported} transactions ({result.skipped} rows skipped)")
+    print(f"  Assets: {result.created_assets} created, {result.updated_assets} updated")
+    for error in result.errors:
+        print(f"  ! {error}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="約定履歴CSVの取込")
+    parser.add_argument("path", type=Path, help="CSVファイル")
+    parser.add_argument("--broker", required=True, choices=sorted(BROKER_FORMATS))
+    parser.add_argument("--encoding", default=None, help="文字コード（省略時は証券会社ごとの既定）")
+    args = parser.parse_args()
+    asyncio.run(import_statement(args.path, args.broker, args.encoding))
+
+
+if __name__ == "__main__":
+    main()
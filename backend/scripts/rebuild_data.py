@@ -13,6 +13,7 @@ from sqlalchemy import delete, select
 
 from app.database import async_session_maker
 from app.models import Asset, AssetHistory, AssetSnapshot
+from app.services import bump_data_version
 
 # USD/JPY レート
 USD_JPY_RATE = Decimal("156.38")
@@ -119,6 +120,7 @@ async def rebuild_data():
 
         session.add_all(histories)
         session.add_all(snapshots)
+        await bump_data_version(session)
         await session.commit()
 
         print(f"✓ Created {len(histories)} history records")
@@ -1,85 +1,70 @@
 """
-スナップショットデータを実際の保有銘柄データで再計算するスクリプト
-- USD → JPY 換算あり
-- 日本株・投資信託: 0
-- 現金: 9,000円
-- 米国株: asset_histories から日次で計算（円換算）
+スナップショットを資産履歴・為替レート・現金台帳から再計算するスクリプト
+
+app.services.snapshot_recompute の集合演算（1回の INSERT ... SELECT）で
+指定期間のスナップショットを作り直す。既存のスナップショットは削除せずに上書きする。
+- 日本株・米国株・投資信託: asset_histories の日次合計（米国株はその日の USDJPY で円換算）
+- 現金: 現金台帳の各日の残高
+- 保有銘柄数: その日に履歴がある銘柄数
+
+使い方:
+    # 資産履歴・現金台帳の最初の日から本日まで
+    python scripts/recalc_snapshots.py
+
+    # 期間を指定
+    python scripts/recalc_snapshots.py --start 2026-01-01 --end 2026-03-31
 """
 
+import argparse
 import asyncio
-from decimal import Decimal
 
-from sqlalchemy import delete, func, select
+# プロジェクトルートにパスを通す（backendディレクトリ）
+import os
+import sys
+from datetime import date
 
-from app.database import async_session_maker
-from app.models import AssetHistory, AssetSnapshot
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
 
-# USD/JPY レート（現在のおおよそのレート）
-USD_JPY_RATE = Decimal("157")
+from sqlalchemy import func, select
+
+from app.database import async_session_maker
+from app.models import AssetHistory, CashLedgerEntry
+from app.services import bump_data_version
+from app.services.snapshot_recompute import recompute_snapshots
 
 
-async def recalculate_snapshots():
-    """スナップショットを実際のデータで再計算（円換算）"""
+async def recalculate_snapshots(start: date | None, end: date | None) -> None:
+    """スナップショットを指定期間について再計算"""
     async with async_session_maker() as session:
-        # 現金は9000円固定
-        cash = Decimal("9000")
-
-        # 既存のスナップショットを全削除
-        await session.execute(delete(AssetSnapshot))
-        print("✓ Deleted all existing snapshots")
-
-        # asset_histories から日付一覧を取得
-        result = await session.execute(
-            select(AssetHistory.record_date).distinct().order_by(AssetHistory.record_date)
-        )
-        dates = [row[0] for row in result.fetchall()]
-
-        if not dates:
-            print("No history data found")
-            return
-
-        print(f"Found {len(dates)} dates with history data")
-        print(f"USD/JPY rate: {USD_JPY_RATE}")
-
-        # 各日付のスナップショットを作成
-        snapshots = []
-        for record_date in dates:
-            # その日の全銘柄の評価額合計を取得（USD）
-            result = await session.execute(
-                select(func.sum(AssetHistory.value)).where(AssetHistory.record_date == record_date)
-            )
-            us_stocks_usd = result.scalar() or Decimal("0")
-
-            # USD → JPY 換算
-            us_stocks_jpy = (us_stocks_usd * USD_JPY_RATE).quantize(Decimal("1"))
-
-            # 総資産 = 米国株（円換算） + 現金
-            total = us_stocks_jpy + cash
-
-            snapshot = AssetSnapshot(
-                snapshot_date=record_date,
-                total_assets=total,
-                japanese_stocks=Decimal("0"),
-                us_stocks=us_stocks_jpy,
-                investment_trusts=Decimal("0"),
-                cash=cash,
-                holding_count=4,
-                yield_rate=Decimal("3.24"),
-            )
-            snapshots.append(snapshot)
-
-        session.add_all(snapshots)
+        if start is None:
+            first_dates = [
+                await session.scalar(select(func.min(AssetHistory.record_date))),
+                await session.scalar(select(func.min(CashLedgerEntry.entry_date))),
+            ]
+            first_dates = [d for d in first_dates if d is not None]
+            if not first_dates:
+                print("No history data found")
+                return
+            start = min(first_dates)
+        end = end or date.today()
+
+        written = await recompute_snapshots(session, start, end)
+        await bump_data_version(session)
         await session.commit()
-        print(f"✓ Created {len(snapshots)} snapshots from {dates[0]} to {dates[-1]}")
 
-        # 最新のスナップショットを表示
-        latest = snapshots[-1] if snapshots else None
-        if latest:
-            print(f"\nLatest snapshot ({latest.snapshot_date}):")
-            print(f"  米国株: ¥{latest.us_stocks:,.0f}")
-            print(f"  現金: ¥{latest.cash:,.0f}")
-            print(f"  総資産: ¥{latest.total_assets:,.0f}")
+    print(f"✓ Recalculated {len(written)} snapshots from {start} to {end}")
+    skipped = (end - start).days + 1 - len(written)
+    if skipped:
+        print(f"  [Skip] {skipped} days without a USD/JPY rate (run scripts/update_daily.py)")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="スナップショットの再計算")
+    parser.add_argument("--start", type=date.fromisoformat, help="開始日（YYYY-MM-DD）")
+    parser.add_argument("--end", type=date.fromisoformat, help="終了日（YYYY-MM-DD、既定: 本日）")
+    args = parser.parse_args()
+    asyncio.run(recalculate_snapshots(args.start, args.end))
 
 
 if __name__ == "__main__":
-    asyncio.run(recalculate_snapshots())
+    main()
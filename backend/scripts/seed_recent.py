@@ -10,6 +10,7 @@ from sqlalchemy import select
 
 from app.database import async_session_maker
 from app.models import AssetSnapshot
+from app.services import bump_data_version
 
 
 async def add_recent_snapshots():
@@ -59,6 +60,7 @@ async def add_recent_snapshots():
             session.add(snapshot)
             snapshots_added += 1
 
+        await bump_data_version(session)
         await session.commit()
         print(f"✓ Added {snapshots_added} snapshots for recent 30 days")
 
@@ -4,19 +4,65 @@ Solo Saving API - メインアプリケーションエントリーポイント
 このファイルはFastAPIアプリケーションの設定とルーターの登録を行います。
 """
 
-from fastapi import FastAPI
+import asyncio
+import contextlib
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
 
+from app.database import engine, settings
+from app.responses import ORJSONResponse
 from app.routers import (
+    admin_router,
     assets_router,
     cash_router,
     categories_router,
     dashboard_router,
+    exports_router,
     goals_router,
+    imports_router,
     snapshots_router,
 )
+from app.routers.dashboard import prime_dashboard_cache
+from app.routers.snapshots import prime_chart_cache
+from app.services.compression import CompressionMiddleware
+from app.services.executors import executor_stats, shutdown_executors
+from app.services.metrics import (
+    CONTENT_TYPE,
+    MetricsMiddleware,
+    instrument_engine,
+    render_metrics,
+)
+from app.services.profiling import ProfilingMiddleware, profile_store, profiling_enabled
+from app.services.query_stats import QueryStatsMiddleware
+from app.services.snapshot_worker import run_snapshot_worker, snapshot_worker_state
+from app.services.warmup import warm_up, warmup_state
 from app.stock_router import stock_router
 
+
+# ==============================================
+# ライフサイクル（起動・終了処理）
+# ==============================================
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """アプリケーションの起動・終了処理"""
+    # コネクションプール・SQL・主要レスポンスのウォームアップ（完了まで /health/ready は 503）
+    tasks = [asyncio.create_task(warm_up((prime_dashboard_cache, prime_chart_cache)))]
+    # 過去日付の取引・入出金で古くなったスナップショットをバックグラウンドで再計算
+    if settings.SNAPSHOT_WORKER_INTERVAL > 0:
+        tasks.append(asyncio.create_task(run_snapshot_worker()))
+    yield
+    for task in tasks:
+        task.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await task
+    # 外部API・CPU処理用のスレッドプールを停止
+    shutdown_executors()
+    # コネクションプールを閉じる（処理中のリクエストは uvicorn が待ってから終了処理に入る）
+    await engine.dispose()
+
+
 # ==============================================
 # FastAPI アプリケーション設定
 # ==============================================
@@ -44,6 +90,7 @@ Solo Saving は個人の資産を管理・可視化するためのAPIです。
     version="0.1.0",
     docs_url="/docs",
     redoc_url="/redoc",
+    lifespan=lifespan,
     openapi_tags=[
         {
             "name": "資産カテゴリ",
@@ -65,24 +112,59 @@ Solo Saving は個人の資産を管理・可視化するためのAPIです。
             "name": "ダッシュボード",
             "description": "統計情報とポートフォリオ構成の取得",
         },
+        {
+            "name": "取引明細取込",
+            "description": "証券会社の約定履歴CSVの取込",
+        },
+        {
+            "name": "エクスポート",
+            "description": "スナップショット・資産履歴・取引履歴の CSV / NDJSON 出力",
+        },
+        {
+            "name": "管理",
+            "description": "プロファイリング結果の取得（PROFILING_TOKEN が必要）",
+        },
     ],
 )
 
 # ==============================================
 # CORS（クロスオリジンリソース共有）設定
-# フロントエンド（localhost:3000）からのアクセスを許可
+# フロントエンドからのアクセスを許可（CORS_ORIGINS で設定、既定は localhost:3000/3001）
 # ==============================================
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=[
-        "http://localhost:3000",
-        "http://localhost:3001",
-    ],  # フロントエンドのURL
+    allow_origins=settings.cors_origins,  # フロントエンドのURL
     allow_credentials=True,
     allow_methods=["*"],  # すべてのHTTPメソッドを許可
     allow_headers=["*"],  # すべてのヘッダーを許可
 )
 
+# ==============================================
+# レスポンス圧縮（gzip / brotli）
+# COMPRESSION_MIN_SIZE 未満・対象外の Content-Type・圧縮済みのレスポンスはそのまま送る
+# ==============================================
+app.add_middleware(CompressionMiddleware, minimum_size=settings.COMPRESSION_MIN_SIZE)
+
+# ==============================================
+# メトリクス計測（ルート別レイテンシ・SQL・コネクションプール）
+# ==============================================
+app.add_middleware(MetricsMiddleware)
+instrument_engine(engine)
+# リクエストごとのSQL実行数・DB時間（Server-Timing ヘッダーと N+1 の警告）
+app.add_middleware(
+    QueryStatsMiddleware,
+    budget=settings.SQL_QUERY_BUDGET,
+    repeat_threshold=settings.SQL_REPEAT_THRESHOLD,
+)
+# プロファイリング（有効な場合のみ登録。無効時は一切のオーバーヘッドなし）
+if profiling_enabled():
+    app.add_middleware(
+        ProfilingMiddleware,
+        store=profile_store,
+        token=settings.PROFILING_TOKEN,
+        sample_rate=settings.PROFILING_SAMPLE_RATE,
+    )
+
 # ==============================================
 # ルーターの登録
 # 各機能ごとにルーターを分割して管理
@@ -94,6 +176,9 @@ app.include_router(goals_router)
 app.include_router(dashboard_router)
 app.include_router(stock_router)
 app.include_router(cash_router)
+app.include_router(imports_router)
+app.include_router(exports_router)
+app.include_router(admin_router)
 
 
 # ==============================================
@@ -132,3 +217,86 @@ async def health():
         ステータスOKを示すJSON
     """
     return {"status": "ok"}
+
+
+@app.get(
+    "/health/ready",
+    summary="レディネスチェック",
+    description="起動時のウォームアップが完了しているかを返します（未完了なら 503）",
+    tags=["ヘルスチェック"],
+)
+async def health_ready():
+    """
+    レディネスチェックエンドポイント。
+
+    コネクションプールの接続、主要な SQL の準備と画面の初期表示に使うレスポンス
+    （ダッシュボード、既定のチャート）のキャッシュが終わるまでは 503 を返すため、
+    ロードバランサーはウォームアップ中のワーカーにリクエストを振り分けない。
+    /health はプロセスが稼働していれば常に 200（ライブネス用）。
+
+    Returns:
+        ウォームアップの状態（接続数、各ステップの所要時間、直近のエラー）
+    """
+    status_code = 200 if warmup_state.ready else 503
+    status = "ready" if warmup_state.ready else "warming_up"
+    return ORJSONResponse(
+        status_code=status_code,
+        content={"status": status, "warmup": warmup_state.as_dict()},
+    )
+
+
+@app.get(
+    "/health/executors",
+    summary="スレッドプール状態",
+    description="外部API用・CPU処理用スレッドプールの待ち行列と使用率を返します",
+    tags=["ヘルスチェック"],
+)
+async def health_executors():
+    """
+    スレッドプールの状態を取得。
+
+    queued（実行待ち件数）が増え続ける、または utilization が常に 1 に近い場合は
+    PROVIDER_EXECUTOR_WORKERS / CPU_EXECUTOR_WORKERS の見直しが必要。
+
+    Returns:
+        プールごとの待ち件数・実行中件数・使用率など
+    """
+    return {"executors": executor_stats()}
+
+
+@app.get(
+    "/health/snapshots",
+    summary="スナップショット再計算の状態",
+    description="過去日付の変更で古くなったスナップショットを再計算するワーカーの状態を返します",
+    tags=["ヘルスチェック"],
+)
+async def health_snapshots():
+    """
+    スナップショット再計算ワーカーの状態を取得（このプロセスの分）。
+
+    failures が増え続ける場合は error を確認する。連続して
+    SNAPSHOT_WORKER_MAX_ATTEMPTS 回失敗した範囲は、次に過去日付の取引・入出金で
+    印が付き直すまで再試行されない。
+
+    Returns:
+        実行回数、直近の再計算の開始日・所要時間・件数、直近のエラー
+    """
+    return {"snapshot_worker": snapshot_worker_state.as_dict()}
+
+
+@app.get(
+    "/metrics",
+    summary="メトリクス",
+    description="Prometheus 形式のメトリクス（ルート別レイテンシ、SQL、外部API、キャッシュ）",
+    tags=["ヘルスチェック"],
+)
+async def metrics():
+    """
+    Prometheus のテキスト形式でメトリクスを返す。
+
+    値はワーカープロセスごとに集計される。
+
+    Returns:
+        メトリクス（text/plain; version=0.0.4）
+    """
+    return Response(content=render_metrics(), media_type=CONTENT_TYPE)
@@ -0,0 +1,136 @@
+"""
+Solo Saving API - 本番用サーバー
+
+アプリケーションを親プロセスで一度だけインポート（プリロード）してから
+WEB_WORKERS 個のワーカープロセスを fork し、同じソケットで待ち受ける。
+
+- インポート後に gc.freeze() するため、インポート済みのモジュールやクラスのページは
+  ワーカー間でコピーオンライトのまま共有される（GC による書き込みでコピーされない）
+- uvloop / httptools がインストールされていれば自動で使用する（uvicorn[standard]）
+- SIGTERM / SIGINT を受けると全ワーカーに SIGTERM を送り、処理中のリクエストを
+  最大 WEB_GRACEFUL_TIMEOUT 秒待ってからコネクションプールを閉じて終了する
+- 異常終了したワーカーは再起動する
+
+使い方:
+    # 本番（Docker の既定コマンド）
+    python -m src.server
+
+    # 開発（ホットリロード、1プロセス）
+    uvicorn src.main:app --reload
+"""
+
+import gc
+import logging
+import os
+import signal
+import socket
+import sys
+import time
+
+import uvicorn
+
+from app.database import settings
+
+logger = logging.getLogger("uvicorn.error")
+
+# 猶予時間を過ぎても終了しないワーカーを強制終了するまでの追加の待ち時間（秒）
+KILL_MARGIN_SECONDS = 10
+# ワーカーが短時間で落ち続ける場合の再起動間隔（秒）
+RESTART_DELAY_SECONDS = 1
+
+
+def run_worker(config: uvicorn.Config, sock: socket.socket) -> None:
+    """
+    fork したワーカープロセスで uvicorn を実行する（戻らない）
+
+    Args:
+        config: 親プロセスで作成した uvicorn の設定
+        sock: 親プロセスで bind 済みのソケット
+    """
+    from app.database import engine
+
+    # 親から引き継いだシグナルハンドラーを戻す（uvicorn が自前で登録する）
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    signal.signal(signal.SIGALRM, signal.SIG_DFL)
+    # 親プロセスのコネクションを共有しないようプールを作り直す（親は接続していない想定）
+    engine.sync_engine.dispose(close=False)
+
+    server = uvicorn.Server(config)
+    try:
+        server.run(sockets=[sock])
+    finally:
+        os._exit(0 if server.started else 1)
+
+
+def main() -> None:
+    workers = settings.WEB_WORKERS or os.cpu_count() or 1
+
+    # アプリをプリロードし、以降 GC の対象外にしてワーカー間でページを共有する
+    from src.main import app
+
+    gc.collect()
+    gc.freeze()
+
+    config = uvicorn.Config(
+        app,
+        host=settings.WEB_HOST,
+        port=settings.WEB_PORT,
+        loop="auto",
+        http="auto",
+        lifespan="on",
+        timeout_graceful_shutdown=settings.WEB_GRACEFUL_TIMEOUT,
+    )
+    sock = config.bind_socket()
+
+    children: set[int] = set()
+    stopping = False
+
+    def spawn() -> None:
+        pid = os.fork()
+        if pid == 0:
+            run_worker(config, sock)
+        children.add(pid)
+
+    def stop(signum: int, frame: object) -> None:
+        nonlocal stopping
+        if not stopping:
+            logger.info("Shutting down %d workers", len(children))
+            signal.alarm(settings.WEB_GRACEFUL_TIMEOUT + KILL_MARGIN_SECONDS)
+        stopping = True
+        for pid in children:
+            os.kill(pid, signal.SIGTERM)
+
+    def kill(signum: int, frame: object) -> None:
+        logger.warning("Workers did not exit in time, killing %d", len(children))
+        for pid in children:
+            os.kill(pid, signal.SIGKILL)
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGALRM, kill)
+
+    logger.info("Starting %d workers (pid %d)", workers, os.getpid())
+    for _ in range(workers):
+        spawn()
+
+    while children:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        children.discard(pid)
+        if stopping:
+            continue
+        code = os.waitstatus_to_exitcode(status)
+        logger.warning("Worker %d exited with %d, restarting", pid, code)
+        time.sleep(RESTART_DELAY_SECONDS)
+        if not stopping:
+            spawn()
+
+    sock.close()
+    sys.exit(0)
+
+
+if __name__ == "__main__":
+    main()
@@ -102,7 +102,7 @@ export async function getChartData(
   period: "day" | "month" | "year" = "month"
 ): Promise<ChartData[]> {
   const data = await fetchApi<ChartData[]>(
-    `/api/snapshots/chart?period=${period}`
+    `/api/snapshots/chart?period=${period}&numeric=float`
   );
   // 合計を追加（API からは含まれない場合があるため）
   return data.map((item) => ({